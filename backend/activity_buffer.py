@@ -0,0 +1,76 @@
+"""
+Write-coalesced user activity timestamps.
+
+Logins used to commit users.last_login one row at a time, which is a
+synchronous write per login against SQLite's single writer. Timestamps are now
+kept in memory (only the latest per user and column) and written with one
+executemany UPDATE by a background thread (see buffered_writer.py), every
+ACTIVITY_FLUSH_INTERVAL seconds or as soon as ACTIVITY_FLUSH_SIZE users are
+pending, and at interpreter shutdown. Logins never write or wait for a flush
+themselves, so a database problem is logged by the thread rather than failing
+the login. A crash loses at most one interval of timestamps, which only ever
+move forward.
+"""
+
+from datetime import datetime
+from sqlalchemy import bindparam, or_
+from models import User
+from buffered_writer import BufferedWriter, register_buffer
+
+# User columns that may be buffered
+ACTIVITY_COLUMNS = ('last_login',)
+
+class ActivityBuffer(BufferedWriter):
+    """Pending activity timestamps of one app, flushed in batches"""
+
+    label = 'Activity'
+
+    def __init__(self, app, table):
+        super().__init__(app, app.config['ACTIVITY_FLUSH_INTERVAL'], app.config['ACTIVITY_FLUSH_SIZE'])
+        self.table = table
+        self._pending = {column: {} for column in ACTIVITY_COLUMNS}
+
+    def record(self, user_id, column='last_login', when=None):
+        """Buffer a timestamp for a user, waking the flush thread if the buffer is full"""
+        if column not in self._pending:
+            raise ValueError(f'Unsupported activity column: {column}')
+        when = when or datetime.utcnow()
+        with self._lock:
+            pending = self._pending[column]
+            if pending.get(user_id) is None or pending[user_id] < when:
+                pending[user_id] = when
+            count = sum(len(entries) for entries in self._pending.values())
+        self._recorded(count)
+
+    def _take(self):
+        batches = {column: entries for column, entries in self._pending.items() if entries}
+        self._pending = {column: {} for column in ACTIVITY_COLUMNS}
+        return batches
+
+    def _write(self, connection, batches):
+        """One executemany UPDATE per column"""
+        written = 0
+        for column, entries in batches.items():
+            target = self.table.c[column]
+            connection.execute(
+                self.table.update().where(
+                    self.table.c.id == bindparam('user_id'),
+                    # Never move a timestamp backwards
+                    or_(target.is_(None), target < bindparam('activity_at'))
+                ).values({column: bindparam('activity_at')}),
+                [{'user_id': user_id, 'activity_at': when} for user_id, when in entries.items()]
+            )
+            written += len(entries)
+        return written
+
+    def _requeue(self, batches):
+        """Put timestamps from a failed flush back, keeping the newest"""
+        for column, entries in batches.items():
+            pending = self._pending[column]
+            for user_id, when in entries.items():
+                if pending.get(user_id) is None or pending[user_id] < when:
+                    pending[user_id] = when
+
+def init_activity_buffer(app):
+    """Create the app's activity buffer and flush it at shutdown"""
+    return register_buffer(app, 'activity_buffer', ActivityBuffer(app, User.__table__))
@@ -11,12 +11,20 @@ load_dotenv()
 # Import models and configuration
 from models import db, bcrypt, User, Library, Word, LibraryWord, Story
 from config import config
+from activity_buffer import init_activity_buffer
+from token_revocation import init_token_revocation
+from review_events import init_review_events
+from leaderboard import init_leaderboards
+from import_jobs import init_import_jobs
 
 # Import route blueprints
 from routes.auth_routes import auth_bp
 from routes.library_routes import library_bp
 from routes.word_routes import word_bp
 from routes.story_routes import story_bp
+from routes.import_job_routes import import_job_bp
+from routes.review_routes import review_bp
+from routes.stats_routes import stats_bp
 
 def create_app(config_name=None):
     """Application factory pattern"""
@@ -31,6 +39,10 @@ def create_app(config_name=None):
     bcrypt.init_app(app)
     migrate = Migrate(app, db)
     jwt = JWTManager(app)
+    init_activity_buffer(app)
+    init_token_revocation(app, jwt)
+    init_review_events(app)
+    init_leaderboards(app)
 
     # Configure CORS
     CORS(app, origins=['http://localhost:5173', 'http://localhost:3000', 'http://localhost:8080', 'http://localhost:8081', 'http://localhost:8082'],
@@ -43,9 +55,13 @@ def create_app(config_name=None):
     app.register_blueprint(library_bp)
     app.register_blueprint(word_bp)
     app.register_blueprint(story_bp)
+    app.register_blueprint(import_job_bp)
+    app.register_blueprint(review_bp)
+    app.register_blueprint(stats_bp)
 
     # Create upload directory if it doesn't exist
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    init_import_jobs(app)
 
     return app
 
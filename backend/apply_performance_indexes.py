@@ -18,6 +18,7 @@ def apply_performance_indexes():
                 ("idx_library_words_library_id", "CREATE INDEX IF NOT EXISTS idx_library_words_library_id ON library_words (library_id)"),
                 ("idx_library_words_word_id", "CREATE INDEX IF NOT EXISTS idx_library_words_word_id ON library_words (word_id)"),
                 ("idx_library_words_learned", "CREATE INDEX IF NOT EXISTS idx_library_words_learned ON library_words (library_id, is_learned)"),
+                ("idx_library_words_word_learned", "CREATE INDEX IF NOT EXISTS idx_library_words_word_learned ON library_words (word_id, is_learned)"),
                 ("idx_words_word", "CREATE INDEX IF NOT EXISTS idx_words_word ON words (word)"),  # This might already exist
             ]
             
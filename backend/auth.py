@@ -1,7 +1,9 @@
 from functools import wraps
 from flask import jsonify, request
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
+from flask_jwt_extended.exceptions import RevokedTokenError
 from models import User, db
+from user_cache import load_authenticated_user
 
 def token_required(f):
     """Decorator to require valid JWT token for protected routes"""
@@ -10,7 +12,8 @@ def token_required(f):
         try:
             verify_jwt_in_request()
             current_user_id = get_jwt_identity()
-            current_user = User.query.filter_by(public_id=current_user_id).first()
+            # id and is_active come from the per-process cache (see user_cache.py)
+            current_user = load_authenticated_user(current_user_id)
             
             if not current_user:
                 return jsonify({
@@ -25,6 +28,12 @@ def token_required(f):
                 }), 401
                 
             return f(current_user, *args, **kwargs)
+
+        except RevokedTokenError:
+            return jsonify({
+                'success': False,
+                'error': 'Token has been revoked'
+            }), 401
             
         except Exception as e:
             return jsonify({
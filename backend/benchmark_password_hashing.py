@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark login password checks at several bcrypt work factors.
+
+For each cost, CLIENTS threads each verify a password in a loop the way the
+login route does, through the shared hashing pool (password_hashing.py).
+Prints throughput, median / p95 latency and how many attempts were turned
+away as busy. Finishes with an end-to-end check that logging in upgrades a
+hash made with an outdated cost.
+
+Usage: python benchmark_password_hashing.py [cost ...]
+"""
+
+import statistics
+import sys
+import threading
+import time
+from app import create_app
+from models import db, bcrypt, User
+from password_hashing import run_hashing, hash_cost, PasswordHashingBusy
+
+COSTS = [4, 8, 10, 12]
+CLIENTS = 16
+BENCHMARK_SECONDS = 3
+PASSWORD = 'correct horse battery staple'
+
+def run_logins(app, password_hash, seconds):
+    """Verify the password from CLIENTS threads for `seconds`; return latencies and rejections"""
+    latencies = []
+    rejected = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        with app.app_context():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    ok = run_hashing(bcrypt.check_password_hash, password_hash, PASSWORD)
+                except PasswordHashingBusy:
+                    with lock:
+                        rejected[0] += 1
+                    time.sleep(0.01)
+                    continue
+                assert ok
+                with lock:
+                    latencies.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=client) for _ in range(CLIENTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, rejected[0]
+
+def check_rehash_on_login(app):
+    """Log in with a low-cost hash and confirm it is upgraded to BCRYPT_LOG_ROUNDS"""
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com')
+        user.password_hash = bcrypt.generate_password_hash(PASSWORD, 4).decode('utf-8')
+        db.session.add(user)
+        db.session.commit()
+
+    response = app.test_client().post('/api/auth/login', json={
+        'username_or_email': 'bench',
+        'password': PASSWORD
+    })
+    with app.app_context():
+        user = User.query.filter_by(username='bench').first()
+        return response.status_code, hash_cost(user.password_hash)
+
+def main():
+    costs = [int(arg) for arg in sys.argv[1:]] or COSTS
+    app = create_app('testing')
+    print(f"{CLIENTS} concurrent clients, {app.config['PASSWORD_HASH_WORKERS']} hashing workers, "
+          f"queue limit {app.config['PASSWORD_HASH_QUEUE_LIMIT']}")
+    print(f"{'cost':>4} {'logins/s':>9} {'median ms':>10} {'p95 ms':>8} {'busy':>6}")
+
+    with app.app_context():
+        for cost in costs:
+            password_hash = bcrypt.generate_password_hash(PASSWORD, cost).decode('utf-8')
+            latencies, rejected = run_logins(app, password_hash, BENCHMARK_SECONDS)
+            latencies.sort()
+            p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+            print(f"{cost:>4} {len(latencies) / BENCHMARK_SECONDS:>9.1f} "
+                  f"{statistics.median(latencies) if latencies else 0:>10.1f} {p95:>8.1f} {rejected:>6}")
+
+    app.config['BCRYPT_LOG_ROUNDS'] = max(costs)
+    status, cost = check_rehash_on_login(app)
+    print(f"\nLogin with a cost-4 hash: HTTP {status}, stored cost is now {cost}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark random word sampling on a 5,000-word library.
+
+Compares the previous approach (load every matching (Word, LibraryWord) pair and
+random.sample in Python) with word_sampling.sample_library_words, and checks
+that the new sampler stays uniform. The benchmark library's rows are
+interleaved with nine other libraries' rows, as ids are when many users add
+words over time. Runs against an in-memory SQLite database.
+"""
+
+import random
+import statistics
+import time
+from datetime import datetime
+from app import create_app
+from models import db, User, Library, Word, LibraryWord
+from word_sampling import sample_library_words
+from reconcile_library_counters import reconcile_library_counters
+
+LIBRARY_SIZE = 5000
+INTERLEAVED_LIBRARIES = 9  # Other libraries whose rows are inserted between the benchmark's
+LEARNED_RATIO = 0.3
+SAMPLE_SIZE = 4
+ITERATIONS = 50
+
+def build_libraries(user, names, size, learned_ratio, rng):
+    """Create libraries of `size` fresh words each with bulk inserts, their rows interleaved"""
+    libraries = [Library(user_id=user.id, name=name, is_master=False) for name in names]
+    db.session.add_all(libraries)
+    db.session.flush()
+
+    now = datetime.utcnow()
+    word_ids = {}
+    for name in names:
+        db.session.execute(db.insert(Word), [
+            {'word': f'{name}-word-{index:05d}', 'meaning': f'meaning {index}', 'difficulty': 'medium', 'created_at': now}
+            for index in range(size)
+        ])
+        word_ids[name] = [word_id for (word_id,) in db.session.query(Word.id).filter(Word.word.like(f'{name}-word-%'))]
+    db.session.execute(db.insert(LibraryWord), [
+        {'library_id': library.id, 'word_id': word_ids[library.name][index],
+         'is_learned': rng.random() < learned_ratio, 'added_at': now}
+        for index in range(size)
+        for library in libraries
+    ])
+    db.session.commit()
+    library_ids = [library.id for library in libraries]
+    reconcile_library_counters(library_ids=library_ids)
+    return [db.session.get(Library, library_id) for library_id in library_ids]
+
+def build_library(user, name, size, learned_ratio, rng):
+    """Create a single library of `size` fresh words"""
+    return build_libraries(user, [name], size, learned_ratio, rng)[0]
+
+def load_all_then_sample(user_id, library_id, k):
+    """The previous implementation: hydrate every unlearned pair, sample in Python"""
+    rows = db.session.query(Word, LibraryWord).join(
+        LibraryWord, Word.id == LibraryWord.word_id
+    ).join(
+        Library, LibraryWord.library_id == Library.id
+    ).filter(
+        Library.user_id == user_id,
+        Library.id == library_id,
+        LibraryWord.is_learned == False
+    ).all()
+    return rows if len(rows) <= k else random.sample(rows, k)
+
+def time_per_call(func, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+        db.session.expunge_all()
+    return statistics.median(timings), max(timings)
+
+def check_uniformity(library, rng, draws=5000):
+    """Sample repeatedly from a small library and report per-word hit frequencies"""
+    hits = {}
+    for _ in range(draws):
+        for _, library_word in sample_library_words([library], SAMPLE_SIZE, status='all', rng=rng):
+            hits[library_word.id] = hits.get(library_word.id, 0) + 1
+        db.session.expunge_all()
+        library = db.session.get(Library, library.id)
+    expected = draws * SAMPLE_SIZE / library.word_count
+    return expected, min(hits.values()), max(hits.values()), len(hits)
+
+def main():
+    app = create_app('testing')
+    rng = random.Random(42)
+
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+
+        names = ['bench'] + [f'other{index}' for index in range(INTERLEAVED_LIBRARIES)]
+        library = build_libraries(user, names, LIBRARY_SIZE, LEARNED_RATIO, rng)[0]
+        print(f"Library: {library.word_count} words, {library.learned_count} learned")
+
+        old_median, old_max = time_per_call(
+            lambda: load_all_then_sample(user.id, library.id, SAMPLE_SIZE), ITERATIONS
+        )
+        new_median, new_max = time_per_call(
+            lambda: sample_library_words([db.session.get(Library, library.id)], SAMPLE_SIZE, status='unlearned'),
+            ITERATIONS
+        )
+
+        print(f"\nSampling {SAMPLE_SIZE} unlearned words, {ITERATIONS} iterations:")
+        print(f"  load all + random.sample: median {old_median:.2f} ms, max {old_max:.2f} ms")
+        print(f"  sample_library_words:     median {new_median:.2f} ms, max {new_max:.2f} ms")
+        print(f"  speedup: {old_median / new_median:.1f}x")
+
+        small = build_library(user, 'uniform', 40, 0.0, rng)
+        expected, low, high, distinct = check_uniformity(small, rng)
+        print(f"\nUniformity over a 40-word library ({distinct} words seen):")
+        print(f"  expected hits per word {expected:.0f}, observed min {low}, max {high}")
+
+if __name__ == '__main__':
+    main()
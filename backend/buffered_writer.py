@@ -0,0 +1,110 @@
+"""
+Shared machinery for in-memory write buffers.
+
+Requests add entries to a buffer instead of writing them; a background thread
+writes everything pending in one transaction every interval seconds, or as
+soon as the buffer holds max_entries, and once more at interpreter shutdown.
+Requests never write or wait for a flush themselves, so a database problem is
+logged by the thread instead of failing the request. A failed flush puts its
+entries back for the next one.
+
+Subclasses keep their own pending structure (guarded by _lock) and supply
+_take(), _write() and _requeue(); see activity_buffer.py and review_events.py.
+"""
+
+import atexit
+import threading
+from models import db
+
+class BufferedWriter:
+    """Timer, locking and flush-on-exit for a buffer of one app"""
+
+    label = 'Buffer'  # Used in the thread name and log messages
+
+    def __init__(self, app, interval, max_entries):
+        self.app = app
+        self.interval = interval
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def _take(self):
+        """Remove and return everything pending (falsy if nothing); caller holds _lock"""
+        raise NotImplementedError
+
+    def _write(self, connection, batch):
+        """Write a batch inside the flush transaction; returns the number of entries written"""
+        raise NotImplementedError
+
+    def _requeue(self, batch):
+        """Put a batch whose write failed back in front of newer entries; caller holds _lock"""
+        raise NotImplementedError
+
+    def _written(self, batch):
+        """Hook run after a batch has been committed"""
+
+    def _recorded(self, pending):
+        """Call after adding entries: start the timer and wake it if the buffer is full"""
+        self._start_timer()
+        if pending >= self.max_entries:
+            self._wake.set()
+
+    def flush(self):
+        """
+        Write everything pending in one transaction
+
+        Runs in its own transaction, so it never commits a request's session.
+        Returns the number of entries written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch = self._take()
+            if not batch:
+                return 0
+            try:
+                with self.app.app_context(), db.engine.begin() as connection:
+                    written = self._write(connection, batch)
+            except Exception:
+                with self._lock:
+                    self._requeue(batch)
+                raise
+            self._written(batch)
+            return written
+
+    def _start_timer(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                name = self.label.lower().replace(' ', '-') + '-flush'
+                self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self.flush()
+            except Exception as e:
+                self.app.logger.warning(f'{self.label} flush failed, will retry: {e}')
+
+    def close(self):
+        """Stop the timer and write whatever is pending"""
+        self._stop.set()
+        self._wake.set()
+        try:
+            self.flush()
+        except Exception as e:
+            self.app.logger.error(f'{self.label} flush at shutdown failed: {e}')
+
+def register_buffer(app, name, buffer):
+    """Add a buffer to app.extensions and flush it at shutdown"""
+    app.extensions[name] = buffer
+    atexit.register(buffer.close)
+    return buffer
@@ -0,0 +1,147 @@
+"""
+Shared word catalogs.
+
+A catalog is a read-only word list (such as the GRE master wordlist) that any
+number of libraries include through Library.catalog_id. Catalog words get no
+library_words rows until a user records progress on them (see
+library_entries.py), so giving the GRE list to 10k users stores it once
+instead of 10k times.
+
+All maintenance runs as set-based statements on a Core connection, so scripts
+holding their own connection and request code using db.session.connection()
+can share it. The caller commits.
+"""
+
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select, func, and_, exists, literal
+from models import Library, LibraryWord, Catalog, CatalogWord
+
+def get_default_catalog():
+    """Catalog that new Master Libraries reference (None until it has been created)"""
+    return Catalog.query.filter_by(name=current_app.config['DEFAULT_CATALOG_NAME']).first()
+
+def attach_default_catalog(library):
+    """Point a new, still empty library at the default catalog if there is one"""
+    catalog = get_default_catalog()
+    if catalog:
+        library.catalog_id = catalog.id
+        library.word_count = (library.word_count or 0) + catalog.word_count
+    return catalog
+
+def get_or_create_catalog(connection, name, description=None):
+    """Id of the catalog with this name, creating it if needed"""
+    table = Catalog.__table__
+    catalog_id = connection.execute(select(table.c.id).where(table.c.name == name)).scalar()
+    if catalog_id is None:
+        catalog_id = connection.execute(table.insert().values(
+            name=name,
+            description=description,
+            word_count=0,
+            created_at=datetime.utcnow()
+        )).inserted_primary_key[0]
+    return catalog_id
+
+def recompute_library_counters(connection, library_condition):
+    """
+    Recompute word_count / learned_count for the matching libraries in one UPDATE
+
+    word_count is catalog words plus own rows that are not catalog overrides.
+    """
+    table = Library.__table__
+    own_words = select(func.count(LibraryWord.id)).where(
+        LibraryWord.library_id == table.c.id,
+        LibraryWord.from_catalog == False
+    ).scalar_subquery()
+    catalog_words = select(func.count(CatalogWord.id)).where(
+        CatalogWord.catalog_id == table.c.catalog_id
+    ).scalar_subquery()
+    learned_words = select(func.count(LibraryWord.id)).where(
+        LibraryWord.library_id == table.c.id,
+        LibraryWord.is_learned == True
+    ).scalar_subquery()
+
+    connection.execute(table.update().where(library_condition).values(
+        word_count=own_words + catalog_words,
+        learned_count=learned_words,
+        updated_at=table.c.updated_at  # counter changes are not library edits
+    ))
+
+def _flag_catalog_overrides(connection, catalog_id, library_ids):
+    """Mark own rows for words now provided by the catalog as progress overrides"""
+    connection.execute(LibraryWord.__table__.update().where(
+        LibraryWord.from_catalog == False,
+        LibraryWord.library_id.in_(library_ids),
+        LibraryWord.word_id.in_(
+            select(CatalogWord.word_id).where(CatalogWord.catalog_id == catalog_id)
+        )
+    ).values(from_catalog=True))
+
+def add_catalog_words(connection, catalog_id, word_ids_select):
+    """
+    Add words to a catalog with one anti-join INSERT ... SELECT
+
+    word_ids_select is a select of word ids. Libraries referencing the catalog
+    pick the new words up immediately; their rows for those words become
+    progress overrides and their counters are recomputed.
+
+    Returns:
+        Number of words added to the catalog
+    """
+    word_ids = word_ids_select.subquery()
+    existing = CatalogWord.__table__.alias('existing')
+    missing = select(
+        literal(catalog_id),
+        word_ids.c[0],
+        literal(datetime.utcnow())
+    ).where(
+        ~exists().where(and_(
+            existing.c.catalog_id == catalog_id,
+            existing.c.word_id == word_ids.c[0]
+        ))
+    ).distinct()
+    added = connection.execute(
+        CatalogWord.__table__.insert().from_select(['catalog_id', 'word_id', 'added_at'], missing)
+    ).rowcount
+
+    catalog_table = Catalog.__table__
+    connection.execute(catalog_table.update().where(catalog_table.c.id == catalog_id).values(
+        word_count=select(func.count(CatalogWord.id)).where(
+            CatalogWord.catalog_id == catalog_id
+        ).scalar_subquery()
+    ))
+
+    if added:
+        library_ids = select(Library.id).where(Library.catalog_id == catalog_id)
+        _flag_catalog_overrides(connection, catalog_id, library_ids)
+        recompute_library_counters(connection, Library.catalog_id == catalog_id)
+    return added
+
+def attach_catalog(connection, catalog_id, library_condition):
+    """
+    Make the matching libraries reference a catalog instead of materialized rows
+
+    Rows for catalog words that carry no progress (never learned) are deleted;
+    the rest are kept as progress overrides. Counters are recomputed.
+
+    Returns:
+        Number of library_words rows deleted
+    """
+    table = Library.__table__
+    connection.execute(table.update().where(library_condition).values(
+        catalog_id=catalog_id,
+        updated_at=table.c.updated_at
+    ))
+
+    library_ids = select(Library.id).where(library_condition)
+    catalog_word_ids = select(CatalogWord.word_id).where(CatalogWord.catalog_id == catalog_id)
+    deleted = connection.execute(LibraryWord.__table__.delete().where(
+        LibraryWord.library_id.in_(library_ids),
+        LibraryWord.word_id.in_(catalog_word_ids),
+        LibraryWord.is_learned == False,
+        LibraryWord.learned_at.is_(None)
+    )).rowcount
+
+    _flag_catalog_overrides(connection, catalog_id, library_ids)
+    recompute_library_counters(connection, library_condition)
+    return deleted
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Roll old review events up into daily aggregates.
+
+Events older than REVIEW_EVENT_RETENTION_DAYS are summed per user, library,
+day and outcome into review_daily_stats and then deleted, one day per
+transaction, so the raw log stays bounded. The distinct words each user
+learned that day go to review_daily_learned, the measure GET /api/stats
+reports for raw days, so compacting does not change a user's history. Aggregates are upserted, so events
+that arrive late for an already compacted day are added to it on the next
+run, and an interrupted run simply continues where it stopped. Meant to run
+daily from cron.
+
+Usage:
+    python compact_review_events.py                 # use REVIEW_EVENT_RETENTION_DAYS
+    python compact_review_events.py --keep-days 30  # override the retention
+"""
+
+import argparse
+import sys
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, distinct
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import app, db
+from models import ReviewEvent, ReviewDailyStat, ReviewDailyLearned
+
+def compact_day(day_start):
+    """Aggregate and delete the events of one day (the caller commits)"""
+    day_end = day_start + timedelta(days=1)
+    in_day = (ReviewEvent.ts >= day_start, ReviewEvent.ts < day_end)
+
+    grouped = select(
+        ReviewEvent.user_id,
+        ReviewEvent.library_id,
+        func.date(ReviewEvent.ts),
+        ReviewEvent.outcome,
+        func.count(ReviewEvent.id),
+        func.count(ReviewEvent.latency_ms),
+        func.coalesce(func.sum(ReviewEvent.latency_ms), 0)
+    ).where(*in_day).group_by(
+        ReviewEvent.user_id,
+        ReviewEvent.library_id,
+        func.date(ReviewEvent.ts),
+        ReviewEvent.outcome
+    )
+
+    table = ReviewDailyStat.__table__
+    upsert = sqlite_insert(table).from_select(
+        ['user_id', 'library_id', 'day', 'outcome', 'event_count', 'latency_count', 'total_latency_ms'],
+        grouped
+    )
+    upsert = upsert.on_conflict_do_update(
+        index_elements=['user_id', 'library_id', 'day', 'outcome'],
+        set_={
+            'event_count': table.c.event_count + upsert.excluded.event_count,
+            'latency_count': table.c.latency_count + upsert.excluded.latency_count,
+            'total_latency_ms': table.c.total_latency_ms + upsert.excluded.total_latency_ms
+        }
+    )
+
+    learned = select(
+        ReviewEvent.user_id,
+        func.date(ReviewEvent.ts),
+        func.count(distinct(ReviewEvent.word_id))
+    ).where(*in_day, ReviewEvent.outcome == ReviewEvent.OUTCOME_LEARNED).group_by(
+        ReviewEvent.user_id,
+        func.date(ReviewEvent.ts)
+    )
+
+    learned_table = ReviewDailyLearned.__table__
+    learned_upsert = sqlite_insert(learned_table).from_select(['user_id', 'day', 'learned_words'], learned)
+    # Late events are added to the day; a word they repeat is counted again
+    learned_upsert = learned_upsert.on_conflict_do_update(
+        index_elements=['user_id', 'day'],
+        set_={'learned_words': learned_table.c.learned_words + learned_upsert.excluded.learned_words}
+    )
+
+    connection = db.session.connection()
+    connection.execute(upsert)
+    connection.execute(learned_upsert)
+    return connection.execute(ReviewEvent.__table__.delete().where(*in_day)).rowcount
+
+def compact_review_events(keep_days):
+    """
+    Compact every whole day older than keep_days
+
+    Returns:
+        Tuple of (days compacted, events removed)
+    """
+    cutoff = datetime.combine(datetime.utcnow().date() - timedelta(days=keep_days), datetime.min.time())
+    days = 0
+    removed = 0
+    while True:
+        oldest = db.session.query(func.min(ReviewEvent.ts)).filter(ReviewEvent.ts < cutoff).scalar()
+        if oldest is None:
+            break
+        removed += compact_day(datetime.combine(oldest.date(), datetime.min.time()))
+        db.session.commit()
+        days += 1
+    return days, removed
+
+def main():
+    """Main compaction function"""
+    parser = argparse.ArgumentParser(description='Roll old review events up into daily aggregates')
+    parser.add_argument('--keep-days', type=int, help='days of raw events to keep')
+    args = parser.parse_args()
+
+    with app.app_context():
+        keep_days = args.keep_days if args.keep_days is not None else app.config['REVIEW_EVENT_RETENTION_DAYS']
+        try:
+            days, removed = compact_review_events(keep_days)
+            if days:
+                print(f"Compacted {removed} events from {days} days older than {keep_days} days.")
+            else:
+                print("No review events old enough to compact.")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error compacting review events: {e}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -15,9 +15,57 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
 
+    # Logout revocation list (see token_revocation.py)
+    REVOCATION_SYNC_INTERVAL = 5  # Seconds between reads of other processes' revocations
+    REVOCATION_PRUNE_INTERVAL = 3600  # Seconds between deletions of expired entries
+    REVOCATION_BLOOM_CAPACITY = 100000  # Revocations the filter is sized for
+    REVOCATION_BLOOM_ERROR_RATE = 0.001
+    REVOCATION_LRU_SIZE = 10000  # Recently checked token ids kept in memory
+
+    # Per-process cache of authenticated users for token_required (see user_cache.py)
+    AUTH_USER_CACHE_ENABLED = os.environ.get('AUTH_USER_CACHE_ENABLED', 'true').lower() == 'true'
+    AUTH_USER_CACHE_TTL = 60  # Seconds before a cached user is re-read
+    AUTH_USER_CACHE_SIZE = 10000  # Users kept per process
+
+    # Password hashing (see password_hashing.py)
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))  # bcrypt work factor
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 2))
+    PASSWORD_HASH_QUEUE_LIMIT = 32  # Hash calls allowed to wait before answering 503
+
+    # Batched last_login writes (see activity_buffer.py)
+    ACTIVITY_FLUSH_INTERVAL = 10  # Seconds between background flushes
+    ACTIVITY_FLUSH_SIZE = 500  # Pending users that trigger an immediate flush
+
+    # Review event log (see review_events.py and compact_review_events.py)
+    REVIEW_EVENT_FLUSH_INTERVAL = 5  # Seconds between background flushes
+    REVIEW_EVENT_FLUSH_SIZE = 1000  # Pending events that trigger an immediate flush
+    REVIEW_EVENT_MAX_PENDING = 50000  # Events kept while flushes fail (oldest dropped)
+    REVIEW_NEW_CARDS_PER_DAY = 20  # Unscheduled words GET /api/review/due may introduce per user and day
+    REVIEW_EVENT_RETENTION_DAYS = int(os.environ.get('REVIEW_EVENT_RETENTION_DAYS', 90))  # Raw events kept before compaction
+
+    # Learning statistics cache (see learning_stats.py)
+    STATS_CACHE_SIZE = 10000  # Users whose stats are kept
+    STATS_CACHE_TTL = 300  # Seconds before cached stats are recomputed
+
+    # In-process leaderboards (see leaderboard.py)
+    LEADERBOARD_SYNC_INTERVAL = 30  # Seconds between reads of XP committed by other processes
+
     # File upload configuration
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
+    IMPORT_BATCH_SIZE = 1000  # Rows resolved and inserted per set-based import batch
+    IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', 2))  # Background CSV import threads
+    IMPORT_MAX_STORED_ERRORS = 200  # Per-row error messages kept on an import job
+    IMPORT_JOB_STALE_AFTER = 300  # Seconds without progress before a running job counts as interrupted
+    IMPORT_RECOVERY_ENABLED = os.environ.get('IMPORT_RECOVERY_ENABLED', 'true').lower() == 'true'  # Resume or fail orphaned jobs
+
+    # Shared word list that new Master Libraries reference (see catalog.py)
+    DEFAULT_CATALOG_NAME = os.environ.get('DEFAULT_CATALOG_NAME', 'GRE Master Wordlist')
+    # Library whose words are copied into every new Master Library (unset: none)
+    STARTER_TEMPLATE_LIBRARY_ID = int(os.environ['STARTER_TEMPLATE_LIBRARY_ID']) if os.environ.get('STARTER_TEMPLATE_LIBRARY_ID') else None
+
+    WORD_BATCH_MAX_ITEMS = 500  # Words accepted by POST /api/words/batch
+    PROGRESS_BATCH_MAX_ITEMS = 500  # Entries accepted by POST /api/words/progress/batch
 
     # Pagination
     WORDS_PER_PAGE = 50
@@ -38,6 +86,8 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    BCRYPT_LOG_ROUNDS = 4  # Minimum cost keeps tests fast
+    IMPORT_RECOVERY_ENABLED = False
 
 config = {
     'development': DevelopmentConfig,
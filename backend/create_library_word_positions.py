@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Add dense per-library positions to library_words on an existing database.
+
+New databases get the column, index and triggers from db.create_all() (see
+LIBRARY_WORD_POSITION_DDL in models.py). This script adds them to databases
+created before, numbering every library's rows 1..n in id order with one
+windowed UPDATE. It is safe to run again.
+"""
+
+import sys
+from sqlalchemy import text, inspect
+from app import app, db
+from models import LIBRARY_WORD_POSITION_DDL
+
+BACKFILL_SQL = (
+    "UPDATE library_words SET position = ranked.position "
+    "FROM (SELECT id, row_number() OVER (PARTITION BY library_id ORDER BY id) AS position FROM library_words) AS ranked "
+    "WHERE ranked.id = library_words.id"
+)
+
+def create_library_word_positions():
+    """Add the position column, backfill it, then create its index and triggers"""
+    print("=== Creating Library Word Positions ===")
+
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            print("Positions are only maintained on SQLite; sampling falls back to an id scan.")
+            return True
+
+        try:
+            columns = {column['name'] for column in inspect(db.engine).get_columns('library_words')}
+            if 'position' not in columns:
+                print("Adding position column...")
+                db.session.execute(text("ALTER TABLE library_words ADD COLUMN position INTEGER"))
+
+            # Drop the triggers first so the backfill is not renumbered as it runs
+            db.session.execute(text("DROP TRIGGER IF EXISTS library_words_position_ai"))
+            db.session.execute(text("DROP TRIGGER IF EXISTS library_words_position_ad"))
+            db.session.execute(text("DROP INDEX IF EXISTS idx_library_words_position"))
+
+            print("Numbering rows per library...")
+            db.session.execute(text(BACKFILL_SQL))
+            db.session.execute(text(
+                "CREATE UNIQUE INDEX idx_library_words_position ON library_words (library_id, position)"
+            ))
+            for statement in LIBRARY_WORD_POSITION_DDL:
+                db.session.execute(text(statement))
+            db.session.commit()
+
+            numbered = db.session.execute(text(
+                "SELECT COUNT(*) FROM library_words WHERE position IS NOT NULL"
+            )).scalar()
+            print(f"✓ Library word positions ready ({numbered} rows numbered)")
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"✗ Error creating library word positions: {e}")
+            return False
+
+if __name__ == '__main__':
+    if not create_library_word_positions():
+        sys.exit(1)
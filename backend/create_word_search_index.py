@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Create the FTS5 full-text index for words on an existing database.
+
+New databases get the index from db.create_all() (see WORDS_FTS_DDL in models.py).
+This script creates the virtual table and sync triggers on databases created
+before the index existed, then rebuilds the index from the words table.
+"""
+
+import sys
+from sqlalchemy import text
+from app import app, db
+from models import WORDS_FTS_DDL
+
+def create_word_search_index():
+    """Create the words_fts table and triggers, then rebuild its contents"""
+    print("=== Creating Word Search Index ===")
+
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            print("FTS5 index is only used on SQLite; search falls back to LIKE matching.")
+            return True
+
+        try:
+            for statement in WORDS_FTS_DDL:
+                db.session.execute(text(statement))
+
+            print("Rebuilding index from words table...")
+            db.session.execute(text("INSERT INTO words_fts(words_fts) VALUES ('rebuild')"))
+            db.session.commit()
+
+            indexed = db.session.execute(text("SELECT COUNT(*) FROM words_fts")).scalar()
+            print(f"✓ Word search index ready ({indexed} words indexed)")
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"✗ Error creating word search index: {e}")
+            return False
+
+if __name__ == '__main__':
+    if not create_word_search_index():
+        sys.exit(1)
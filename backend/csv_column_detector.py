@@ -1,10 +1,66 @@
 import csv
 import io
 import re
-from typing import Dict, List, Tuple, Optional
+from functools import lru_cache
+from itertools import chain, islice
+from typing import Dict, Iterator, List, Tuple, Optional
+
+# Delimiters considered when sniffing a sample
+SNIFF_DELIMITERS = ',\t;|'
+
+# Plain comma-separated with a header row (what DictReader assumed)
+DEFAULT_DIALECT = {
+    'delimiter': ',',
+    'quotechar': '"',
+    'doublequote': True,
+    'skipinitialspace': False,
+    'has_header': True
+}
+
+@lru_cache(maxsize=32)
+def get_dialect(delimiter: str, quotechar: str = '"', doublequote: bool = True,
+                skipinitialspace: bool = False):
+    """csv.Dialect for the given parameters, built once and shared by every reader"""
+    return type('SniffedDialect', (csv.Dialect,), {
+        'delimiter': delimiter,
+        'quotechar': quotechar,
+        'doublequote': doublequote,
+        'skipinitialspace': skipinitialspace,
+        'lineterminator': '\r\n',
+        'quoting': csv.QUOTE_MINIMAL
+    })
+
+def read_csv_rows(text_stream, dialect_info: Optional[Dict] = None) -> Tuple[List[str], Iterator]:
+    """
+    Parse a CSV text stream with a detected dialect
+
+    Blank lines are skipped. Files without a header row get positional names
+    (column_1, column_2, ...).
+
+    Returns:
+        Tuple of (fieldnames, rows) where rows lazily yields (line_number, values)
+    """
+    info = dialect_info or DEFAULT_DIALECT
+    reader = csv.reader(text_stream, get_dialect(
+        info['delimiter'], info['quotechar'], info['doublequote'], info['skipinitialspace']
+    ))
+    rows = ((reader.line_num, values) for values in reader if values)
+
+    first = next(rows, None)
+    if first is None:
+        return [], iter(())
+    if info['has_header']:
+        return first[1], rows
+    fieldnames = [f'column_{position}' for position in range(1, len(first[1]) + 1)]
+    return fieldnames, chain([first], rows)
 
 class CSVColumnDetector:
     """Intelligent CSV column detector for word and meaning columns"""
+
+    # Characters of text inspected for detection; the rest of the file is never read here
+    SAMPLE_SIZE = 64 * 1024
+    # Longest cell (in tokens) still taken as a column name by its first token
+    HEADER_MAX_TOKENS = 3
     
     def __init__(self):
         # Common column names for words
@@ -20,43 +76,56 @@ class CSVColumnDetector:
             'import', 'denotation', 'connotation'
         ]
     
+    def read_sample(self, text_stream, size: Optional[int] = None) -> str:
+        """
+        Read a bounded prefix of a text stream for detection
+
+        If the stream is longer than the sample, the sample is cut back to the
+        last complete line. The caller rewinds the stream before importing.
+        """
+        size = size or self.SAMPLE_SIZE
+        sample = text_stream.read(size)
+        if len(sample) == size and '\n' in sample:
+            sample = sample[:sample.rfind('\n') + 1]
+        return sample
+
     def detect_columns(self, file_content: str) -> Tuple[Optional[str], Optional[str], Dict]:
         """
         Detect word and meaning columns from CSV content
+
+        file_content only needs to cover the header and the first few rows,
+        e.g. a prefix from read_sample().
         
         Returns:
             Tuple of (word_column, meaning_column, analysis_info)
         """
         try:
-            # Parse CSV content
-            stream = io.StringIO(file_content)
-            csv_reader = csv.DictReader(stream)
+            # Parse CSV content with the sniffed delimiter and quoting
+            dialect_info = self.sniff_dialect(file_content)
+            fieldnames, csv_rows = read_csv_rows(io.StringIO(file_content), dialect_info)
             
-            if not csv_reader.fieldnames:
+            if not fieldnames:
                 return None, None, {'error': 'No columns found in CSV'}
             
             # Get first few rows for content analysis
-            rows = []
-            for i, row in enumerate(csv_reader):
-                if i >= 5:  # Analyze first 5 rows
-                    break
-                rows.append(row)
+            rows = [dict(zip(fieldnames, values)) for _, values in islice(csv_rows, 5)]
             
             if not rows:
                 return None, None, {'error': 'No data rows found in CSV'}
             
             # Analyze columns
-            column_scores = self._analyze_columns(csv_reader.fieldnames, rows)
+            column_scores = self._analyze_columns(fieldnames, rows)
             
             # Find best matches
             word_column = self._find_best_match(column_scores, 'word')
             meaning_column = self._find_best_match(column_scores, 'meaning')
             
             analysis_info = {
-                'available_columns': list(csv_reader.fieldnames),
+                'available_columns': list(fieldnames),
                 'column_scores': column_scores,
                 'detected_word_column': word_column,
-                'detected_meaning_column': meaning_column
+                'detected_meaning_column': meaning_column,
+                'dialect': dialect_info
             }
             
             return word_column, meaning_column, analysis_info
@@ -64,6 +133,71 @@ class CSVColumnDetector:
         except Exception as e:
             return None, None, {'error': f'Failed to analyze CSV: {str(e)}'}
     
+    def sniff_dialect(self, sample: str) -> Dict:
+        """
+        Detect delimiter, quoting and header presence from a sample
+
+        Returns:
+            Dict with delimiter, quotechar, doublequote, skipinitialspace and has_header
+        """
+        lines = sample.splitlines(keepends=True)
+        # Leading blank lines (as in gre_master_wordlist.csv) confuse the sniffer
+        body = ''.join(islice((line for line in lines if line.strip()), 50))
+        dialect_info = dict(DEFAULT_DIALECT)
+        if not body:
+            return dialect_info
+
+        sniffer = csv.Sniffer()
+        try:
+            sniffed = sniffer.sniff(body, delimiters=SNIFF_DELIMITERS)
+            # doublequote stays on: the sniffer reports False whenever the sample has no "" pairs
+            dialect_info.update(
+                delimiter=sniffed.delimiter,
+                quotechar=sniffed.quotechar or '"',
+                skipinitialspace=sniffed.skipinitialspace
+            )
+        except csv.Error:
+            # Inconsistent sample; fall back to the most frequent delimiter on the first line
+            first_line = body.splitlines()[0]
+            delimiter = max(SNIFF_DELIMITERS, key=first_line.count)
+            if first_line.count(delimiter):
+                dialect_info['delimiter'] = delimiter
+
+        first_row = next(csv.reader(io.StringIO(body), get_dialect(
+            dialect_info['delimiter'], dialect_info['quotechar'],
+            dialect_info['doublequote'], dialect_info['skipinitialspace']
+        )), [])
+        if self._looks_like_header(first_row):
+            dialect_info['has_header'] = True
+        else:
+            # The sniffer's heuristic compares the first row against column types and lengths
+            try:
+                dialect_info['has_header'] = sniffer.has_header(body)
+            except csv.Error:
+                pass
+
+        return dialect_info
+
+    def _looks_like_header(self, first_row: List[str]) -> bool:
+        """
+        Whether a cell of the first row is a word or meaning column name
+
+        Only whole cells count: the normalized cell must be an indicator, or
+        start with one and be at most HEADER_MAX_TOKENS tokens long (e.g.
+        "Word_Name"). Data whose meaning merely contains an indicator ("an
+        expression of...", "defer") is left to the sniffer.
+        """
+        indicators = set(self.word_indicators + self.meaning_indicators)
+        for cell in first_row:
+            tokens = re.findall(r'[a-z0-9]+', cell.lower())
+            if not tokens:
+                continue
+            if ' '.join(tokens) in indicators:
+                return True
+            if tokens[0] in indicators and len(tokens) <= self.HEADER_MAX_TOKENS:
+                return True
+        return False
+    
     def _analyze_columns(self, fieldnames: List[str], rows: List[Dict]) -> Dict:
         """Analyze each column and assign scores for word/meaning likelihood"""
         column_scores = {}
@@ -0,0 +1,306 @@
+"""
+Server-side XP, levels and achievements.
+
+The rules mirror frontend/src/contexts/GamificationContext.tsx, which until
+now kept this state in localStorage only. Each user has one user_stats row
+holding XP, level, the counters the achievement rules read (words learned,
+stories created, study streak) and the unlocked achievements.
+
+Words learned counts distinct learned words across the user's libraries, the
+same figure as GET /api/stats total_learned. Routes that learn, unlearn or
+delete progress rows call record_learning() with the rows whose learned state
+changed; a word moves the counter by one only when it becomes learned in its
+first library or stops being learned in its last, which one lookup on the
+indexed (word_id, is_learned) columns decides. Learning a word in several
+libraries therefore never counts it twice, and word XP is only paid above the
+user's previous best, so unlearning and learning again pays nothing. Story
+routes call record_story_created() before adding the story. Either way the row
+changes in the same transaction, and only the achievements that read the moved
+counter are checked. reconcile_words_learned() recounts every user in bulk
+(see reconcile_library_counters.py).
+
+A user's row is created by their first event, seeded once from their learned
+words and story count so existing users start where they are.
+"""
+
+import json
+import math
+from collections import namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import func, distinct, case, bindparam
+from models import db, Library, LibraryWord, Story, UserStat
+from learning_stats import total_learned
+
+WORD_XP = 10  # Per word learned beyond the user's previous best
+STORY_XP = 25  # Per story created
+
+COUNTER_WORDS = 'words_learned'
+COUNTER_STORIES = 'stories_created'
+COUNTER_STREAK = 'current_streak'
+
+Achievement = namedtuple('Achievement', 'id title counter requirement xp_reward')
+
+ACHIEVEMENTS = (
+    Achievement('first_word', 'First Steps', COUNTER_WORDS, 1, 10),
+    Achievement('word_collector_10', 'Word Collector', COUNTER_WORDS, 10, 50),
+    Achievement('vocabulary_master_100', 'Vocabulary Master', COUNTER_WORDS, 100, 200),
+    Achievement('word_sage_500', 'Word Sage', COUNTER_WORDS, 500, 500),
+    Achievement('storyteller', 'Storyteller', COUNTER_STORIES, 1, 25),
+    Achievement('author', 'Aspiring Author', COUNTER_STORIES, 5, 100),
+    Achievement('daily_learner', 'Daily Learner', COUNTER_STREAK, 3, 30),
+    Achievement('week_warrior', 'Week Warrior', COUNTER_STREAK, 7, 100),
+    Achievement('month_master', 'Month Master', COUNTER_STREAK, 30, 1000),
+)
+
+_BY_COUNTER = {}
+for _achievement in ACHIEVEMENTS:
+    _BY_COUNTER.setdefault(_achievement.counter, []).append(_achievement)
+
+LEVEL_TITLES = (
+    (5, 'Vocabulary Novice'),
+    (10, 'Word Explorer'),
+    (20, 'Language Learner'),
+    (35, 'Vocabulary Scholar'),
+    (50, 'Word Master'),
+    (75, 'Language Expert'),
+    (100, 'Vocabulary Sage'),
+)
+
+def xp_for_level(level):
+    """XP needed to get from level to level + 1"""
+    return math.floor(100 * 1.2 ** (level - 1))
+
+def level_title(level):
+    """Title shown for a level"""
+    for below, title in LEVEL_TITLES:
+        if level < below:
+            return title
+    return 'Legendary Wordsmith'
+
+def week_start(day):
+    """Monday of the week containing day; weekly XP resets then"""
+    return day - timedelta(days=day.weekday())
+
+def add_xp(stat, amount):
+    """Add XP and carry any overflow into level ups"""
+    week = week_start(datetime.utcnow().date())
+    if stat.xp_week != week:
+        stat.xp_week = week
+        stat.weekly_xp = 0
+    stat.weekly_xp += amount
+    stat.total_xp += amount
+    stat.level_xp += amount
+    while stat.level_xp >= xp_for_level(stat.level):
+        stat.level_xp -= xp_for_level(stat.level)
+        stat.level += 1
+
+def weekly_xp(stat, today=None):
+    """XP earned this week (the stored figure may belong to an earlier week)"""
+    today = today or datetime.utcnow().date()
+    return stat.weekly_xp if stat.xp_week == week_start(today) else 0
+
+def _check_achievements(stat, counter, now):
+    """Unlock the achievements reading counter that it now satisfies"""
+    value = getattr(stat, counter)
+    unlocked = stat.get_achievements()
+    reached = [
+        achievement for achievement in _BY_COUNTER[counter]
+        if achievement.id not in unlocked and value >= achievement.requirement
+    ]
+    for achievement in reached:
+        unlocked[achievement.id] = now.isoformat()
+        add_xp(stat, achievement.xp_reward)
+    if reached:
+        stat.achievements = json.dumps(unlocked)
+    return [achievement.id for achievement in reached]
+
+def _count_learned(stat, learned, now):
+    stat.words_learned = learned
+    # Unlearning and learning the same word again does not pay twice
+    if stat.words_learned > stat.max_words_learned:
+        add_xp(stat, WORD_XP * (stat.words_learned - stat.max_words_learned))
+        stat.max_words_learned = stat.words_learned
+    return _check_achievements(stat, COUNTER_WORDS, now)
+
+def _count_study_day(stat, today, now):
+    if stat.last_study_day == today:
+        return []
+    if stat.last_study_day == today - timedelta(days=1):
+        stat.current_streak += 1
+    else:
+        stat.current_streak = 1
+    stat.last_study_day = today
+    stat.longest_streak = max(stat.longest_streak, stat.current_streak)
+    return _check_achievements(stat, COUNTER_STREAK, now)
+
+def _count_story(stat, now):
+    stat.stories_created += 1
+    add_xp(stat, STORY_XP)
+    return _check_achievements(stat, COUNTER_STORIES, now)
+
+def _seeded_stat(user_id, now):
+    """A new row reflecting what the user already has"""
+    stat = UserStat(
+        user_id=user_id, total_xp=0, level=1, level_xp=0, weekly_xp=0,
+        words_learned=0, max_words_learned=0, stories_created=0,
+        current_streak=0, longest_streak=0
+    )
+    # Pending changes of the current request are not part of the seed
+    with db.session.no_autoflush:
+        learned = total_learned(user_id)
+        stories = db.session.query(func.count(Story.id)).filter(Story.user_id == user_id).scalar()
+
+    _count_learned(stat, learned, now)
+    stat.stories_created = stories
+    add_xp(stat, STORY_XP * stories)
+    _check_achievements(stat, COUNTER_STORIES, now)
+    # XP for past activity does not count towards this week
+    stat.weekly_xp = 0
+    stat.xp_week = None
+    return stat
+
+def load_user_stat(user_id, create=True):
+    """
+    The user's row, locked for update
+
+    A user without one gets a seeded row, added to the session when create is
+    set and transient otherwise (for read-only callers).
+    """
+    # Not flushing keeps the request's pending progress changes out of a new seed
+    with db.session.no_autoflush:
+        stat = UserStat.query.filter_by(user_id=user_id).with_for_update().first()
+    if stat is None:
+        stat = _seeded_stat(user_id, datetime.utcnow())
+        if create:
+            db.session.add(stat)
+    return stat
+
+def _learned_elsewhere(user_id, changes):
+    """Ids of the changed words still learned in a library the changes do not touch"""
+    touched = {(library_id, word_id) for library_id, word_id, _, _ in changes}
+    rows = db.session.query(LibraryWord.library_id, LibraryWord.word_id).join(
+        Library, LibraryWord.library_id == Library.id
+    ).filter(
+        LibraryWord.word_id.in_({word_id for _, word_id in touched}),
+        LibraryWord.is_learned == True,
+        Library.user_id == user_id
+    )
+    return {word_id for library_id, word_id in rows if (library_id, word_id) not in touched}
+
+def record_learning(user_id, changes, studied=True):
+    """
+    Count learn / unlearn / delete changes to the user's progress rows (the caller commits)
+
+    A user without a user_stats row is seeded from the rows as they were
+    before the request's pending changes, so rows written with Core statements
+    must be preceded by a load_user_stat() and a flush.
+
+    Args:
+        user_id: User whose words changed
+        changes: (library_id, word_id, was_learned, is_learned) per changed
+            row; a deleted row is not learned any more
+        studied: Whether the event counts as a study day for the streak
+
+    Returns:
+        Ids of the achievements unlocked by this event
+    """
+    now = datetime.utcnow()
+    stat = load_user_stat(user_id)
+    changes = [change for change in changes if bool(change[2]) != bool(change[3])]
+
+    delta = 0
+    if changes:
+        elsewhere = _learned_elsewhere(user_id, changes)
+        before = {}
+        after = {}
+        for _, word_id, was_learned, is_learned in changes:
+            before[word_id] = before.get(word_id, False) or bool(was_learned)
+            after[word_id] = after.get(word_id, False) or bool(is_learned)
+        delta = sum(
+            int(after[word_id]) - int(before[word_id])
+            for word_id in after if word_id not in elsewhere
+        )
+
+    unlocked = _count_learned(stat, stat.words_learned + delta, now) if delta else []
+    if studied:
+        unlocked += _count_study_day(stat, now.date(), now)
+    return unlocked
+
+def reconcile_words_learned(dry_run=False):
+    """
+    Recount words_learned for every user_stats row with one grouped query
+
+    Returns:
+        List of (user_id, stored, actual) for rows that drifted
+    """
+    actual = dict(db.session.query(Library.user_id, func.count(distinct(LibraryWord.word_id))).join(
+        LibraryWord, LibraryWord.library_id == Library.id
+    ).filter(
+        LibraryWord.is_learned == True
+    ).group_by(Library.user_id).all())
+
+    drift = [
+        (user_id, words_learned, actual.get(user_id, 0))
+        for user_id, words_learned in db.session.query(UserStat.user_id, UserStat.words_learned)
+        if words_learned != actual.get(user_id, 0)
+    ]
+
+    if drift and not dry_run:
+        table = UserStat.__table__
+        # A recount corrects the counter only; XP already paid stays paid
+        db.session.execute(
+            table.update().where(table.c.user_id == bindparam('stat_user_id')).values(
+                words_learned=bindparam('new_words_learned'),
+                max_words_learned=case(
+                    (table.c.max_words_learned < bindparam('new_words_learned'), bindparam('new_words_learned')),
+                    else_=table.c.max_words_learned
+                ),
+                updated_at=table.c.updated_at
+            ),
+            [{'stat_user_id': user_id, 'new_words_learned': expected} for user_id, _, expected in drift]
+        )
+        db.session.commit()
+
+    return drift
+
+def record_story_created(user_id):
+    """Count a new story (the caller commits); call before adding the story"""
+    return _count_story(load_user_stat(user_id), datetime.utcnow())
+
+def progress_dict(stat, today=None):
+    """Level, counters and achievement progress for JSON response"""
+    today = today or datetime.utcnow().date()
+    current_streak = stat.streak_on(today)
+    unlocked = stat.get_achievements()
+    counters = {
+        COUNTER_WORDS: stat.words_learned,
+        COUNTER_STORIES: stat.stories_created,
+        COUNTER_STREAK: current_streak
+    }
+
+    return {
+        'level': stat.level,
+        'title': level_title(stat.level),
+        'total_xp': stat.total_xp,
+        'weekly_xp': weekly_xp(stat, today),
+        'current_xp': stat.level_xp,
+        'xp_to_next_level': xp_for_level(stat.level) - stat.level_xp,
+        'stats': {
+            'total_words_learned': stat.words_learned,
+            'stories_created': stat.stories_created,
+            'current_streak': current_streak,
+            'longest_streak': stat.longest_streak
+        },
+        'achievements': [
+            {
+                'id': achievement.id,
+                'title': achievement.title,
+                'requirement': achievement.requirement,
+                'xp_reward': achievement.xp_reward,
+                'current_progress': min(counters[achievement.counter], achievement.requirement),
+                'is_unlocked': achievement.id in unlocked,
+                'unlocked_at': unlocked.get(achievement.id)
+            }
+            for achievement in ACHIEVEMENTS
+        ]
+    }
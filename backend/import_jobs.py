@@ -0,0 +1,232 @@
+"""
+Background CSV import jobs.
+
+An upload is saved to UPLOAD_FOLDER and recorded in import_jobs, then processed
+on a small thread pool so the request worker is released immediately. The job
+row is updated and committed after every batch, so GET /api/import-jobs/<id>
+shows live progress. Batches committed before a failure are kept, and the
+upload is deleted once the job completes or fails.
+
+Jobs only live in a process's thread pool, so a restart would strand them. A
+recovery thread started with the app (IMPORT_RECOVERY_ENABLED) therefore
+checks every IMPORT_JOB_STALE_AFTER seconds: queued jobs are handed to this
+process's pool, running jobs whose heartbeat is older than that are marked
+failed, and uploads no queued or running job refers to are deleted. A job is
+claimed with a conditional UPDATE before it runs, so with several processes
+each job still runs once.
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import inspect, text
+from models import db, Library, ImportJob
+from csv_column_detector import CSVColumnDetector
+from learning_stats import invalidate_user_stats
+from word_import import BulkWordImporter, csv_entry_batches
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor(app):
+    """Create the shared import thread pool on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config['IMPORT_WORKERS'],
+                thread_name_prefix='csv-import'
+            )
+    return _executor
+
+UPLOAD_PATTERN = 'import-*.csv'
+
+def new_upload_path(app):
+    """Path for storing an upload until its import job has run"""
+    return os.path.join(app.config['UPLOAD_FOLDER'], UPLOAD_PATTERN.replace('*', uuid.uuid4().hex))
+
+def _remove_upload(file_path):
+    if file_path and os.path.exists(file_path):
+        os.remove(file_path)
+
+def create_import_job(app, user_id, library_id, filename, file_path, word_column, meaning_column):
+    """Record a queued import job for a saved upload and hand it to the thread pool"""
+    job = ImportJob(
+        user_id=user_id,
+        library_id=library_id,
+        filename=filename,
+        file_path=file_path,
+        word_column=word_column,
+        meaning_column=meaning_column,
+        status=ImportJob.STATUS_QUEUED
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    _get_executor(app).submit(run_import_job, app, job.id)
+    return job
+
+def _record_progress(job, importer, rows_done, max_errors):
+    job.rows_done = rows_done
+    job.words_added = importer.words_added
+    job.words_skipped = importer.words_skipped
+    job.error_count = len(importer.errors)
+    job.errors = json.dumps(importer.errors[:max_errors])
+
+def run_import_job(app, job_id):
+    """Process an import job inside its own app context (runs on the thread pool)"""
+    with app.app_context():
+        # Claim the job; it may already have been run by another process
+        now = datetime.utcnow()
+        claimed = db.session.execute(ImportJob.__table__.update().where(
+            ImportJob.id == job_id,
+            ImportJob.status == ImportJob.STATUS_QUEUED
+        ).values(
+            status=ImportJob.STATUS_RUNNING,
+            started_at=now,
+            heartbeat_at=now
+        )).rowcount
+        db.session.commit()
+        if not claimed:
+            return
+        job = db.session.get(ImportJob, job_id)
+
+        batch_size = app.config['IMPORT_BATCH_SIZE']
+        max_errors = app.config['IMPORT_MAX_STORED_ERRORS']
+
+        try:
+            library = db.session.get(Library, job.library_id)
+            if library is None:
+                raise ValueError('Library no longer exists')
+
+            master_library = Library.query.filter_by(
+                user_id=library.user_id,
+                is_master=True
+            ).first()
+            importer = BulkWordImporter(library, master_library)
+            rows_done = 0
+
+            with open(job.file_path, 'r', encoding='utf-8-sig', newline='') as file:
+                # Re-sniff the saved file rather than storing the dialect on the job
+                detector = CSVColumnDetector()
+                dialect_info = detector.sniff_dialect(detector.read_sample(file))
+                file.seek(0)
+
+                batches = csv_entry_batches(
+                    file, job.word_column, job.meaning_column, batch_size, dialect_info
+                )
+                for batch in batches:
+                    importer.import_entries(batch)
+                    rows_done += len(batch)
+                    _record_progress(job, importer, rows_done, max_errors)
+                    job.heartbeat_at = datetime.utcnow()
+                    db.session.commit()
+
+            job.status = ImportJob.STATUS_COMPLETED
+
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(ImportJob, job_id)
+            job.status = ImportJob.STATUS_FAILED
+            job.failure_reason = str(e)
+
+        finally:
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            invalidate_user_stats(job.user_id, app)
+            _remove_upload(job.file_path)
+
+def recover_import_jobs(app):
+    """
+    Resume queued jobs, fail interrupted ones and delete stray uploads
+
+    Returns:
+        Tuple of (jobs resubmitted, jobs failed, uploads deleted)
+    """
+    stale_before = datetime.utcnow() - timedelta(seconds=app.config['IMPORT_JOB_STALE_AFTER'])
+    resubmitted = failed = deleted = 0
+
+    with app.app_context():
+        if not inspect(db.engine).has_table('import_jobs'):
+            # Not created yet: app.py builds the app on import, so init_db.py and
+            # the other setup scripts start recovery before their db.create_all()
+            return resubmitted, failed, deleted
+
+        interrupted = ImportJob.query.filter(
+            ImportJob.status == ImportJob.STATUS_RUNNING,
+            db.or_(ImportJob.heartbeat_at.is_(None), ImportJob.heartbeat_at < stale_before)
+        ).all()
+        for job in interrupted:
+            job.status = ImportJob.STATUS_FAILED
+            job.failure_reason = 'Import was interrupted (server restarted); batches already imported were kept'
+            job.finished_at = datetime.utcnow()
+            _remove_upload(job.file_path)
+            failed += 1
+        db.session.commit()
+
+        queued = ImportJob.query.filter_by(status=ImportJob.STATUS_QUEUED).all()
+        for job in queued:
+            if job.file_path and os.path.exists(job.file_path):
+                _get_executor(app).submit(run_import_job, app, job.id)
+                resubmitted += 1
+            else:
+                job.status = ImportJob.STATUS_FAILED
+                job.failure_reason = 'Uploaded file is no longer available'
+                job.finished_at = datetime.utcnow()
+                failed += 1
+        db.session.commit()
+
+        in_use = {path for (path,) in db.session.query(ImportJob.file_path).filter(
+            ImportJob.status.in_([ImportJob.STATUS_QUEUED, ImportJob.STATUS_RUNNING])
+        )}
+        # Uploads younger than the stale window may belong to a job being created
+        cutoff = time.time() - app.config['IMPORT_JOB_STALE_AFTER']
+        for file_path in glob.glob(os.path.join(app.config['UPLOAD_FOLDER'], UPLOAD_PATTERN)):
+            if file_path not in in_use and os.path.getmtime(file_path) < cutoff:
+                _remove_upload(file_path)
+                deleted += 1
+
+    return resubmitted, failed, deleted
+
+def ensure_heartbeat_column(app):
+    """Add heartbeat_at to an import_jobs table created before it existed"""
+    with app.app_context():
+        inspector = inspect(db.engine)
+        if not inspector.has_table('import_jobs'):
+            return
+        existing = {column['name'] for column in inspector.get_columns('import_jobs')}
+        if 'heartbeat_at' not in existing:
+            db.session.execute(text("ALTER TABLE import_jobs ADD COLUMN heartbeat_at DATETIME"))
+            db.session.commit()
+
+def _run_recovery(app, stop):
+    try:
+        ensure_heartbeat_column(app)
+    except Exception as e:
+        app.logger.warning(f'Could not check import_jobs columns: {e}')
+    while True:
+        try:
+            resubmitted, failed, deleted = recover_import_jobs(app)
+            if resubmitted or failed or deleted:
+                app.logger.info(
+                    f'Import job recovery: {resubmitted} resubmitted, {failed} failed, {deleted} uploads deleted'
+                )
+        except Exception as e:
+            app.logger.warning(f'Import job recovery failed, will retry: {e}')
+        if stop.wait(app.config['IMPORT_JOB_STALE_AFTER']):
+            return
+
+def init_import_jobs(app):
+    """Start the app's import job recovery thread if enabled"""
+    if not app.config['IMPORT_RECOVERY_ENABLED']:
+        return None
+    stop = threading.Event()
+    thread = threading.Thread(target=_run_recovery, args=(app, stop), name='import-recovery', daemon=True)
+    thread.start()
+    app.extensions['import_recovery'] = stop
+    return thread
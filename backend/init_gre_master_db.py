@@ -2,13 +2,30 @@
 """
 Initialize database with GRE Master Wordlist only
 This script replaces the previous database initialization and uses only the gre_master_wordlist.csv
+
+The wordlist is deduplicated in memory, loaded with one executemany and
+published as the shared GRE catalog that Master Libraries reference (see
+catalog.py), all in one transaction. Pass --yes to skip the confirmation prompt.
 """
 
-import csv
 import os
 import sys
+import time
+from datetime import datetime
+from sqlalchemy import select
 from app import app, db
-from models import User, Library, Word, LibraryWord
+from models import User, Library, Word, WORDS_FTS_DDL
+from catalog import get_or_create_catalog, add_catalog_words, attach_default_catalog
+from csv_column_detector import CSVColumnDetector, read_csv_rows
+from word_import import find_word_ids
+
+# Connection-level settings for the bulk load. They trade crash safety for
+# speed, which is fine here because a failed seed is simply re-run.
+FAST_LOAD_PRAGMAS = {
+    'synchronous': 'OFF',
+    'journal_mode': 'MEMORY',
+    'temp_store': 'MEMORY'
+}
 
 def clear_database():
     """Clear all existing data"""
@@ -20,8 +37,85 @@ def clear_database():
         db.create_all()
         print("Database cleared and recreated.")
 
+def apply_fast_load_pragmas():
+    """Apply FAST_LOAD_PRAGMAS to the session's SQLite connection (before any writes)"""
+    if db.engine.dialect.name != 'sqlite':
+        return
+    connection = db.session.connection()
+    for name, value in FAST_LOAD_PRAGMAS.items():
+        connection.exec_driver_sql(f'PRAGMA {name} = {value}')
+
+def insert_words(rows):
+    """
+    Insert word rows with one executemany
+
+    On SQLite the per-row FTS insert trigger is dropped for the load and the
+    search index is rebuilt once afterwards, which is several times faster.
+    """
+    connection = db.session.connection()
+    if db.engine.dialect.name != 'sqlite':
+        connection.execute(Word.__table__.insert(), rows)
+        return
+
+    connection.exec_driver_sql("DROP TRIGGER IF EXISTS words_fts_ai")
+    try:
+        connection.execute(Word.__table__.insert(), rows)
+        connection.exec_driver_sql("INSERT INTO words_fts(words_fts) VALUES ('rebuild')")
+    finally:
+        # Restore the trigger even if the load fails
+        db.session.connection().exec_driver_sql(WORDS_FTS_DDL[1])
+
+def read_gre_master_wordlist(csv_file):
+    """
+    Parse the wordlist into deduplicated word rows
+
+    Returns:
+        Tuple of (rows keyed by lowercased word, number of lines skipped),
+        or (None, 0) if the columns cannot be detected
+    """
+    words = {}
+    words_skipped = 0
+    now = datetime.utcnow()
+
+    with open(csv_file, 'r', encoding='utf-8-sig', newline='') as file:
+        # Sniff the delimiter and header instead of assuming tabs
+        detector = CSVColumnDetector()
+        word_column, meaning_column, analysis_info = detector.detect_columns(detector.read_sample(file))
+        if not word_column or not meaning_column:
+            print(f"Error: could not detect word and meaning columns in {csv_file}")
+            return None, 0
+
+        file.seek(0)
+        fieldnames, rows = read_csv_rows(file, analysis_info['dialect'])
+        word_index = fieldnames.index(word_column)
+        meaning_index = fieldnames.index(meaning_column)
+
+        for line_num, parts in rows:
+            if len(parts) <= max(word_index, meaning_index):
+                words_skipped += 1
+                continue
+
+            word_text = parts[word_index].strip().lower()
+            meaning = parts[meaning_index].strip()
+
+            # Skip empty words or meanings, and repeats (the first occurrence wins)
+            if not word_text or not meaning or word_text in words:
+                words_skipped += 1
+                continue
+
+            words[word_text] = {
+                'word': word_text,
+                'meaning': meaning,
+                'pronunciation': "",  # Not available in this CSV
+                'example': "",        # Not available in this CSV
+                'difficulty': "medium",  # Default difficulty
+                'created_at': now
+            }
+
+    return words, words_skipped
+
 def load_gre_master_wordlist():
-    """Load words from gre_master_wordlist.csv"""
+    """Load words from gre_master_wordlist.csv (the caller commits)"""
     csv_file = 'gre_master_wordlist.csv'
 
     if not os.path.exists(csv_file):
@@ -30,70 +124,36 @@ def load_gre_master_wordlist():
 
     print(f"Loading words from {csv_file}...")
 
-    words_added = 0
-    words_skipped = 0
+    words, words_skipped = read_gre_master_wordlist(csv_file)
+    if words is None:
+        return False
 
-    with open(csv_file, 'r', encoding='utf-8') as file:
-        # Skip the first empty line and header
-        lines = file.readlines()[2:]  # Skip first empty line and header line
-
-        for line_num, line in enumerate(lines, start=3):
-            try:
-                # Split by tab (assuming tab-separated)
-                parts = line.strip().split('\t')
-
-                if len(parts) < 2:
-                    words_skipped += 1
-                    continue
-
-                word_text = parts[0].strip()
-                meaning = parts[1].strip()
-
-                # Skip empty words or meanings
-                if not word_text or not meaning:
-                    words_skipped += 1
-                    continue
-
-                # Check if word already exists
-                existing_word = Word.query.filter_by(word=word_text.lower()).first()
-                if existing_word:
-                    words_skipped += 1
-                    continue
-
-                # Create new word
-                new_word = Word(
-                    word=word_text.lower(),
-                    meaning=meaning,
-                    pronunciation="",  # Not available in this CSV
-                    synonym="",        # Not available in this CSV
-                    antonym="",        # Not available in this CSV
-                    example="",        # Not available in this CSV
-                    difficulty="medium"  # Default difficulty
-                )
-
-                db.session.add(new_word)
-                words_added += 1
-
-                # Commit in batches to avoid memory issues
-                if words_added % 100 == 0:
-                    db.session.commit()
-                    print(f"Processed {words_added} words...")
-
-            except Exception as e:
-                print(f"Error processing line {line_num}: {e}")
-                words_skipped += 1
-                continue
+    # Words already in the database are left as they are
+    existing = find_word_ids(words)
+    new_words = [row for word_text, row in words.items() if word_text not in existing]
+    words_skipped += len(words) - len(new_words)
 
-    # Final commit
-    db.session.commit()
+    if new_words:
+        insert_words(new_words)
 
-    print(f"Successfully added {words_added} words")
+    print(f"Successfully added {len(new_words)} words")
     print(f"Skipped {words_skipped} words")
 
     return True
 
+def create_gre_catalog():
+    """Publish every loaded word as the shared GRE catalog (the caller commits)"""
+    connection = db.session.connection()
+    catalog_id = get_or_create_catalog(
+        connection,
+        app.config['DEFAULT_CATALOG_NAME'],
+        'Complete GRE vocabulary from Barron\'s wordlist'
+    )
+    added = add_catalog_words(connection, catalog_id, select(Word.id))
+    print(f"Shared GRE catalog contains {added} words")
+
 def create_demo_user():
-    """Create a demo user with Master Library"""
+    """Create a demo user with Master Library (the caller commits)"""
     print("Creating demo user...")
 
     # Create demo user
@@ -103,32 +163,20 @@ def create_demo_user():
     )
     demo_user.set_password('demo123')  # Use the model's method for proper bcrypt hashing
     db.session.add(demo_user)
-    db.session.commit()
+    db.session.flush()
 
-    # Create Master Library for demo user
+    # Create Master Library for demo user; its words come from the shared catalog
     master_library = Library(
         name='GRE Master Library',
         description='Complete GRE vocabulary from Barron\'s wordlist',
         user_id=demo_user.id,
         is_master=True
     )
+    attach_default_catalog(master_library)
     db.session.add(master_library)
-    db.session.commit()
+    db.session.flush()
 
-    # Add all words to Master Library
-    all_words = Word.query.all()
-    print(f"Adding {len(all_words)} words to Master Library...")
-
-    for word in all_words:
-        library_word = LibraryWord(
-            library_id=master_library.id,
-            word_id=word.id,
-            is_learned=False
-        )
-        db.session.add(library_word)
-
-    db.session.commit()
-    print(f"Demo user created with Master Library containing {len(all_words)} words")
+    print(f"Demo user created with Master Library containing {master_library.word_count} words")
 
 def main():
     """Main initialization function"""
@@ -136,25 +184,36 @@ def main():
     print("This will replace all existing data with GRE Master Wordlist only.")
 
     # Confirm with user
-    response = input("Are you sure you want to continue? (y/N): ")
-    if response.lower() != 'y':
-        print("Initialization cancelled.")
-        return
+    if '--yes' not in sys.argv:
+        response = input("Are you sure you want to continue? (y/N): ")
+        if response.lower() != 'y':
+            print("Initialization cancelled.")
+            return
 
     with app.app_context():
         try:
             # Clear existing database
             clear_database()
 
+            start = time.perf_counter()
+            apply_fast_load_pragmas()
+
             # Load GRE master wordlist
             if not load_gre_master_wordlist():
+                db.session.rollback()
                 print("Failed to load wordlist. Exiting.")
                 return
 
+            # Share the words through the GRE catalog
+            create_gre_catalog()
+
             # Create demo user
             create_demo_user()
 
+            db.session.commit()
+
             print("\n=== Initialization Complete ===")
+            print(f"Loaded in {time.perf_counter() - start:.2f}s")
             print("Database has been initialized with GRE Master Wordlist")
             print("Demo user credentials:")
             print("  Username: demo")
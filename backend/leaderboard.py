@@ -0,0 +1,176 @@
+"""
+In-process XP leaderboards.
+
+Ranking with ORDER BY total_xp LIMIT touches every user on each request, so
+each process keeps two boards instead, all-time XP and XP this week, as
+arrays of (-score, user_id) kept sorted with bisect. Top-N is a slice, a
+user's rank is one binary search, and moving a user is a binary search plus a
+list insert / delete (a memmove).
+
+The boards follow user_stats, which already stores every score durably since
+XP is written in the same transaction as the event that earned it:
+
+- XP committed by this process is applied by a session after_commit hook
+- XP committed by other processes is read every LEADERBOARD_SYNC_INTERVAL
+  seconds from rows whose updated_at is newer than the last sync
+- at startup and when the week rolls over, the boards are loaded from
+  user_stats in one query, so a restarted process is warm immediately
+"""
+
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+from models import db, UserStat
+from gamification import week_start
+
+BOARD_GLOBAL = 'global'
+BOARD_WEEKLY = 'weekly'
+BOARDS = (BOARD_GLOBAL, BOARD_WEEKLY)
+
+# Rows committed slightly out of updated_at order are still seen by the next sync
+SYNC_OVERLAP = timedelta(seconds=60)
+
+_PENDING_KEY = 'leaderboard_scores'
+
+class SortedBoard:
+    """Positive scores as a sorted array of (-score, user_id), best first"""
+
+    def __init__(self, scores=()):
+        self._keys = sorted((-score, user_id) for user_id, score in scores if score > 0)
+        self._scores = {user_id: -key for key, user_id in self._keys}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def set(self, user_id, score):
+        """Move a user to a new score (0 takes them off the board)"""
+        old = self._scores.pop(user_id, None)
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, user_id))]
+        if score > 0:
+            insort(self._keys, (-score, user_id))
+            self._scores[user_id] = score
+
+    def rank(self, user_id):
+        """(rank, score) of a user or None; equal scores share a rank"""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        # (-score,) sorts before every key with that score
+        return bisect_left(self._keys, (-score,)) + 1, score
+
+    def top(self, limit):
+        """[(rank, user_id, score)] of the best limit users"""
+        entries = []
+        for index, (key, user_id) in enumerate(self._keys[:limit]):
+            rank = entries[-1][0] if entries and entries[-1][2] == -key else index + 1
+            entries.append((rank, user_id, -key))
+        return entries
+
+class Leaderboards:
+    """Per-app global and weekly boards kept in step with user_stats"""
+
+    def __init__(self, app):
+        self.sync_interval = app.config['LEADERBOARD_SYNC_INTERVAL']
+        self._boards = None
+        self._week = None
+        self._synced_until = None
+        self._next_sync = 0
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def _rows(self, *criteria):
+        return db.session.execute(select(
+            UserStat.user_id, UserStat.total_xp, UserStat.weekly_xp, UserStat.xp_week, UserStat.updated_at
+        ).where(*criteria)).all()
+
+    def _load(self, now):
+        """Build both boards from every user_stats row"""
+        week = week_start(now.date())
+        rows = self._rows()
+        boards = {
+            BOARD_GLOBAL: SortedBoard((user_id, total_xp) for user_id, total_xp, _, _, _ in rows),
+            BOARD_WEEKLY: SortedBoard(
+                (user_id, weekly_xp) for user_id, _, weekly_xp, xp_week, _ in rows if xp_week == week
+            )
+        }
+        with self._lock:
+            self._boards = boards
+            self._week = week
+        self._synced_until = max((updated_at for *_, updated_at in rows if updated_at), default=now)
+
+    def _sync(self):
+        """Pull scores committed by other processes, reloading on a new week"""
+        now = datetime.utcnow()
+        if self._boards is None or week_start(now.date()) != self._week:
+            self._load(now)
+            return
+
+        rows = self._rows(UserStat.updated_at >= self._synced_until - SYNC_OVERLAP)
+        self.apply(row[:4] for row in rows)
+        self._synced_until = max([self._synced_until] + [row.updated_at for row in rows if row.updated_at])
+
+    def _maybe_sync(self):
+        if time.monotonic() < self._next_sync:
+            return
+        # One thread syncs; the others carry on with the current boards
+        if not self._sync_lock.acquire(blocking=self._boards is None):
+            return
+        try:
+            if time.monotonic() >= self._next_sync:
+                self._sync()
+                self._next_sync = time.monotonic() + self.sync_interval
+        finally:
+            self._sync_lock.release()
+
+    def apply(self, scores):
+        """Apply (user_id, total_xp, weekly_xp, xp_week) tuples; ignored until loaded"""
+        with self._lock:
+            if self._boards is None:
+                return
+            for user_id, total_xp, weekly_xp, xp_week in scores:
+                self._boards[BOARD_GLOBAL].set(user_id, total_xp)
+                self._boards[BOARD_WEEKLY].set(user_id, weekly_xp if xp_week == self._week else 0)
+
+    def standings(self, board, user_id, limit):
+        """
+        Top of a board plus one user's position
+
+        Returns:
+            Tuple of (top entries, (rank, score) of user_id or None, users on
+            the board, week the weekly board covers)
+        """
+        self._maybe_sync()
+        with self._lock:
+            scores = self._boards[board]
+            return scores.top(limit), scores.rank(user_id), len(scores), self._week
+
+def init_leaderboards(app):
+    """Create the app's leaderboards (loaded on first use)"""
+    app.extensions['leaderboards'] = Leaderboards(app)
+
+def get_leaderboards():
+    return current_app.extensions['leaderboards']
+
+@event.listens_for(UserStat, 'after_insert')
+@event.listens_for(UserStat, 'after_update')
+def _user_stat_written(mapper, connection, target):
+    # Held until the transaction commits so rolled-back XP never ranks
+    pending = object_session(target).info.setdefault(_PENDING_KEY, {})
+    pending[target.user_id] = (target.user_id, target.total_xp, target.weekly_xp, target.xp_week)
+
+@event.listens_for(Session, 'after_commit')
+def _apply_committed_scores(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending and has_app_context():
+        boards = current_app.extensions.get('leaderboards')
+        if boards is not None:
+            boards.apply(pending.values())
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_scores(session):
+    session.info.pop(_PENDING_KEY, None)
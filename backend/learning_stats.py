@@ -0,0 +1,196 @@
+"""
+Learning statistics for GET /api/stats.
+
+Words learned per day come from the review event log (see review_events.py):
+distinct words with a learned event per day, plus the same count stored for
+days already rolled up by compact_review_events.py. Unlearning a word later does
+not rewrite that history. Week and month buckets are re-grouped from the day
+buckets in memory. Streaks are the ones kept in user_stats (see
+gamification.py), so they match GET /api/stats/gamification. Difficulty
+counts come from two grouped queries over distinct word ids, so a word in
+several libraries counts once, like total_learned.
+
+Results are cached per user (STATS_CACHE_SIZE users, at most STATS_CACHE_TTL
+seconds and never across a date change). Routes that change a user's words or
+learned state call invalidate_user_stats() after committing, and the review
+event buffer does so after each flush.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from itertools import groupby
+from flask import current_app
+from sqlalchemy import func, distinct, select, union
+from models import db, Library, LibraryWord, Word, CatalogWord, ReviewEvent, ReviewDailyLearned, UserStat
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+def learned_per_day(user_id):
+    """[(date, words learned)] in date order, from raw and compacted learned events"""
+    per_day = dict(db.session.query(ReviewDailyLearned.day, ReviewDailyLearned.learned_words).filter(
+        ReviewDailyLearned.user_id == user_id
+    ).all())
+
+    day = func.date(ReviewEvent.ts)
+    recent = db.session.query(day, func.count(distinct(ReviewEvent.word_id))).filter(
+        ReviewEvent.user_id == user_id,
+        ReviewEvent.outcome == ReviewEvent.OUTCOME_LEARNED
+    ).group_by(day)
+    for value, count in recent:
+        day_value = datetime.strptime(value, '%Y-%m-%d').date()
+        per_day[day_value] = per_day.get(day_value, 0) + count
+
+    return sorted(per_day.items())
+
+def total_learned(user_id):
+    """Distinct words the user has learned in any library"""
+    return db.session.query(func.count(distinct(LibraryWord.word_id))).join(
+        Library, LibraryWord.library_id == Library.id
+    ).filter(
+        Library.user_id == user_id,
+        LibraryWord.is_learned == True
+    ).scalar() or 0
+
+def bucket_counts(days, key):
+    """Re-group a sorted per-day series into coarser buckets"""
+    return [
+        (bucket, sum(count for _, count in entries))
+        for bucket, entries in groupby(days, key=lambda entry: key(entry[0]))
+    ]
+
+def streaks(user_id, today):
+    """(current, longest) study streaks from the user's user_stats row"""
+    stat = db.session.get(UserStat, user_id)
+    if stat is None:
+        return 0, 0
+    return stat.streak_on(today), stat.longest_streak
+
+def difficulty_breakdown(user_id):
+    """Per difficulty: distinct words in the user's libraries and how many are learned"""
+    breakdown = {difficulty: {'word_count': 0, 'learned_count': 0} for difficulty in DIFFICULTIES}
+
+    own_words = select(LibraryWord.word_id.label('word_id')).join(
+        Library, LibraryWord.library_id == Library.id
+    ).where(Library.user_id == user_id)
+    catalog_words = select(CatalogWord.word_id).join(
+        Library, Library.catalog_id == CatalogWord.catalog_id
+    ).where(Library.user_id == user_id)
+    # UNION (not UNION ALL) leaves each word id once
+    word_ids = union(own_words, catalog_words).subquery()
+
+    word_rows = db.session.query(Word.difficulty, func.count(Word.id)).join(
+        word_ids, word_ids.c.word_id == Word.id
+    ).group_by(Word.difficulty)
+
+    learned_rows = db.session.query(Word.difficulty, func.count(distinct(LibraryWord.word_id))).join(
+        LibraryWord, LibraryWord.word_id == Word.id
+    ).join(
+        Library, LibraryWord.library_id == Library.id
+    ).filter(
+        Library.user_id == user_id,
+        LibraryWord.is_learned == True
+    ).group_by(Word.difficulty)
+
+    for difficulty, word_count in word_rows:
+        entry = breakdown.setdefault(difficulty or 'medium', {'word_count': 0, 'learned_count': 0})
+        entry['word_count'] += word_count
+    for difficulty, learned_count in learned_rows:
+        entry = breakdown.setdefault(difficulty or 'medium', {'word_count': 0, 'learned_count': 0})
+        entry['learned_count'] += learned_count
+
+    return [dict(entry, difficulty=difficulty) for difficulty, entry in breakdown.items()]
+
+def compute_user_stats(user_id, today=None):
+    """Build the GET /api/stats payload for a user"""
+    today = today or datetime.utcnow().date()
+    days = learned_per_day(user_id)
+    current_streak, longest_streak = streaks(user_id, today)
+
+    libraries = Library.query.filter_by(user_id=user_id).order_by(Library.id).all()
+
+    return {
+        'generated_for': today.isoformat(),
+        'total_learned': total_learned(user_id),
+        'current_streak': current_streak,
+        'longest_streak': longest_streak,
+        'learned_per_day': [
+            {'date': day.isoformat(), 'count': count} for day, count in days
+        ],
+        'learned_per_week': [
+            {'week_start': week.isoformat(), 'count': count}
+            for week, count in bucket_counts(days, lambda day: day - timedelta(days=day.weekday()))
+        ],
+        'learned_per_month': [
+            {'month': month, 'count': count}
+            for month, count in bucket_counts(days, lambda day: day.strftime('%Y-%m'))
+        ],
+        'libraries': [
+            {
+                'id': library.id,
+                'name': library.name,
+                'is_master': library.is_master,
+                'word_count': library.word_count,
+                'learned_count': library.learned_count
+            }
+            for library in libraries
+        ],
+        'difficulties': difficulty_breakdown(user_id)
+    }
+
+class StatsCache:
+    """Thread-safe LRU of user_id -> (stats, computed_at) with a TTL"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, today):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            stats, computed_at = entry
+            if computed_at + self.ttl <= time.monotonic() or stats['generated_for'] != today.isoformat():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return stats
+
+    def put(self, user_id, stats):
+        with self._lock:
+            self._entries[user_id] = (stats, time.monotonic())
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+def _get_cache(app=None):
+    app = app or current_app
+    cache = app.extensions.get('stats_cache')
+    if cache is None:
+        cache = app.extensions.setdefault('stats_cache', StatsCache(
+            max_size=app.config['STATS_CACHE_SIZE'],
+            ttl=app.config['STATS_CACHE_TTL']
+        ))
+    return cache
+
+def get_user_stats(user_id):
+    """Cached stats for a user, computed on a miss"""
+    today = datetime.utcnow().date()
+    cache = _get_cache()
+    stats = cache.get(user_id, today)
+    if stats is None:
+        stats = compute_user_stats(user_id, today)
+        cache.put(user_id, stats)
+    return stats
+
+def invalidate_user_stats(user_id, app=None):
+    """Drop a user's cached stats after a progress write"""
+    _get_cache(app).invalidate(user_id)
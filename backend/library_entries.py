@@ -0,0 +1,125 @@
+"""
+Library entries: the words a library contains, stored or virtual.
+
+A library holds its own library_words rows plus, if it references a catalog
+(see catalog.py), every catalog word it has no row for. Such virtual entries
+are unlearned and come back as (Word, None) pairs. Recording progress on one
+materializes a from_catalog row with materialize_library_word().
+"""
+
+from sqlalchemy import and_, or_, exists, select, null, union_all
+from sqlalchemy.exc import IntegrityError
+from models import db, Library, Word, LibraryWord, CatalogWord
+
+def in_catalog(catalog_id):
+    """EXISTS clause: the Word in the query belongs to catalog_id (a value or column)"""
+    return exists().where(and_(
+        CatalogWord.catalog_id == catalog_id,
+        CatalogWord.word_id == Word.id
+    ))
+
+def lacks_override():
+    """The library joined as Library has no row for the CatalogWord in the query"""
+    return ~exists().where(and_(
+        LibraryWord.library_id == Library.id,
+        LibraryWord.word_id == CatalogWord.word_id
+    ))
+
+def uses_catalog(libraries):
+    """Whether any of the libraries references a catalog"""
+    return any(library.catalog_id for library in libraries)
+
+def entries_query(*library_filters, include_catalog=True):
+    """
+    Query (Word, LibraryWord or None) entries of the libraries matching the filters
+
+    With include_catalog=False only stored rows are returned, which is the
+    cheaper plan for libraries without a catalog. Otherwise the entries are the
+    stored rows UNION ALL the catalog words the library has no row for, so the
+    cost follows the library and its catalog rather than the whole words table.
+    """
+    query = db.session.query(Word, LibraryWord)
+    if not include_catalog:
+        return query.join(
+            LibraryWord, LibraryWord.word_id == Word.id
+        ).join(
+            Library, LibraryWord.library_id == Library.id
+        ).filter(*library_filters)
+
+    stored_entries = select(
+        LibraryWord.word_id.label('word_id'),
+        LibraryWord.library_id.label('library_id'),
+        LibraryWord.id.label('library_word_id')
+    ).join(
+        Library, LibraryWord.library_id == Library.id
+    ).where(*library_filters)
+    virtual = select(
+        CatalogWord.word_id,
+        Library.id,
+        null()
+    ).join(
+        CatalogWord, CatalogWord.catalog_id == Library.catalog_id
+    ).where(
+        *library_filters,
+        lacks_override()
+    )
+    entries = union_all(stored_entries, virtual).subquery('entries')
+
+    return query.select_from(entries).join(
+        Word, Word.id == entries.c.word_id
+    ).join(
+        Library, Library.id == entries.c.library_id
+    ).outerjoin(
+        LibraryWord, LibraryWord.id == entries.c.library_word_id
+    )
+
+def unlearned_filter():
+    """Filter for entries_query() rows that are unlearned, including virtual ones"""
+    return or_(LibraryWord.id.is_(None), LibraryWord.is_learned == False)
+
+def entry_dict(word, library_word):
+    """Serialize an entry the way word listings always have"""
+    word_dict = word.to_dict()
+    word_dict['is_learned'] = library_word.is_learned if library_word else False
+    word_dict['learned_at'] = library_word.learned_at.isoformat() if library_word and library_word.learned_at else None
+    word_dict['added_at'] = library_word.added_at.isoformat() if library_word and library_word.added_at else None
+    word_dict['library_word_id'] = library_word.id if library_word else None
+    return word_dict
+
+def is_catalog_word(library, word_id):
+    """Whether the library includes word_id through its catalog"""
+    if not library.catalog_id:
+        return False
+    return db.session.query(exists().where(and_(
+        CatalogWord.catalog_id == library.catalog_id,
+        CatalogWord.word_id == word_id
+    ))).scalar()
+
+def find_library_word(user_id, library_id, word_id, materialize=False):
+    """
+    Stored LibraryWord for a word in one of the user's libraries
+
+    With materialize=True a catalog word without a row gets a from_catalog
+    progress row (flushed, not committed). Returns None if the library is not
+    the user's or does not contain the word.
+    """
+    library_word = db.session.query(LibraryWord).join(Library).filter(
+        LibraryWord.word_id == word_id,
+        LibraryWord.library_id == library_id,
+        Library.user_id == user_id
+    ).first()
+    if library_word or not materialize:
+        return library_word
+
+    library = Library.query.filter_by(id=library_id, user_id=user_id).first()
+    if not library or not is_catalog_word(library, word_id):
+        return None
+
+    library_word = LibraryWord(library_id=library.id, word_id=word_id, is_learned=False, from_catalog=True)
+    try:
+        with db.session.begin_nested():
+            db.session.add(library_word)
+    except IntegrityError:
+        # A concurrent request materialized the same row first
+        library_word = LibraryWord.query.filter_by(library_id=library.id, word_id=word_id).first()
+    return library_word
@@ -2,13 +2,34 @@
 """
 Script to migrate GRE vocabulary from existing databases and CSV files
 into the Master Library for all users.
+
+Word ids are resolved once and published as the shared GRE catalog (see
+catalog.py). Users are then handled in id-ordered batches: each batch's Master
+Libraries are pointed at the catalog with a few set-based statements, and
+previously materialized rows without progress are dropped. Nothing is copied
+per user, so the cost no longer grows with users x words.
+
+Usage:
+    python migrate_gre_words.py [--start-user-id N] [--end-user-id N] [--batch-size N]
 """
 
+import argparse
 import sqlite3
-import csv
 import re
-from models import db, User, Library, Word, LibraryWord
+import time
+from datetime import datetime
+from sqlalchemy import select, text, and_, inspect, table, column
+from models import db, User, Library, Word, Catalog, CatalogWord
 from app import create_app
+from csv_column_detector import CSVColumnDetector, read_csv_rows
+from word_import import LOOKUP_CHUNK_SIZE
+from catalog import get_or_create_catalog, add_catalog_words, attach_catalog
+
+# Users whose Master Libraries are migrated per transaction
+USER_BATCH_SIZE = 500
+
+# Temp table holding the resolved word ids for the run
+staged_words = table('migration_words', column('word_id'), schema='temp')
 
 def clean_html_tags(text):
     """Remove HTML tags from text"""
@@ -25,14 +46,23 @@ def parse_csv_words():
     """Parse words from the GRE master wordlist CSV"""
     words = []
     try:
-        with open('gre_master_wordlist.csv', 'r', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            next(reader)  # Skip header
+        with open('gre_master_wordlist.csv', 'r', encoding='utf-8-sig', newline='') as file:
+            # The wordlist is tab-separated; sniff it rather than assuming commas
+            detector = CSVColumnDetector()
+            word_column, meaning_column, analysis_info = detector.detect_columns(detector.read_sample(file))
+            if not word_column or not meaning_column:
+                print("Error reading CSV: could not detect word and meaning columns")
+                return words
+
+            file.seek(0)
+            fieldnames, rows = read_csv_rows(file, analysis_info['dialect'])
+            word_index = fieldnames.index(word_column)
+            meaning_index = fieldnames.index(meaning_column)
             
-            for row in reader:
-                if len(row) >= 2:
-                    word = clean_html_tags(row[0]).strip()
-                    meaning = clean_html_tags(row[1]).strip()
+            for _, row in rows:
+                if len(row) > max(word_index, meaning_index):
+                    word = clean_html_tags(row[word_index]).strip()
+                    meaning = clean_html_tags(row[meaning_index]).strip()
                     
                     # Skip empty or invalid entries
                     if not word or not meaning or len(word) < 2:
@@ -46,8 +76,6 @@ def parse_csv_words():
                         'word': word,
                         'meaning': meaning,
                         'pronunciation': '',
-                        'synonym': '',
-                        'antonym': '',
                         'example': '',
                         'difficulty': 'medium'
                     })
@@ -60,7 +88,8 @@ def parse_sqlite_words():
     """Parse words from the GRE words SQLite database"""
     words = []
     try:
-        conn = sqlite3.connect('gre_words.db')
+        # Read-only, so a missing database is reported instead of created empty
+        conn = sqlite3.connect('file:gre_words.db?mode=ro', uri=True)
         cursor = conn.cursor()
         
         # Get all words from the database
@@ -89,8 +118,6 @@ def parse_sqlite_words():
                 'word': word,
                 'meaning': meaning,
                 'pronunciation': '',
-                'synonym': '',
-                'antonym': '',
                 'example': '',
                 'difficulty': 'hard'  # GRE words are typically harder
             })
@@ -101,112 +128,184 @@ def parse_sqlite_words():
     
     return words
 
-def migrate_words_to_master_libraries():
-    """Migrate GRE words to all users' Master Libraries"""
+def load_source_words():
+    """Combine and deduplicate words from both sources, keyed by lowercased word"""
+    csv_words = parse_csv_words()
+    sqlite_words = parse_sqlite_words()
+    
+    print(f"Found {len(csv_words)} words from CSV")
+    print(f"Found {len(sqlite_words)} words from SQLite")
+    
+    all_words = {}
+    
+    # Add CSV words first (they might be cleaner)
+    for word_data in csv_words:
+        all_words.setdefault(word_data['word'].lower(), word_data)
+    
+    # Add SQLite words (won't overwrite existing)
+    for word_data in sqlite_words:
+        all_words.setdefault(word_data['word'].lower(), word_data)
+    
+    print(f"Total unique words after deduplication: {len(all_words)}")
+    return all_words
+
+def _find_word_ids(connection, word_texts):
+    found = {}
+    word_texts = list(word_texts)
+    for start in range(0, len(word_texts), LOOKUP_CHUNK_SIZE):
+        chunk = word_texts[start:start + LOOKUP_CHUNK_SIZE]
+        rows = connection.execute(
+            select(Word.word, Word.id).where(Word.word.in_(chunk)).order_by(Word.id.desc())
+        )
+        for word_text, word_id in rows:
+            found[word_text] = word_id
+    return found
+
+def resolve_word_ids(connection, all_words, now):
+    """
+    Map every source word to a words.id, inserting the missing ones with one executemany
+
+    Returns:
+        Tuple of (word ids, number of words inserted)
+    """
+    word_ids = _find_word_ids(connection, all_words)
+    new_words = [
+        dict(word_data, word=word_text, created_at=now)
+        for word_text, word_data in all_words.items()
+        if word_text not in word_ids
+    ]
+    if new_words:
+        connection.execute(Word.__table__.insert(), new_words)
+        word_ids.update(_find_word_ids(connection, (row['word'] for row in new_words)))
+    return sorted(set(word_ids.values())), len(new_words)
+
+def ensure_catalog_schema(connection):
+    """Create the catalog tables and columns on databases that predate them"""
+    db.metadata.create_all(bind=connection, tables=[Catalog.__table__, CatalogWord.__table__])
+
+    inspector = inspect(connection)
+    library_columns = {col['name'] for col in inspector.get_columns('libraries')}
+    if 'catalog_id' not in library_columns:
+        connection.exec_driver_sql("ALTER TABLE libraries ADD COLUMN catalog_id INTEGER REFERENCES catalogs(id)")
+        connection.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_libraries_catalog_id ON libraries (catalog_id)")
+    library_word_columns = {col['name'] for col in inspector.get_columns('library_words')}
+    if 'from_catalog' not in library_word_columns:
+        connection.exec_driver_sql("ALTER TABLE library_words ADD COLUMN from_catalog BOOLEAN NOT NULL DEFAULT 0")
+
+def stage_word_ids(connection, word_ids):
+    """Load the word ids into a temp table so each batch can join against them"""
+    connection.exec_driver_sql("DROP TABLE IF EXISTS temp.migration_words")
+    connection.exec_driver_sql("CREATE TEMP TABLE migration_words (word_id INTEGER PRIMARY KEY)")
+    connection.execute(
+        text("INSERT INTO temp.migration_words (word_id) VALUES (:word_id)"),
+        [{'word_id': word_id} for word_id in word_ids]
+    )
+
+def ensure_master_libraries(connection, user_ids, now):
+    """Create a Master Library for each user in the batch that lacks one"""
+    with_master = select(Library.user_id).where(
+        Library.user_id.in_(user_ids),
+        Library.is_master == True
+    )
+    has_master = set(connection.execute(with_master).scalars())
+    missing = [user_id for user_id in user_ids if user_id not in has_master]
+    if missing:
+        connection.execute(Library.__table__.insert(), [
+            {
+                'user_id': user_id,
+                'name': "Master Library",
+                'description': "Complete GRE vocabulary collection",
+                'is_master': True,
+                'word_count': 0,
+                'learned_count': 0,
+                'created_at': now,
+                'updated_at': now
+            }
+            for user_id in missing
+        ])
+    return len(missing)
+
+def migrate_words_to_master_libraries(start_user_id=None, end_user_id=None, batch_size=USER_BATCH_SIZE):
+    """
+    Migrate GRE words to all users' Master Libraries through the shared catalog
+
+    Users are processed in id order, batch_size at a time, and each batch is
+    committed on its own. An interrupted run can be resumed with the
+    start_user_id printed in the progress output.
+    """
     app = create_app()
     
     with app.app_context():
         print("Starting GRE vocabulary migration...")
-        
-        # Parse words from both sources
-        csv_words = parse_csv_words()
-        sqlite_words = parse_sqlite_words()
-        
-        print(f"Found {len(csv_words)} words from CSV")
-        print(f"Found {len(sqlite_words)} words from SQLite")
-        
-        # Combine and deduplicate words
-        all_words = {}
-        
-        # Add CSV words first (they might be cleaner)
-        for word_data in csv_words:
-            word_key = word_data['word'].lower()
-            all_words[word_key] = word_data
-        
-        # Add SQLite words (won't overwrite existing)
-        for word_data in sqlite_words:
-            word_key = word_data['word'].lower()
-            if word_key not in all_words:
-                all_words[word_key] = word_data
-        
-        print(f"Total unique words after deduplication: {len(all_words)}")
-        
-        # Get all users
-        users = User.query.all()
-        print(f"Found {len(users)} users")
-        
-        words_added = 0
-        words_skipped = 0
-        
-        for user in users:
-            print(f"Processing user: {user.username}")
-            
-            # Find or create Master Library for this user
-            master_library = Library.query.filter_by(
-                user_id=user.id, 
-                is_master=True
-            ).first()
-            
-            if not master_library:
-                master_library = Library(
-                    user_id=user.id,
-                    name="Master Library",
-                    description="Complete GRE vocabulary collection",
-                    is_master=True
-                )
-                db.session.add(master_library)
-                db.session.flush()  # Get the ID
-            
-            # Add words to the Master Library
-            for word_data in all_words.values():
-                # Check if word already exists for this user
-                existing_word = Word.query.filter_by(
-                    word=word_data['word']
-                ).first()
-                
-                if not existing_word:
-                    # Create new word
-                    new_word = Word(
-                        word=word_data['word'],
-                        meaning=word_data['meaning'],
-                        pronunciation=word_data['pronunciation'],
-                        synonym=word_data['synonym'],
-                        antonym=word_data['antonym'],
-                        example=word_data['example'],
-                        difficulty=word_data['difficulty']
-                    )
-                    db.session.add(new_word)
-                    db.session.flush()  # Get the ID
-                    word_id = new_word.id
-                    words_added += 1
-                else:
-                    word_id = existing_word.id
-                    words_skipped += 1
-                
-                # Check if word is already in this library
-                existing_library_word = LibraryWord.query.filter_by(
-                    library_id=master_library.id,
-                    word_id=word_id
-                ).first()
-                
-                if not existing_library_word:
-                    # Add word to library
-                    library_word = LibraryWord(
-                        library_id=master_library.id,
-                        word_id=word_id,
-                        is_learned=False
-                    )
-                    db.session.add(library_word)
-        
-        # Commit all changes
-        try:
-            db.session.commit()
-            print(f"Migration completed successfully!")
+        all_words = load_source_words()
+        if not all_words:
+            print("No words to migrate.")
+            return
+
+        now = datetime.utcnow()
+        users = select(User.id).order_by(User.id)
+        if start_user_id is not None:
+            users = users.where(User.id >= start_user_id)
+        if end_user_id is not None:
+            users = users.where(User.id <= end_user_id)
+
+        # One connection for the whole run so the temp staging table stays visible
+        with db.engine.connect() as connection:
+            ensure_catalog_schema(connection)
+            word_ids, words_added = resolve_word_ids(connection, all_words, now)
+            stage_word_ids(connection, word_ids)
+
+            catalog_id = get_or_create_catalog(
+                connection,
+                app.config['DEFAULT_CATALOG_NAME'],
+                'Complete GRE vocabulary collection'
+            )
+            catalog_added = add_catalog_words(connection, catalog_id, select(staged_words.c.word_id))
+            connection.commit()
             print(f"Words added: {words_added}")
-            print(f"Words skipped (already existed): {words_skipped}")
-        except Exception as e:
-            db.session.rollback()
-            print(f"Error during migration: {e}")
+            print(f"Words skipped (already existed): {len(word_ids) - words_added}")
+            print(f"Words added to the shared catalog: {catalog_added}")
+
+            user_ids = list(connection.execute(users).scalars())
+            print(f"Found {len(user_ids)} users")
+
+            users_done = 0
+            rows_removed = 0
+            started = time.perf_counter()
+
+            for start in range(0, len(user_ids), batch_size):
+                batch = user_ids[start:start + batch_size]
+                try:
+                    libraries_created = ensure_master_libraries(connection, batch, now)
+                    removed = attach_catalog(connection, catalog_id, and_(
+                        Library.is_master == True,
+                        Library.user_id.between(batch[0], batch[-1])
+                    ))
+                    connection.commit()
+                except Exception as e:
+                    connection.rollback()
+                    print(f"Error during migration: {e}")
+                    print(f"Resume with: --start-user-id {batch[0]}")
+                    return
+
+                users_done += len(batch)
+                rows_removed += removed
+                print(f"Users {batch[0]}-{batch[-1]}: {removed} materialized rows replaced by the catalog, "
+                      f"{libraries_created} master libraries created "
+                      f"({users_done}/{len(user_ids)} users, {time.perf_counter() - started:.1f}s)")
+
+            print(f"Migration completed successfully!")
+            print(f"Master library rows replaced by the catalog: {rows_removed}")
+
+def main():
+    """Parse the user-id range and batch size, then run the migration"""
+    parser = argparse.ArgumentParser(description="Add the GRE vocabulary to every user's Master Library")
+    parser.add_argument('--start-user-id', type=int, help='First user id to process (to resume a run)')
+    parser.add_argument('--end-user-id', type=int, help='Last user id to process')
+    parser.add_argument('--batch-size', type=int, default=USER_BATCH_SIZE, help='Users per transaction')
+    args = parser.parse_args()
+
+    migrate_words_to_master_libraries(args.start_user_id, args.end_user_id, args.batch_size)
 
 if __name__ == "__main__":
-    migrate_words_to_master_libraries()
+    main()
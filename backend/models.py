@@ -1,8 +1,14 @@
 from datetime import datetime
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
+from sqlalchemy import func, case, event, inspect, DDL
+from sqlalchemy.orm import attributes, object_session
+from sqlalchemy.orm.util import identity_key
 from werkzeug.security import generate_password_hash, check_password_hash
+import json
 import uuid
+from password_hashing import run_hashing, needs_rehash
 
 db = SQLAlchemy()
 bcrypt = Bcrypt()
@@ -23,19 +29,27 @@ class User(db.Model):
     # Relationships
     libraries = db.relationship('Library', backref='user', lazy=True, cascade='all, delete-orphan')
     stories = db.relationship('Story', backref='user', lazy=True, cascade='all, delete-orphan')
+    user_stat = db.relationship('UserStat', uselist=False, lazy=True, cascade='all, delete-orphan')
 
     def set_password(self, password):
-        """Hash and set password"""
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        """Hash and set password (on the hashing pool, at BCRYPT_LOG_ROUNDS)"""
+        rounds = current_app.config['BCRYPT_LOG_ROUNDS']
+        self.password_hash = run_hashing(bcrypt.generate_password_hash, password, rounds).decode('utf-8')
 
     def check_password(self, password):
-        """Check if provided password matches hash"""
-        return bcrypt.check_password_hash(self.password_hash, password)
+        """Check if provided password matches hash (on the hashing pool)"""
+        return run_hashing(bcrypt.check_password_hash, self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """Whether the stored hash uses an outdated work factor"""
+        return needs_rehash(self.password_hash)
 
     def update_last_login(self):
-        """Update last login timestamp"""
-        self.last_login = datetime.utcnow()
-        db.session.commit()
+        """Update last login timestamp (written in batches by activity_buffer.py)"""
+        now = datetime.utcnow()
+        # Shown right away without dirtying the session; the buffer does the write
+        attributes.set_committed_value(self, 'last_login', now)
+        current_app.extensions['activity_buffer'].record(self.id, 'last_login', now)
 
     def to_dict(self):
         """Convert user to dictionary for JSON response"""
@@ -59,8 +73,20 @@ class Library(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Denormalized counters kept in sync by the LibraryWord event hooks below
+    # (run reconcile_library_counters.py to recompute them in bulk)
+    word_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    learned_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # Shared read-only word list this library includes without materializing rows.
+    # Counters cover catalog words too; see catalog.py and library_entries.py
+    catalog_id = db.Column(db.Integer, db.ForeignKey('catalogs.id'), index=True)
+
     # Relationships
     library_words = db.relationship('LibraryWord', backref='library', lazy=True, cascade='all, delete-orphan')
+    daily_words = db.relationship('WordOfTheDay', backref='library', lazy=True, cascade='all, delete-orphan')
+    import_jobs = db.relationship('ImportJob', backref='library', lazy=True, cascade='all, delete-orphan')
+    review_schedules = db.relationship('ReviewSchedule', backref='library', lazy=True, cascade='all, delete-orphan')
 
     def get_word_count(self):
         """Get total number of words in this library using efficient count query"""
@@ -74,16 +100,124 @@ class Library(db.Model):
         """Get number of unlearned words in this library using efficient count query"""
         return db.session.query(LibraryWord).filter_by(library_id=self.id, is_learned=False).count()
 
-    def to_dict(self, include_words=True):
-        """Convert library to dictionary for JSON response"""
+    def get_counts(self):
+        """Get word, learned and unlearned counts from the denormalized counters"""
+        word_count = self.word_count or 0
+        learned_count = self.learned_count or 0
+        return {
+            'word_count': word_count,
+            'learned_count': learned_count,
+            'unlearned_count': word_count - learned_count
+        }
+
+    @staticmethod
+    def adjust_counters(connection, library_id, words=0, learned=0, session=None):
+        """
+        Apply a delta to a library's denormalized counters with a single UPDATE.
+
+        Bulk writes that bypass the ORM (executemany, INSERT ... SELECT) must call
+        this themselves; ORM inserts, deletes and learned-state changes of
+        LibraryWord rows are handled by the event hooks. Pass the session to
+        also patch a Library instance already loaded in it.
+        """
+        if not words and not learned:
+            return
+        table = Library.__table__
+        connection.execute(
+            table.update().where(table.c.id == library_id).values(
+                word_count=table.c.word_count + words,
+                learned_count=table.c.learned_count + learned,
+                updated_at=table.c.updated_at  # counter changes are not library edits
+            )
+        )
+
+        library = session.identity_map.get(identity_key(Library, library_id)) if session else None
+        if library is None:
+            return
+        # Only patch counters that are already loaded; expired ones reload from the row
+        state = library.__dict__
+        if 'word_count' in state:
+            attributes.set_committed_value(library, 'word_count', (state['word_count'] or 0) + words)
+        if 'learned_count' in state:
+            attributes.set_committed_value(library, 'learned_count', (state['learned_count'] or 0) + learned)
+
+    @staticmethod
+    def empty_counts():
+        """Counts for a library without any words"""
+        return {'word_count': 0, 'learned_count': 0, 'unlearned_count': 0}
+
+    @staticmethod
+    def get_summaries(library_ids=None, user_id=None):
+        """
+        Get per-library word totals with grouped queries over library_words
+        and catalog_words.
+
+        These are the authoritative counts the denormalized counters are
+        reconciled against. Libraries that reference a catalog count every
+        catalog word plus their own rows; override rows for catalog words only
+        contribute their learned state.
+
+        Filters by explicit library ids, by owning user, or both. Libraries
+        without any words are absent from the result; use empty_counts() for them.
+
+        Returns:
+            Dict of library_id -> {'word_count', 'learned_count', 'unlearned_count'}
+        """
+        learned = func.sum(case((LibraryWord.is_learned == True, 1), else_=0))
+        own = func.sum(case((LibraryWord.from_catalog == True, 0), else_=1))
+        query = db.session.query(
+            LibraryWord.library_id,
+            own,
+            learned
+        )
+
+        if user_id is not None:
+            query = query.join(Library, LibraryWord.library_id == Library.id).filter(
+                Library.user_id == user_id
+            )
+        if library_ids is not None:
+            query = query.filter(LibraryWord.library_id.in_(library_ids))
+
+        totals = {}
+        for library_id, word_count, learned_count in query.group_by(LibraryWord.library_id):
+            totals[library_id] = [int(word_count or 0), int(learned_count or 0)]
+
+        catalog_query = db.session.query(Library.id, func.count(CatalogWord.id)).join(
+            CatalogWord, CatalogWord.catalog_id == Library.catalog_id
+        )
+        if user_id is not None:
+            catalog_query = catalog_query.filter(Library.user_id == user_id)
+        if library_ids is not None:
+            catalog_query = catalog_query.filter(Library.id.in_(library_ids))
+        for library_id, catalog_count in catalog_query.group_by(Library.id):
+            totals.setdefault(library_id, [0, 0])[0] += catalog_count
+
+        summaries = {}
+        for library_id, (word_count, learned_count) in totals.items():
+            summaries[library_id] = {
+                'word_count': word_count,
+                'learned_count': learned_count,
+                'unlearned_count': word_count - learned_count
+            }
+        return summaries
+
+    def to_dict(self, include_words=True, counts=None):
+        """
+        Convert library to dictionary for JSON response
+
+        Pass precomputed counts (see get_summaries) to avoid querying them per library.
+        """
+        if counts is None:
+            counts = self.get_counts()
+
         result = {
             'id': self.id,
             'name': self.name,
             'description': self.description,
             'is_master': self.is_master,
-            'word_count': self.get_word_count(),
-            'learned_count': self.get_learned_count(),
-            'unlearned_count': self.get_unlearned_count(),
+            'word_count': counts['word_count'],
+            'learned_count': counts['learned_count'],
+            'unlearned_count': counts['unlearned_count'],
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -117,6 +251,7 @@ class Word(db.Model):
 
     # Relationships
     library_words = db.relationship('LibraryWord', backref='word', lazy=True, cascade='all, delete-orphan')
+    daily_words = db.relationship('WordOfTheDay', backref='word', lazy=True, cascade='all, delete-orphan')
 
     def to_dict(self):
         """Convert word to dictionary for JSON response"""
@@ -130,6 +265,28 @@ class Word(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+# Full-text index mirroring words (SQLite FTS5, external content). Triggers keep it
+# in sync with every insert/update/delete, including bulk Core writes; see
+# word_search.py for querying and create_word_search_index.py for existing databases
+WORDS_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS words_fts USING fts5("
+    "word, meaning, example, content='words', content_rowid='id', tokenize='unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS words_fts_ai AFTER INSERT ON words BEGIN "
+    "INSERT INTO words_fts(rowid, word, meaning, example) VALUES (new.id, new.word, new.meaning, new.example); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS words_fts_ad AFTER DELETE ON words BEGIN "
+    "INSERT INTO words_fts(words_fts, rowid, word, meaning, example) VALUES ('delete', old.id, old.word, old.meaning, old.example); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS words_fts_au AFTER UPDATE ON words BEGIN "
+    "INSERT INTO words_fts(words_fts, rowid, word, meaning, example) VALUES ('delete', old.id, old.word, old.meaning, old.example); "
+    "INSERT INTO words_fts(rowid, word, meaning, example) VALUES (new.id, new.word, new.meaning, new.example); "
+    "END",
+]
+
+for _statement in WORDS_FTS_DDL:
+    event.listen(Word.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+event.listen(Word.__table__, 'before_drop', DDL("DROP TABLE IF EXISTS words_fts").execute_if(dialect='sqlite'))
+
 class LibraryWord(db.Model):
     """Association table for many-to-many relationship between libraries and words"""
     __tablename__ = 'library_words'
@@ -137,9 +294,15 @@ class LibraryWord(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     library_id = db.Column(db.Integer, db.ForeignKey('libraries.id'), nullable=False)
     word_id = db.Column(db.Integer, db.ForeignKey('words.id'), nullable=False)
-    is_learned = db.Column(db.Boolean, default=False)
+    # active_history so the counter hook always sees the previous learned state
+    is_learned = db.column_property(db.Column(db.Boolean, default=False), active_history=True)
     learned_at = db.Column(db.DateTime)
     added_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Progress row for a word the library already includes through its catalog;
+    # it carries learned state only and is not counted as an added word
+    from_catalog = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
+    # 1..n within the library, kept dense by triggers (see LIBRARY_WORD_POSITION_DDL)
+    position = db.Column(db.Integer)
 
     # Unique constraint to prevent duplicate words in same library + performance indexes
     __table_args__ = (
@@ -147,19 +310,23 @@ class LibraryWord(db.Model):
         db.Index('idx_library_words_library_id', 'library_id'),
         db.Index('idx_library_words_word_id', 'word_id'),
         db.Index('idx_library_words_learned', 'library_id', 'is_learned'),
+        db.Index('idx_library_words_word_learned', 'word_id', 'is_learned'),
+        db.Index('idx_library_words_position', 'library_id', 'position', unique=True),
     )
 
-    def mark_as_learned(self):
+    def mark_as_learned(self, commit=True):
         """Mark word as learned"""
         self.is_learned = True
         self.learned_at = datetime.utcnow()
-        db.session.commit()
+        if commit:
+            db.session.commit()
 
-    def mark_as_unlearned(self):
+    def mark_as_unlearned(self, commit=True):
         """Mark word as unlearned"""
         self.is_learned = False
         self.learned_at = None
-        db.session.commit()
+        if commit:
+            db.session.commit()
 
     def to_dict(self):
         """Convert library word to dictionary for JSON response"""
@@ -172,6 +339,287 @@ class LibraryWord(db.Model):
             'added_at': self.added_at.isoformat() if self.added_at else None
         }
 
+# Dense per-library positions for random sampling (see word_sampling.py). A new row
+# takes the next position; a deleted row's position is taken over by the library's
+# last row, so positions stay exactly 1..n. Both are indexed lookups, and as
+# triggers they also cover bulk Core writes; see create_library_word_positions.py
+# for existing databases
+LIBRARY_WORD_POSITION_DDL = [
+    "CREATE TRIGGER IF NOT EXISTS library_words_position_ai AFTER INSERT ON library_words BEGIN "
+    "UPDATE library_words SET position = ("
+    "SELECT coalesce(max(position), 0) + 1 FROM library_words WHERE library_id = new.library_id"
+    ") WHERE id = new.id; "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS library_words_position_ad AFTER DELETE ON library_words BEGIN "
+    "UPDATE library_words SET position = old.position "
+    "WHERE library_id = old.library_id AND position > old.position AND position = ("
+    "SELECT max(position) FROM library_words WHERE library_id = old.library_id"
+    "); "
+    "END",
+]
+
+for _statement in LIBRARY_WORD_POSITION_DDL:
+    event.listen(LibraryWord.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+
+def _sync_library_counters(connection, target, words=0, learned=0):
+    """Update the library counters and any loaded Library instance in the session"""
+    Library.adjust_counters(connection, target.library_id, words=words, learned=learned,
+                            session=object_session(target))
+
+@event.listens_for(LibraryWord, 'after_insert')
+def _library_word_inserted(mapper, connection, target):
+    words = 0 if target.from_catalog else 1
+    _sync_library_counters(connection, target, words=words, learned=1 if target.is_learned else 0)
+
+@event.listens_for(LibraryWord, 'after_delete')
+def _library_word_deleted(mapper, connection, target):
+    words = 0 if target.from_catalog else -1
+    _sync_library_counters(connection, target, words=words, learned=-1 if target.is_learned else 0)
+
+@event.listens_for(LibraryWord, 'after_update')
+def _library_word_updated(mapper, connection, target):
+    history = inspect(target).attrs.is_learned.history
+    if not history.has_changes():
+        return
+    was_learned = bool(history.deleted[0]) if history.deleted else False
+    delta = int(bool(target.is_learned)) - int(was_learned)
+    _sync_library_counters(connection, target, learned=delta)
+
+class Catalog(db.Model):
+    """Shared read-only word list that libraries include by reference (see catalog.py)"""
+    __tablename__ = 'catalogs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    description = db.Column(db.Text)
+    # Denormalized number of catalog_words rows, maintained by catalog.py
+    word_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Relationships
+    catalog_words = db.relationship('CatalogWord', backref='catalog', lazy=True, cascade='all, delete-orphan')
+    libraries = db.relationship('Library', backref='catalog', lazy=True)
+
+class CatalogWord(db.Model):
+    """Membership of a word in a catalog"""
+    __tablename__ = 'catalog_words'
+
+    id = db.Column(db.Integer, primary_key=True)
+    catalog_id = db.Column(db.Integer, db.ForeignKey('catalogs.id'), nullable=False)
+    word_id = db.Column(db.Integer, db.ForeignKey('words.id'), nullable=False)
+    added_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('catalog_id', 'word_id', name='unique_catalog_word'),
+        db.Index('idx_catalog_words_word_id', 'word_id'),
+    )
+
+class WordOfTheDay(db.Model):
+    """Cached word of the day, one row per library per day (see word_of_the_day.py)"""
+    __tablename__ = 'word_of_the_day'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    library_id = db.Column(db.Integer, db.ForeignKey('libraries.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    word_id = db.Column(db.Integer, db.ForeignKey('words.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('library_id', 'day', name='unique_library_day'),
+        db.Index('idx_word_of_the_day_user_day', 'user_id', 'day'),
+    )
+
+class ReviewSchedule(db.Model):
+    """SM-2 spaced-repetition state of one word in one library (see spaced_repetition.py)"""
+    __tablename__ = 'review_schedules'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    library_id = db.Column(db.Integer, db.ForeignKey('libraries.id'), nullable=False)
+    word_id = db.Column(db.Integer, db.ForeignKey('words.id'), nullable=False)
+    ease = db.Column(db.Float, nullable=False, default=2.5)
+    interval = db.Column(db.Integer, nullable=False, default=0)  # Days until the next review
+    reps = db.Column(db.Integer, nullable=False, default=0)  # Successful reviews in a row
+    due_at = db.Column(db.DateTime, nullable=False)
+    last_reviewed_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    word = db.relationship('Word')
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'library_id', 'word_id', name='unique_review_schedule'),
+        # The due queue is a range scan over this index
+        db.Index('idx_review_schedules_user_due', 'user_id', 'due_at'),
+        # Counts the new cards introduced today
+        db.Index('idx_review_schedules_user_created', 'user_id', 'created_at'),
+    )
+
+    def to_dict(self):
+        """Convert schedule to dictionary for JSON response"""
+        return {
+            'word_id': self.word_id,
+            'library_id': self.library_id,
+            'ease': round(self.ease, 2),
+            'interval': self.interval,
+            'reps': self.reps,
+            'due_at': self.due_at.isoformat() if self.due_at else None,
+            'last_reviewed_at': self.last_reviewed_at.isoformat() if self.last_reviewed_at else None
+        }
+
+class ReviewEvent(db.Model):
+    """Append-only log of learning events, written in batches (see review_events.py)"""
+    __tablename__ = 'review_events'
+
+    OUTCOME_LEARNED = 'learned'
+    OUTCOME_UNLEARNED = 'unlearned'
+    OUTCOME_GRADE = 'grade_{}'  # SM-2 review graded 0-5
+
+    # Plain ids rather than foreign keys: the log outlives deleted libraries
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    word_id = db.Column(db.Integer, nullable=False)
+    library_id = db.Column(db.Integer, nullable=False)
+    outcome = db.Column(db.String(16), nullable=False)
+    latency_ms = db.Column(db.Integer)
+    ts = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_review_events_user_ts', 'user_id', 'ts'),
+        db.Index('idx_review_events_ts', 'ts'),
+    )
+
+class ReviewDailyStat(db.Model):
+    """Review events of one day rolled up by compact_review_events.py"""
+    __tablename__ = 'review_daily_stats'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    library_id = db.Column(db.Integer, nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    outcome = db.Column(db.String(16), nullable=False)
+    event_count = db.Column(db.Integer, nullable=False, default=0)
+    latency_count = db.Column(db.Integer, nullable=False, default=0)  # Events that reported a latency
+    total_latency_ms = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'library_id', 'day', 'outcome', name='unique_review_daily_stat'),
+    )
+
+class ReviewDailyLearned(db.Model):
+    """Distinct words a user learned on a day rolled up by compact_review_events.py"""
+    __tablename__ = 'review_daily_learned'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    # Same measure as learned_per_day() takes from raw events, across all libraries
+    learned_words = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', name='unique_review_daily_learned'),
+    )
+
+class ImportJob(db.Model):
+    """Background CSV import into a library (see import_jobs.py)"""
+    __tablename__ = 'import_jobs'
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+
+    id = db.Column(db.Integer, primary_key=True)
+    public_id = db.Column(db.String(50), unique=True, nullable=False, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    library_id = db.Column(db.Integer, db.ForeignKey('libraries.id'), nullable=False)
+    filename = db.Column(db.String(255))
+    file_path = db.Column(db.String(500))
+    word_column = db.Column(db.String(200))
+    meaning_column = db.Column(db.String(200))
+    status = db.Column(db.String(20), nullable=False, default=STATUS_QUEUED)
+    rows_done = db.Column(db.Integer, nullable=False, default=0)
+    words_added = db.Column(db.Integer, nullable=False, default=0)
+    words_skipped = db.Column(db.Integer, nullable=False, default=0)
+    error_count = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.Text)  # JSON list of per-row error messages (capped)
+    failure_reason = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # Last progress commit of a running job
+
+    def get_errors(self):
+        """Stored per-row error messages"""
+        return json.loads(self.errors) if self.errors else []
+
+    def to_dict(self):
+        """Convert import job to dictionary for JSON response"""
+        return {
+            'id': self.public_id,
+            'library_id': self.library_id,
+            'filename': self.filename,
+            'status': self.status,
+            'rows_done': self.rows_done,
+            'words_added': self.words_added,
+            'words_skipped': self.words_skipped,
+            'error_count': self.error_count,
+            'errors': self.get_errors(),
+            'failure_reason': self.failure_reason,
+            'detected_columns': {
+                'word_column': self.word_column,
+                'meaning_column': self.meaning_column
+            },
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class RevokedToken(db.Model):
+    """Logged-out JWT, rejected until it would have expired (see token_revocation.py)"""
+    __tablename__ = 'revoked_tokens'
+
+    jti = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    token_type = db.Column(db.String(10), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+class UserStat(db.Model):
+    """XP, level and achievements of a user, maintained incrementally (see gamification.py)"""
+    __tablename__ = 'user_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    total_xp = db.Column(db.Integer, nullable=False, default=0)
+    level = db.Column(db.Integer, nullable=False, default=1)
+    level_xp = db.Column(db.Integer, nullable=False, default=0)  # XP earned within the current level
+    weekly_xp = db.Column(db.Integer, nullable=False, default=0)  # XP earned in the week starting xp_week
+    xp_week = db.Column(db.Date)
+    # Counters the achievement rules are evaluated against
+    words_learned = db.Column(db.Integer, nullable=False, default=0)
+    max_words_learned = db.Column(db.Integer, nullable=False, default=0)  # Word XP is only paid above this
+    stories_created = db.Column(db.Integer, nullable=False, default=0)
+    current_streak = db.Column(db.Integer, nullable=False, default=0)
+    longest_streak = db.Column(db.Integer, nullable=False, default=0)
+    last_study_day = db.Column(db.Date)
+    achievements = db.Column(db.Text)  # JSON object of achievement id -> unlocked_at
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Leaderboards pick up rows changed by other processes through this index
+        db.Index('idx_user_stats_updated_at', 'updated_at'),
+    )
+
+    def get_achievements(self):
+        """Unlocked achievement ids mapped to their ISO unlock time"""
+        return json.loads(self.achievements) if self.achievements else {}
+
+    def streak_on(self, day):
+        """current_streak as of day: a streak not continued yesterday or today has lapsed"""
+        if self.last_study_day is None or (day - self.last_study_day).days > 1:
+            return 0
+        return self.current_streak
+
 class Story(db.Model):
     """Story model for storing user-generated stories"""
     __tablename__ = 'stories'
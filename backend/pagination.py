@@ -0,0 +1,50 @@
+import base64
+import binascii
+import json
+from typing import Optional, Tuple
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+def encode_cursor(*values) -> str:
+    """Encode the sort key of the last row on a page into an opaque cursor"""
+    raw = json.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str, types: Tuple[type, ...]) -> Tuple:
+    """
+    Decode an opaque cursor back into its sort key values
+
+    Args:
+        cursor: Cursor produced by encode_cursor
+        types: Expected type of each sort key value, in order
+
+    Raises:
+        InvalidCursor: if the cursor is malformed or its values don't match types
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidCursor('Invalid cursor')
+
+    if not isinstance(values, list) or len(values) != len(types):
+        raise InvalidCursor('Invalid cursor')
+    for value, expected in zip(values, types):
+        # bool is an int subclass but never a valid sort key
+        if isinstance(value, bool) or not isinstance(value, expected):
+            raise InvalidCursor('Invalid cursor')
+    return tuple(values)
+
+def keyset_pagination(limit: int, rows_fetched: int, after: Optional[str],
+                      next_cursor: Optional[str], total: Optional[int]) -> dict:
+    """Build the pagination block for a cursor-paginated response"""
+    return {
+        'mode': 'cursor',
+        'limit': limit,
+        'after': after,
+        'next_cursor': next_cursor,
+        'has_next': rows_fetched > limit,
+        'has_prev': bool(after),
+        'total': total
+    }
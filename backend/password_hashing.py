@@ -0,0 +1,83 @@
+"""
+Password hashing off the request thread.
+
+bcrypt is deliberately slow, and a burst of logins used to run that work on
+every request worker at once. Hashes and checks now run on a small shared
+thread pool (bcrypt releases the GIL, so PASSWORD_HASH_WORKERS bounds the CPU
+spent on them). At most PASSWORD_HASH_QUEUE_LIMIT further calls may wait for a
+worker; beyond that PasswordHashingBusy is raised so the route can answer 503
+at once instead of piling up requests.
+
+The pool bounds CPU only: the calling request thread still blocks on the
+result, so a web worker stays held for the whole hash. To avoid spending one
+on a request that would be turned away anyway, the auth routes call
+ensure_hashing_capacity() before reading the body.
+
+The work factor is BCRYPT_LOG_ROUNDS. Hashes made with another cost are
+reported by needs_rehash() and replaced on the next successful login.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+
+class PasswordHashingBusy(Exception):
+    """Every hashing worker is busy and the wait queue is full"""
+
+_executor = None
+_slots = None
+_executor_lock = threading.Lock()
+
+def _get_executor(app):
+    """Create the shared hashing pool and its admission semaphore on first use"""
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            workers = app.config['PASSWORD_HASH_WORKERS']
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+            _slots = threading.BoundedSemaphore(workers + app.config['PASSWORD_HASH_QUEUE_LIMIT'])
+    return _executor, _slots
+
+def ensure_hashing_capacity():
+    """
+    Fail fast when the pool and its queue are full
+
+    Only a snapshot: run_hashing() may still raise PasswordHashingBusy if the
+    last slot is taken in between.
+
+    Raises:
+        PasswordHashingBusy: if no hashing slot is free right now
+    """
+    _, slots = _get_executor(current_app)
+    if not slots.acquire(blocking=False):
+        raise PasswordHashingBusy()
+    slots.release()
+
+def run_hashing(func, *args):
+    """
+    Run a bcrypt call on the hashing pool and wait for its result
+
+    Raises:
+        PasswordHashingBusy: if the pool and its queue are full
+    """
+    executor, slots = _get_executor(current_app)
+    if not slots.acquire(blocking=False):
+        raise PasswordHashingBusy()
+    try:
+        future = executor.submit(func, *args)
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return future.result()
+
+def hash_cost(password_hash):
+    """Work factor of a bcrypt hash such as $2b$12$..., or None if unreadable"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+def needs_rehash(password_hash):
+    """Whether a stored hash was made with a cost other than BCRYPT_LOG_ROUNDS"""
+    return hash_cost(password_hash) != current_app.config['BCRYPT_LOG_ROUNDS']
@@ -0,0 +1,85 @@
+"""
+Account provisioning.
+
+Registration creates the user, their Master Library and the optional starter
+word set in a single transaction. The Master Library references the shared
+catalog (see catalog.py) and the starter set is copied from a template
+library with one INSERT ... SELECT, so signup costs the same number of
+statements whatever the size of either list.
+"""
+
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select, and_, exists, literal
+from models import db, User, Library, LibraryWord, CatalogWord
+from catalog import attach_default_catalog
+
+MASTER_LIBRARY_NAME = 'Master Library'
+MASTER_LIBRARY_DESCRIPTION = 'Your main vocabulary collection'
+
+def copy_template_words(library, template_library_id, now=None):
+    """
+    Copy a template library's words into an empty library in one INSERT ... SELECT
+
+    Words the library already includes through its catalog are left out.
+    Progress is not copied. Returns the number of rows added.
+    """
+    now = now or datetime.utcnow()
+    template_words = select(
+        literal(library.id),
+        LibraryWord.word_id,
+        literal(False),
+        literal(now)
+    ).where(
+        LibraryWord.library_id == template_library_id
+    )
+    if library.catalog_id:
+        template_words = template_words.where(~exists().where(and_(
+            CatalogWord.catalog_id == library.catalog_id,
+            CatalogWord.word_id == LibraryWord.word_id
+        )))
+
+    connection = db.session.connection()
+    added = connection.execute(
+        LibraryWord.__table__.insert().from_select(
+            ['library_id', 'word_id', 'is_learned', 'added_at'], template_words
+        )
+    ).rowcount
+
+    Library.adjust_counters(connection, library.id, words=added, session=db.session)
+    return added
+
+def provision_user(username, email, password):
+    """
+    Create a user with their Master Library and starter words (the caller commits)
+
+    The starter set comes from the library configured as
+    STARTER_TEMPLATE_LIBRARY_ID, if any.
+
+    Returns:
+        Tuple of (user, master_library)
+    """
+    user = User(
+        username=username,
+        email=email
+    )
+    user.set_password(password)
+    db.session.add(user)
+    db.session.flush()
+
+    master_library = Library(
+        user_id=user.id,
+        name=MASTER_LIBRARY_NAME,
+        description=MASTER_LIBRARY_DESCRIPTION,
+        is_master=True
+    )
+    # Include the shared GRE catalog by reference instead of copying its words
+    attach_default_catalog(master_library)
+    db.session.add(master_library)
+    db.session.flush()
+
+    template_library_id = current_app.config.get('STARTER_TEMPLATE_LIBRARY_ID')
+    if template_library_id:
+        copy_template_words(master_library, template_library_id)
+
+    return user, master_library
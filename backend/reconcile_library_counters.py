@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Recompute the denormalized word_count / learned_count columns on libraries.
+
+The counters are maintained incrementally by the LibraryWord event hooks in
+models.py. This script adds the columns to databases created before they
+existed, recomputes every library's totals with one grouped query, reports any
+drift and writes the corrected values back in a single executemany. The
+words_learned counters in user_stats, maintained incrementally by
+gamification.py, are recounted the same way.
+
+Usage:
+    python reconcile_library_counters.py            # fix drift
+    python reconcile_library_counters.py --dry-run  # only report drift
+"""
+
+import sys
+from sqlalchemy import text, inspect, bindparam
+from app import app, db
+from models import Library
+from gamification import reconcile_words_learned
+
+COUNTER_COLUMNS = ('word_count', 'learned_count')
+
+def ensure_counter_columns():
+    """Add the counter columns to an existing libraries table if they are missing"""
+    existing = {col['name'] for col in inspect(db.engine).get_columns('libraries')}
+    added = []
+    for column in COUNTER_COLUMNS:
+        if column not in existing:
+            db.session.execute(text(
+                f"ALTER TABLE libraries ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0"
+            ))
+            added.append(column)
+    db.session.commit()
+    return added
+
+def reconcile_library_counters(dry_run=False, library_ids=None):
+    """
+    Compare stored counters with the actual library_words totals.
+
+    Returns:
+        List of (library_id, stored_counts, actual_counts) for libraries that drifted
+    """
+    actual = Library.get_summaries(library_ids)
+
+    query = db.session.query(Library.id, Library.word_count, Library.learned_count)
+    if library_ids is not None:
+        query = query.filter(Library.id.in_(library_ids))
+
+    drift = []
+    for library_id, word_count, learned_count in query:
+        stored = (word_count or 0, learned_count or 0)
+        counts = actual.get(library_id, Library.empty_counts())
+        expected = (counts['word_count'], counts['learned_count'])
+        if stored != expected:
+            drift.append((library_id, stored, expected))
+
+    if drift and not dry_run:
+        table = Library.__table__
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('library_id')).values(
+                word_count=bindparam('new_word_count'),
+                learned_count=bindparam('new_learned_count'),
+                updated_at=table.c.updated_at
+            ),
+            [
+                {
+                    'library_id': library_id,
+                    'new_word_count': expected[0],
+                    'new_learned_count': expected[1]
+                }
+                for library_id, _, expected in drift
+            ]
+        )
+        db.session.commit()
+
+    return drift
+
+def main():
+    """Main reconciliation function"""
+    dry_run = '--dry-run' in sys.argv
+
+    with app.app_context():
+        try:
+            added = ensure_counter_columns()
+            if added:
+                print(f"Added missing columns: {', '.join(added)}")
+
+            drift = reconcile_library_counters(dry_run=dry_run)
+
+            for library_id, stored, expected in drift:
+                print(f"Library {library_id}: stored words={stored[0]} learned={stored[1]}, "
+                      f"actual words={expected[0]} learned={expected[1]}")
+
+            if not drift:
+                print("All library counters are in sync.")
+            elif dry_run:
+                print(f"{len(drift)} libraries have drifted counters (dry run, nothing written).")
+            else:
+                print(f"Corrected counters for {len(drift)} libraries.")
+
+            stat_drift = reconcile_words_learned(dry_run=dry_run)
+
+            for user_id, stored, expected in stat_drift:
+                print(f"User {user_id}: stored words_learned={stored}, actual={expected}")
+
+            if not stat_drift:
+                print("All user words_learned counters are in sync.")
+            elif dry_run:
+                print(f"{len(stat_drift)} users have a drifted words_learned (dry run, nothing written).")
+            else:
+                print(f"Corrected words_learned for {len(stat_drift)} users.")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error reconciling library counters: {e}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Buffered review event log.
+
+Learn / unlearn flips and SM-2 grades are appended to review_events so
+learning behaviour can be analysed after is_learned has been overwritten.
+Requests only append to an in-memory list; a background thread (see
+buffered_writer.py) writes it with one executemany INSERT every
+REVIEW_EVENT_FLUSH_INTERVAL seconds or as soon as REVIEW_EVENT_FLUSH_SIZE
+events are pending, and at interpreter shutdown.
+Events are recorded after the request's own commit, so rolled-back changes are
+never logged, and a failed flush is only logged: it can never turn a committed
+request into an error. While writes keep failing at most
+REVIEW_EVENT_MAX_PENDING events are kept, dropping the oldest.
+
+compact_review_events.py rolls old events up into review_daily_stats.
+"""
+
+from datetime import datetime
+from flask import current_app
+from models import ReviewEvent
+from learning_stats import invalidate_user_stats
+from buffered_writer import BufferedWriter, register_buffer
+
+class ReviewEventBuffer(BufferedWriter):
+    """Pending review events of one app, written in batches"""
+
+    label = 'Review event'
+
+    def __init__(self, app):
+        super().__init__(app, app.config['REVIEW_EVENT_FLUSH_INTERVAL'], app.config['REVIEW_EVENT_FLUSH_SIZE'])
+        self.max_pending = app.config['REVIEW_EVENT_MAX_PENDING']
+        self._pending = []
+
+    def record(self, events):
+        """Buffer event dicts, waking the flush thread if the buffer is full"""
+        with self._lock:
+            self._pending.extend(events)
+            self._drop_overflow()
+            count = len(self._pending)
+        self._recorded(count)
+
+    def _take(self):
+        events, self._pending = self._pending, []
+        return events
+
+    def _write(self, connection, events):
+        """One executemany INSERT"""
+        connection.execute(ReviewEvent.__table__.insert(), events)
+        return len(events)
+
+    def _requeue(self, events):
+        self._pending[:0] = events
+        self._drop_overflow()
+
+    def _written(self, events):
+        # GET /api/stats reads learned days from this log
+        for user_id in {event['user_id'] for event in events}:
+            invalidate_user_stats(user_id, self.app)
+
+    def _drop_overflow(self):
+        """Drop the oldest events beyond max_pending; caller holds _lock"""
+        overflow = len(self._pending) - self.max_pending
+        if overflow > 0:
+            del self._pending[:overflow]
+            self.app.logger.warning(f'Review event backlog full, dropped {overflow} oldest events')
+
+def init_review_events(app):
+    """Create the app's review event buffer and flush it at shutdown"""
+    return register_buffer(app, 'review_events', ReviewEventBuffer(app))
+
+def review_event(user_id, word_id, library_id, outcome, latency_ms=None, ts=None):
+    """Build an event dict for record_review_events()"""
+    return {
+        'user_id': user_id,
+        'word_id': word_id,
+        'library_id': library_id,
+        'outcome': outcome,
+        'latency_ms': latency_ms,
+        'ts': ts or datetime.utcnow()
+    }
+
+def parse_latency(value):
+    """latency_ms sent by a client, or None unless it is a non-negative integer"""
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        return None
+    return value
+
+def record_review_events(*events):
+    """Queue events for the current app's next flush"""
+    current_app.extensions['review_events'].record(events)
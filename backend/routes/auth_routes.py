@@ -1,9 +1,14 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity, get_jwt, decode_token
 from marshmallow import ValidationError
-from models import User, Library, db
+from sqlalchemy.exc import IntegrityError
+from models import User, db
 from schemas import UserRegistrationSchema, UserLoginSchema
 from auth import validate_user_input, check_user_exists
+from provisioning import provision_user
+from password_hashing import PasswordHashingBusy, ensure_hashing_capacity
+from token_revocation import revoke_token, apply_revocations
+from user_cache import load_authenticated_user
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
@@ -28,6 +33,9 @@ def handle_options():
 def register():
     """Register a new user"""
     try:
+        # Answer 503 before reading the body if no hashing slot is free
+        ensure_hashing_capacity()
+
         # Get JSON data
         data = request.get_json()
         if not data:
@@ -65,25 +73,18 @@ def register():
                 'error': error_msg
             }), 409
 
-        # Create new user
-        user = User(
-            username=username,
-            email=email
-        )
-        user.set_password(validated_data['password'])
-
-        db.session.add(user)
-        db.session.commit()
-
-        # Create default Master Library for the user
-        master_library = Library(
-            user_id=user.id,
-            name='Master Library',
-            description='Your main vocabulary collection',
-            is_master=True
-        )
-        db.session.add(master_library)
-        db.session.commit()
+        # Create the user, their Master Library and starter words in one transaction
+        try:
+            user, master_library = provision_user(username, email, validated_data['password'])
+            db.session.commit()
+        except IntegrityError:
+            # Lost a race with a concurrent registration for the same name or email
+            db.session.rollback()
+            exists, error_msg = check_user_exists(username=username, email=email)
+            return jsonify({
+                'success': False,
+                'error': error_msg or 'User already exists'
+            }), 409
 
         # Generate tokens
         access_token = create_access_token(identity=user.public_id)
@@ -99,6 +100,13 @@ def register():
             }
         }), 201
 
+    except PasswordHashingBusy:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': 'Server is busy, please try again shortly'
+        }), 503, {'Retry-After': '1'}
+
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -112,6 +120,9 @@ def login():
     """Login user"""
     try:
         print("=== LOGIN REQUEST RECEIVED ===")
+        # Answer 503 before reading the body if no hashing slot is free
+        ensure_hashing_capacity()
+
         # Get JSON data
         data = request.get_json()
         print(f"Login data: {data}")
@@ -158,6 +169,11 @@ def login():
                 'error': 'Account is deactivated'
             }), 401
 
+        # Upgrade hashes made with an outdated work factor while we have the password
+        if user.password_needs_rehash():
+            user.set_password(password)
+            db.session.commit()
+
         # Update last login
         user.update_last_login()
 
@@ -175,6 +191,13 @@ def login():
             }
         }), 200
 
+    except PasswordHashingBusy:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': 'Server is busy, please try again shortly'
+        }), 503, {'Retry-After': '1'}
+
     except Exception as e:
         return jsonify({
             'success': False,
@@ -245,8 +268,44 @@ def get_current_user():
 @auth_bp.route('/logout', methods=['POST'])
 @jwt_required()
 def logout():
-    """Logout user (client-side token removal)"""
-    return jsonify({
-        'success': True,
-        'message': 'Logout successful. Please remove the token from client storage.'
-    }), 200
+    """Logout user by revoking the access token (and the refresh token, if sent)"""
+    try:
+        access_token = get_jwt()
+        identity = get_jwt_identity()
+        user = load_authenticated_user(identity)
+        user_id = user.id if user else None
+
+        tokens = [access_token]
+        data = request.get_json(silent=True) or {}
+        if data.get('refresh_token'):
+            try:
+                refresh_token = decode_token(data['refresh_token'])
+            except Exception:
+                return jsonify({
+                    'success': False,
+                    'error': 'Invalid refresh token'
+                }), 400
+            if refresh_token[current_app.config['JWT_IDENTITY_CLAIM']] != identity:
+                return jsonify({
+                    'success': False,
+                    'error': 'Refresh token belongs to another user'
+                }), 400
+            tokens.append(refresh_token)
+
+        for token in tokens:
+            revoke_token(token, user_id=user_id)
+        db.session.commit()
+        apply_revocations(tokens)
+
+        return jsonify({
+            'success': True,
+            'message': 'Logout successful. Please remove the token from client storage.'
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': 'Logout failed',
+            'details': str(e)
+        }), 500
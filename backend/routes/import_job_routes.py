@@ -0,0 +1,74 @@
+from flask import Blueprint, request, jsonify
+from models import ImportJob
+from auth import token_required
+
+import_job_bp = Blueprint('import_jobs', __name__, url_prefix='/api/import-jobs')
+
+@import_job_bp.after_request
+def after_request(response):
+    """Add CORS headers to all responses"""
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+    response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    return response
+
+@import_job_bp.route('', methods=['OPTIONS'])
+@import_job_bp.route('/<job_id>', methods=['OPTIONS'])
+def handle_options(job_id=None):
+    """Handle preflight OPTIONS requests"""
+    return jsonify({'success': True}), 200
+
+@import_job_bp.route('', methods=['GET'])
+@token_required
+def get_import_jobs(current_user):
+    """Get the current user's most recent import jobs"""
+    try:
+        limit = min(request.args.get('limit', 20, type=int), 100)
+
+        jobs = ImportJob.query.filter_by(user_id=current_user.id).order_by(
+            ImportJob.created_at.desc()
+        ).limit(limit).all()
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'jobs': [job.to_dict() for job in jobs]
+            }
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Failed to fetch import jobs',
+            'details': str(e)
+        }), 500
+
+@import_job_bp.route('/<job_id>', methods=['GET'])
+@token_required
+def get_import_job(current_user, job_id):
+    """Get the progress of an import job"""
+    try:
+        job = ImportJob.query.filter_by(
+            public_id=job_id,
+            user_id=current_user.id
+        ).first()
+
+        if not job:
+            return jsonify({
+                'success': False,
+                'error': 'Import job not found'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'job': job.to_dict()
+            }
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Failed to fetch import job',
+            'details': str(e)
+        }), 500
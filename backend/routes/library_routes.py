@@ -1,13 +1,26 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import ValidationError
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy import and_, or_, exists, tuple_
 from models import User, Library, Word, LibraryWord, db
 from schemas import LibrarySchema
 from auth import token_required
+from pagination import InvalidCursor, encode_cursor, decode_cursor, keyset_pagination
+from word_search import word_search_filter
+from word_import import BulkWordImporter, csv_entry_batches
+from import_jobs import create_import_job, new_upload_path
+from learning_stats import invalidate_user_stats
+from gamification import record_learning
+from library_entries import entries_query, entry_dict, in_catalog
 
 library_bp = Blueprint('library', __name__, url_prefix='/api/libraries')
 
+# Libraries holding more than limit * KEYSET_INDEX_WALK_FACTOR words are paged by
+# walking the words.word index and probing membership; smaller ones are cheaper
+# to read through the library_words index and sort
+KEYSET_INDEX_WALK_FACTOR = 20
+
 @library_bp.after_request
 def after_request(response):
     """Add CORS headers to all responses"""
@@ -32,21 +45,8 @@ def get_libraries(current_user):
             Library.is_master.desc(), Library.created_at.asc()
         ).all()
 
-        # Convert libraries to dict without loading all words (performance optimization)
-        libraries_data = []
-        for library in libraries:
-            library_dict = {
-                'id': library.id,
-                'name': library.name,
-                'description': library.description,
-                'is_master': library.is_master,
-                'word_count': library.get_word_count(),
-                'learned_count': library.get_learned_count(),
-                'unlearned_count': library.get_unlearned_count(),
-                'created_at': library.created_at.isoformat() if library.created_at else None,
-                'updated_at': library.updated_at.isoformat() if library.updated_at else None
-            }
-            libraries_data.append(library_dict)
+        # Counts come from the denormalized counter columns, so this is a pure row read
+        libraries_data = [library.to_dict(include_words=False) for library in libraries]
 
         return jsonify({
             'success': True,
@@ -107,6 +107,7 @@ def create_library(current_user):
 
         db.session.add(library)
         db.session.commit()
+        invalidate_user_stats(current_user.id)
 
         return jsonify({
             'success': True,
@@ -145,61 +146,43 @@ def get_library(current_user, library_id):
         per_page = request.args.get('per_page', 100, type=int)  # Default 100 words per page
         search = request.args.get('search', '', type=str)
 
+        # Cursor mode: ?after=<cursor>&limit=<n> pages on (word, id) instead of OFFSET
+        after = request.args.get('after')
+        limit = request.args.get('limit', type=int)
+        skip_total = request.args.get('skip_total', 'false').lower() in ('1', 'true', 'yes')
+
         # Limit per_page to prevent abuse
         per_page = min(per_page, 500)
 
         # Build query with eager loading to prevent N+1 queries
-        query = db.session.query(LibraryWord, Word).join(
-            Word, LibraryWord.word_id == Word.id
-        ).filter(
-            LibraryWord.library_id == library_id
-        )
+        # (catalog words without a row come back with library_word None)
+        query = entries_query(Library.id == library_id, include_catalog=bool(library.catalog_id))
 
         # Add search filter if provided
+        search_filter = None
         if search:
-            from sqlalchemy import or_
-            search_filter = or_(
-                Word.word.ilike(f'%{search}%'),
-                Word.meaning.ilike(f'%{search}%'),
-                Word.synonym.ilike(f'%{search}%'),
-                Word.antonym.ilike(f'%{search}%'),
-                Word.example.ilike(f'%{search}%')
-            )
+            search_filter = word_search_filter(search)
             query = query.filter(search_filter)
 
-        # Order by word alphabetically
-        query = query.order_by(Word.word)
-
-        # Apply pagination
-        total_count = query.count()
-        library_words = query.offset((page - 1) * per_page).limit(per_page).all()
-
-        words_data = []
-        for lw, word in library_words:
-            word_dict = word.to_dict()
-            word_dict['is_learned'] = lw.is_learned
-            word_dict['learned_at'] = lw.learned_at.isoformat() if lw.learned_at else None
-            word_dict['added_at'] = lw.added_at.isoformat() if lw.added_at else None
-            word_dict['library_word_id'] = lw.id
-            words_data.append(word_dict)
-
-        # Get library info with efficient counts
-        total_words = library.get_word_count()
-        learned_count = library.get_learned_count()
-        unlearned_count = library.get_unlearned_count()
-
-        library_dict = {
-            'id': library.id,
-            'name': library.name,
-            'description': library.description,
-            'is_master': library.is_master,
-            'word_count': total_words,
-            'learned_count': learned_count,
-            'unlearned_count': unlearned_count,
-            'created_at': library.created_at.isoformat() if library.created_at else None,
-            'updated_at': library.updated_at.isoformat() if library.updated_at else None,
-            'words': words_data,
-            'pagination': {
+        if after is not None or limit is not None:
+            limit = max(1, min(limit or per_page, 500))
+            try:
+                library_words, pagination = _get_keyset_page(
+                    library, query, search_filter, after, limit, skip_total
+                )
+            except InvalidCursor as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+        else:
+            # Order by word alphabetically (id breaks ties so pages are stable)
+            query = query.order_by(Word.word, Word.id)
+
+            # Apply pagination
+            total_count = query.count()
+            library_words = query.offset((page - 1) * per_page).limit(per_page).all()
+            pagination = {
                 'page': page,
                 'per_page': per_page,
                 'total': total_count,
@@ -207,7 +190,13 @@ def get_library(current_user, library_id):
                 'has_next': page * per_page < total_count,
                 'has_prev': page > 1
             }
-        }
+
+        words_data = [entry_dict(word, lw) for word, lw in library_words]
+
+        # Library info; counts come from the denormalized word_count / learned_count columns
+        library_dict = library.to_dict(include_words=False)
+        library_dict['words'] = words_data
+        library_dict['pagination'] = pagination
 
         return jsonify({
             'success': True,
@@ -223,6 +212,57 @@ def get_library(current_user, library_id):
             'details': str(e)
         }), 500
 
+def _get_keyset_page(library, query, search_filter, after, limit, skip_total):
+    """
+    Fetch one page of (Word, LibraryWord) entries ordered by (word, id) after a cursor
+
+    Returns:
+        Tuple of (rows, pagination dict)
+    """
+    total_count = None if skip_total else query.count()
+    cursor_filter = None
+    if after:
+        after_word, after_id = decode_cursor(after, (str, int))
+        cursor_filter = tuple_(Word.word, Word.id) > (after_word, after_id)
+
+    if (library.word_count or 0) > limit * KEYSET_INDEX_WALK_FACTOR:
+        # Drive from the words.word index so the page costs the same at any depth
+        in_library = exists().where(and_(
+            LibraryWord.library_id == library.id,
+            LibraryWord.word_id == Word.id
+        ))
+        if library.catalog_id:
+            in_library = or_(in_library, in_catalog(library.catalog_id))
+        word_query = db.session.query(Word).filter(in_library)
+        if search_filter is not None:
+            word_query = word_query.filter(search_filter)
+        if cursor_filter is not None:
+            word_query = word_query.filter(cursor_filter)
+        words = word_query.order_by(Word.word, Word.id).limit(limit + 1).all()
+
+        library_words_by_word = {}
+        if words:
+            library_words_by_word = {
+                lw.word_id: lw for lw in LibraryWord.query.filter(
+                    LibraryWord.library_id == library.id,
+                    LibraryWord.word_id.in_([word.id for word in words])
+                )
+            }
+        rows = [(word, library_words_by_word.get(word.id)) for word in words]
+    else:
+        if cursor_filter is not None:
+            query = query.filter(cursor_filter)
+        rows = query.order_by(Word.word, Word.id).limit(limit + 1).all()
+
+    rows_fetched = len(rows)
+    rows = rows[:limit]
+    next_cursor = None
+    if rows_fetched > limit:
+        last_word = rows[-1][0]
+        next_cursor = encode_cursor(last_word.word, last_word.id)
+
+    return rows, keyset_pagination(limit, rows_fetched, after, next_cursor, total_count)
+
 @library_bp.route('/<int:library_id>', methods=['PUT'])
 @token_required
 def update_library(current_user, library_id):
@@ -282,6 +322,7 @@ def update_library(current_user, library_id):
         library.description = validated_data.get('description')
 
         db.session.commit()
+        invalidate_user_stats(current_user.id)
 
         return jsonify({
             'success': True,
@@ -322,8 +363,13 @@ def delete_library(current_user, library_id):
                 'error': 'Cannot delete master library'
             }), 400
 
+        # Words learned only in this library no longer count
+        learned = db.session.query(LibraryWord.word_id).filter_by(library_id=library.id, is_learned=True)
+        changes = [(library.id, word_id, True, False) for word_id, in learned]
         db.session.delete(library)
+        record_learning(current_user.id, changes, studied=False)
         db.session.commit()
+        invalidate_user_stats(current_user.id)
 
         return jsonify({
             'success': True,
@@ -342,7 +388,6 @@ def delete_library(current_user, library_id):
 @token_required
 def upload_csv_to_library(current_user, library_id):
     """Upload CSV file to add words to a library with intelligent column detection"""
-    import csv
     import io
     from csv_column_detector import CSVColumnDetector
 
@@ -380,20 +425,24 @@ def upload_csv_to_library(current_user, library_id):
                 'error': 'File must be a CSV file'
             }), 400
 
-        # Read file content
-        file_content = file.stream.read().decode("UTF8")
+        # Decode the upload lazily; only a bounded prefix is read for column detection
+        text_stream = io.TextIOWrapper(file.stream, encoding='utf-8-sig', newline='')
 
         # Use intelligent column detection
         detector = CSVColumnDetector()
-        word_column, meaning_column, analysis_info = detector.detect_columns(file_content)
+        word_column, meaning_column, analysis_info = detector.detect_columns(
+            detector.read_sample(text_stream)
+        )
 
         if 'error' in analysis_info:
+            text_stream.detach()
             return jsonify({
                 'success': False,
                 'error': analysis_info['error']
             }), 400
 
         if not word_column or not meaning_column:
+            text_stream.detach()
             # Provide helpful suggestions
             suggestions = detector.get_mapping_suggestions(analysis_info['available_columns'])
             return jsonify({
@@ -403,18 +452,40 @@ def upload_csv_to_library(current_user, library_id):
                     'available_columns': analysis_info['available_columns'],
                     'word_suggestions': suggestions['word_suggestions'],
                     'meaning_suggestions': suggestions['meaning_suggestions'],
-                    'analysis': analysis_info['column_scores']
+                    'analysis': analysis_info['column_scores'],
+                    'dialect': analysis_info['dialect']
                 }
             }), 400
 
+        # Large files can be imported in the background (?async=true) and polled
+        if request.args.get('async', 'false').lower() in ('1', 'true', 'yes'):
+            # Copy the raw upload to disk in chunks rather than re-encoding it
+            text_stream.detach()
+            file.stream.seek(0)
+            file_path = new_upload_path(current_app)
+            file.save(file_path)
+
+            job = create_import_job(
+                current_app._get_current_object(),
+                current_user.id,
+                library.id,
+                file.filename,
+                file_path,
+                word_column,
+                meaning_column
+            )
+
+            return jsonify({
+                'success': True,
+                'message': 'CSV import started',
+                'data': {
+                    'job': job.to_dict()
+                }
+            }), 202
+
         # Parse CSV with detected columns
         try:
-            stream = io.StringIO(file_content)
-            csv_reader = csv.DictReader(stream)
-
-            words_added = 0
-            words_skipped = 0
-            errors = []
+            text_stream.seek(0)
 
             # Get master library for auto-sync
             master_library = Library.query.filter_by(
@@ -422,79 +493,22 @@ def upload_csv_to_library(current_user, library_id):
                 is_master=True
             ).first()
 
-            for row_num, row in enumerate(csv_reader, start=2):  # Start at 2 because row 1 is headers
-                try:
-                    # Use detected column names
-                    word_text = row.get(word_column, '').strip().lower()
-                    meaning_text = row.get(meaning_column, '').strip()
-
-                    if not word_text or not meaning_text:
-                        errors.append(f'Row {row_num}: Word and meaning are required')
-                        continue
-
-                    # Check if word already exists
-                    existing_word = Word.query.filter_by(word=word_text).first()
-
-                    if existing_word:
-                        # Check if word is already in this library
-                        existing_library_word = LibraryWord.query.filter_by(
-                            library_id=library_id,
-                            word_id=existing_word.id
-                        ).first()
-
-                        if existing_library_word:
-                            words_skipped += 1
-                            continue
-
-                        # Add existing word to library
-                        library_word = LibraryWord(
-                            library_id=library_id,
-                            word_id=existing_word.id
-                        )
-                        word = existing_word
-                    else:
-                        # Create new word
-                        word = Word(
-                            word=word_text,
-                            meaning=meaning_text,
-                            pronunciation=row.get('pronunciation', '').strip() or None,
-                            synonym=row.get('synonym', '').strip() or None,
-                            antonym=row.get('antonym', '').strip() or None,
-                            example=row.get('example', '').strip() or None,
-                            difficulty=row.get('difficulty', 'medium').strip() or 'medium'
-                        )
-                        db.session.add(word)
-                        db.session.flush()  # Get the word ID
-
-                        # Add word to library
-                        library_word = LibraryWord(
-                            library_id=library_id,
-                            word_id=word.id
-                        )
-
-                    db.session.add(library_word)
-
-                    # If not adding to master library, also add to master library
-                    if not library.is_master and master_library:
-                        existing_master_word = LibraryWord.query.filter_by(
-                            library_id=master_library.id,
-                            word_id=word.id
-                        ).first()
-
-                        if not existing_master_word:
-                            master_library_word = LibraryWord(
-                                library_id=master_library.id,
-                                word_id=word.id
-                            )
-                            db.session.add(master_library_word)
-
-                    words_added += 1
-
-                except Exception as e:
-                    errors.append(f'Row {row_num}: {str(e)}')
-                    continue
+            # Stream rows and import them set-wise in fixed-size batches
+            importer = BulkWordImporter(library, master_library)
+            batch_size = current_app.config['IMPORT_BATCH_SIZE']
+
+            batches = csv_entry_batches(
+                text_stream, word_column, meaning_column, batch_size, analysis_info['dialect']
+            )
+            for batch in batches:
+                importer.import_entries(batch)
+
+            words_added = importer.words_added
+            words_skipped = importer.words_skipped
+            errors = importer.errors
 
             db.session.commit()
+            invalidate_user_stats(current_user.id)
 
             return jsonify({
                 'success': True,
@@ -506,11 +520,13 @@ def upload_csv_to_library(current_user, library_id):
                     'detected_columns': {
                         'word_column': word_column,
                         'meaning_column': meaning_column
-                    }
+                    },
+                    'dialect': analysis_info['dialect']
                 }
             }), 200
 
         except Exception as e:
+            db.session.rollback()
             return jsonify({
                 'success': False,
                 'error': 'Failed to parse CSV file',
@@ -0,0 +1,121 @@
+from flask import Blueprint, request, jsonify
+from models import db, Library, ReviewEvent
+from auth import token_required
+from review_events import review_event, record_review_events, parse_latency
+from spaced_repetition import grade_card, due_cards, introduce_new_cards, library_has_word, MIN_GRADE, MAX_GRADE
+
+review_bp = Blueprint('review', __name__, url_prefix='/api/review')
+
+@review_bp.after_request
+def after_request(response):
+    """Add CORS headers to all responses"""
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+    response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    return response
+
+@review_bp.route('/due', methods=['OPTIONS'])
+@review_bp.route('/grade', methods=['OPTIONS'])
+def handle_options():
+    """Handle preflight OPTIONS requests"""
+    return jsonify({'success': True}), 200
+
+@review_bp.route('/due', methods=['GET'])
+@token_required
+def get_due_cards(current_user):
+    """Get the cards due for review, most overdue first, topped up with new cards"""
+    try:
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        library_id = request.args.get('library_id', type=int)
+
+        due = due_cards(current_user.id, limit)
+        new = []
+        if len(due) < limit:
+            # Top up from the given library, or the Master Library that holds every word
+            query = Library.query.filter_by(user_id=current_user.id)
+            query = query.filter_by(id=library_id) if library_id else query.filter_by(is_master=True)
+            library = query.first()
+            if library:
+                new = introduce_new_cards(current_user.id, library, limit - len(due))
+                db.session.commit()
+
+        cards = []
+        for schedule, word in due + new:
+            word_dict = word.to_dict()
+            word_dict['schedule'] = schedule.to_dict()
+            word_dict['is_new'] = schedule.last_reviewed_at is None
+            cards.append(word_dict)
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'cards': cards,
+                'count': len(cards),
+                'new_count': len(new)
+            }
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': 'Failed to fetch due cards',
+            'details': str(e)
+        }), 500
+
+@review_bp.route('/grade', methods=['POST'])
+@token_required
+def grade_review(current_user):
+    """Record a 0-5 review grade and reschedule the card"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': 'No data provided'
+            }), 400
+
+        word_id = data.get('word_id')
+        library_id = data.get('library_id')
+        grade = data.get('grade')
+
+        if not isinstance(word_id, int) or not isinstance(library_id, int):
+            return jsonify({
+                'success': False,
+                'error': 'Word ID and library ID are required'
+            }), 400
+
+        if not isinstance(grade, int) or isinstance(grade, bool) or not MIN_GRADE <= grade <= MAX_GRADE:
+            return jsonify({
+                'success': False,
+                'error': f'Grade must be an integer from {MIN_GRADE} to {MAX_GRADE}'
+            }), 400
+
+        if not library_has_word(current_user.id, library_id, word_id):
+            return jsonify({
+                'success': False,
+                'error': 'Word not found in your library'
+            }), 404
+
+        schedule = grade_card(current_user.id, library_id, word_id, grade)
+        db.session.commit()
+        record_review_events(review_event(
+            current_user.id, word_id, library_id, ReviewEvent.OUTCOME_GRADE.format(grade),
+            parse_latency(data.get('latency_ms')), schedule.last_reviewed_at
+        ))
+
+        return jsonify({
+            'success': True,
+            'message': 'Review recorded',
+            'data': {
+                'schedule': schedule.to_dict()
+            }
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': 'Failed to record review',
+            'details': str(e)
+        }), 500
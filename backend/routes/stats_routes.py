@@ -0,0 +1,104 @@
+from flask import Blueprint, request, jsonify
+from models import User
+from auth import token_required
+from learning_stats import get_user_stats
+from gamification import load_user_stat, progress_dict
+from leaderboard import get_leaderboards, BOARDS, BOARD_GLOBAL, BOARD_WEEKLY
+
+stats_bp = Blueprint('stats', __name__, url_prefix='/api/stats')
+
+@stats_bp.after_request
+def after_request(response):
+    """Add CORS headers to all responses"""
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+    response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    return response
+
+@stats_bp.route('', methods=['OPTIONS'])
+@stats_bp.route('/gamification', methods=['OPTIONS'])
+@stats_bp.route('/leaderboard', methods=['OPTIONS'])
+def handle_options():
+    """Handle preflight OPTIONS requests"""
+    return jsonify({'success': True}), 200
+
+@stats_bp.route('', methods=['GET'])
+@token_required
+def get_stats(current_user):
+    """Get the user's learning statistics: streaks, learned per day / week / month, per library and per difficulty"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': get_user_stats(current_user.id)
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Failed to fetch statistics',
+            'details': str(e)
+        }), 500
+
+@stats_bp.route('/gamification', methods=['GET'])
+@token_required
+def get_gamification(current_user):
+    """Get the user's XP, level and achievements"""
+    try:
+        stat = load_user_stat(current_user.id, create=False)
+
+        return jsonify({
+            'success': True,
+            'data': progress_dict(stat)
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Failed to fetch XP and achievements',
+            'details': str(e)
+        }), 500
+
+@stats_bp.route('/leaderboard', methods=['GET'])
+@token_required
+def get_leaderboard(current_user):
+    """Get the top of the global or weekly XP leaderboard and the user's rank"""
+    try:
+        board = request.args.get('board', BOARD_GLOBAL)
+        if board not in BOARDS:
+            return jsonify({
+                'success': False,
+                'error': f'Board must be one of: {", ".join(BOARDS)}'
+            }), 400
+
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+        top, mine, total, week = get_leaderboards().standings(board, current_user.id, limit)
+
+        usernames = dict(User.query.with_entities(User.id, User.username).filter(
+            User.id.in_([user_id for _, user_id, _ in top])
+        ).all()) if top else {}
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'board': board,
+                'week_start': week.isoformat() if board == BOARD_WEEKLY else None,
+                'entries': [
+                    {
+                        'rank': rank,
+                        'username': usernames.get(user_id),
+                        'xp': xp,
+                        'is_me': user_id == current_user.id
+                    }
+                    for rank, user_id, xp in top
+                ],
+                'me': {'rank': mine[0], 'xp': mine[1]} if mine else None,
+                'total_players': total
+            }
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Failed to fetch leaderboard',
+            'details': str(e)
+        }), 500
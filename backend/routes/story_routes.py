@@ -6,6 +6,7 @@ from datetime import datetime
 from models import User, Library, Word, Story, db
 from schemas import StorySchema
 from auth import token_required
+from gamification import record_story_created
 import json
 
 story_bp = Blueprint('stories', __name__, url_prefix='/api/stories')
@@ -100,6 +101,7 @@ def create_story(current_user):
             user_id=current_user.id
         )
         
+        record_story_created(current_user.id)
         db.session.add(story)
         db.session.commit()
         
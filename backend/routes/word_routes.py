@@ -1,12 +1,21 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import ValidationError
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import func, or_
+from sqlalchemy import func
 from datetime import datetime
-from models import User, Library, Word, LibraryWord, db
+from models import User, Library, Word, LibraryWord, ReviewEvent, db
 from schemas import WordSchema
 from auth import token_required
+from word_search import apply_ranked_search
+from word_sampling import sample_library_words, get_user_libraries
+from word_of_the_day import get_word_of_the_day as lookup_word_of_the_day
+from word_import import BulkWordImporter, STATUS_ERROR
+from learning_stats import invalidate_user_stats
+from gamification import record_learning
+from review_events import review_event, record_review_events, parse_latency
+from word_progress import apply_progress_batch, STATUS_UPDATED
+from library_entries import entries_query, entry_dict, find_library_word, is_catalog_word, uses_catalog
 
 word_bp = Blueprint('words', __name__, url_prefix='/api/words')
 
@@ -27,6 +36,8 @@ def after_request(response):
 @word_bp.route('/random-unlearned', methods=['OPTIONS'])
 @word_bp.route('/word-of-the-day', methods=['OPTIONS'])
 @word_bp.route('/search', methods=['OPTIONS'])
+@word_bp.route('/progress/batch', methods=['OPTIONS'])
+@word_bp.route('/batch', methods=['OPTIONS'])
 def handle_options(word_id=None):
     """Handle preflight OPTIONS requests"""
     return jsonify({'success': True}), 200
@@ -83,7 +94,7 @@ def add_word_to_library(current_user):
                 word_id=existing_word.id
             ).first()
 
-            if existing_library_word:
+            if existing_library_word or is_catalog_word(library, existing_word.id):
                 return jsonify({
                     'success': False,
                     'error': 'Word already exists in this library'
@@ -129,7 +140,7 @@ def add_word_to_library(current_user):
                     word_id=word.id
                 ).first()
 
-                if not existing_master_word:
+                if not existing_master_word and not is_catalog_word(master_library, word.id):
                     master_library_word = LibraryWord(
                         library_id=master_library.id,
                         word_id=word.id
@@ -137,6 +148,7 @@ def add_word_to_library(current_user):
                     db.session.add(master_library_word)
 
         db.session.commit()
+        invalidate_user_stats(current_user.id)
 
         # Return word data with library info
         word_dict = word.to_dict()
@@ -161,6 +173,110 @@ def add_word_to_library(current_user):
             'details': str(e)
         }), 500
 
+@word_bp.route('/batch', methods=['POST'])
+@token_required
+def add_words_to_library(current_user):
+    """Add many words to a library (and the master library) in one transaction"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': 'No data provided'
+            }), 400
+
+        library_id = data.get('library_id')
+        if not library_id:
+            return jsonify({
+                'success': False,
+                'error': 'Library ID is required'
+            }), 400
+
+        words = data.get('words')
+        if not isinstance(words, list) or not words:
+            return jsonify({
+                'success': False,
+                'error': 'A non-empty list of words is required'
+            }), 400
+
+        max_items = current_app.config['WORD_BATCH_MAX_ITEMS']
+        if len(words) > max_items:
+            return jsonify({
+                'success': False,
+                'error': f'At most {max_items} words can be added at once'
+            }), 400
+
+        # Verify library belongs to user
+        library = Library.query.filter_by(
+            id=library_id,
+            user_id=current_user.id
+        ).first()
+
+        if not library:
+            return jsonify({
+                'success': False,
+                'error': 'Library not found'
+            }), 404
+
+        # Validate every word; invalid ones are reported and the rest still added
+        schema = WordSchema(many=True)
+        try:
+            validated_words = schema.load(words)
+            validation_errors = {}
+        except ValidationError as err:
+            validated_words = err.valid_data
+            validation_errors = err.messages
+
+        results = []
+        entries = []
+        for index, word_data in enumerate(validated_words):
+            if index in validation_errors:
+                results.append({
+                    'index': index,
+                    'word': words[index].get('word') if isinstance(words[index], dict) else None,
+                    'status': STATUS_ERROR,
+                    'error': validation_errors[index]
+                })
+                continue
+            results.append(None)
+            entries.append(dict(word_data, label=index))
+
+        master_library = None
+        if not library.is_master:
+            master_library = Library.query.filter_by(
+                user_id=current_user.id,
+                is_master=True
+            ).first()
+
+        # Existing words are resolved in one query and new rows inserted set-wise
+        importer = BulkWordImporter(library, master_library)
+        for result in importer.import_entries(entries):
+            index = result.pop('label')
+            results[index] = dict(result, index=index)
+
+        db.session.commit()
+        invalidate_user_stats(current_user.id)
+
+        words_added = importer.words_added
+        return jsonify({
+            'success': True,
+            'message': f'{words_added} of {len(words)} words added',
+            'data': {
+                'words_added': words_added,
+                'words_skipped': importer.words_skipped,
+                'error_count': sum(1 for result in results if result['status'] == STATUS_ERROR),
+                'results': results
+            }
+        }), 201 if words_added else 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': 'Failed to add words',
+            'details': str(e)
+        }), 500
+
 @word_bp.route('/<int:word_id>', methods=['PUT'])
 @token_required
 def update_word(current_user, word_id):
@@ -181,11 +297,16 @@ def update_word(current_user, word_id):
             }), 400
 
         # Verify library belongs to user and word exists in library
-        library_word = db.session.query(LibraryWord).join(Library).filter(
-            LibraryWord.word_id == word_id,
-            LibraryWord.library_id == library_id,
-            Library.user_id == current_user.id
-        ).first()
+        library_word = find_library_word(current_user.id, library_id, word_id)
+
+        if library_word is None or library_word.from_catalog:
+            # Words shared through a catalog are read-only
+            library = Library.query.filter_by(id=library_id, user_id=current_user.id).first()
+            if library and is_catalog_word(library, word_id):
+                return jsonify({
+                    'success': False,
+                    'error': 'Cannot modify words in the shared catalog'
+                }), 400
 
         if not library_word:
             return jsonify({
@@ -214,6 +335,7 @@ def update_word(current_user, word_id):
         word.difficulty = validated_data.get('difficulty', word.difficulty)
 
         db.session.commit()
+        invalidate_user_stats(current_user.id)
 
         # Return updated word data
         word_dict = word.to_dict()
@@ -291,7 +413,10 @@ def remove_word_from_library(current_user):
             }), 404
 
         db.session.delete(library_word)
+        # The word may no longer be learned in any library
+        record_learning(current_user.id, [(library_id, word_id, library_word.is_learned, False)], studied=False)
         db.session.commit()
+        invalidate_user_stats(current_user.id)
 
         return jsonify({
             'success': True,
@@ -320,12 +445,8 @@ def mark_word_learned(current_user, word_id):
                 'error': 'Library ID is required'
             }), 400
 
-        # Find the library-word association
-        library_word = db.session.query(LibraryWord).join(Library).filter(
-            LibraryWord.word_id == word_id,
-            LibraryWord.library_id == library_id,
-            Library.user_id == current_user.id
-        ).first()
+        # Find the library-word association (creating the progress row for a catalog word)
+        library_word = find_library_word(current_user.id, library_id, word_id, materialize=True)
 
         if not library_word:
             return jsonify({
@@ -333,8 +454,15 @@ def mark_word_learned(current_user, word_id):
                 'error': 'Word not found in your library'
             }), 404
 
-        # Mark as learned
-        library_word.mark_as_learned()
+        # Mark as learned (XP and achievements commit with it)
+        was_learned = library_word.is_learned
+        library_word.mark_as_learned(commit=False)
+        record_learning(current_user.id, [(library_word.library_id, word_id, was_learned, True)])
+        db.session.commit()
+        record_review_events(review_event(
+            current_user.id, word_id, library_id, ReviewEvent.OUTCOME_LEARNED, parse_latency(data.get('latency_ms'))
+        ))
+        invalidate_user_stats(current_user.id)
 
         return jsonify({
             'success': True,
@@ -363,12 +491,8 @@ def mark_word_unlearned(current_user, word_id):
                 'error': 'Library ID is required'
             }), 400
 
-        # Find the library-word association
-        library_word = db.session.query(LibraryWord).join(Library).filter(
-            LibraryWord.word_id == word_id,
-            LibraryWord.library_id == library_id,
-            Library.user_id == current_user.id
-        ).first()
+        # Find the library-word association (creating the progress row for a catalog word)
+        library_word = find_library_word(current_user.id, library_id, word_id, materialize=True)
 
         if not library_word:
             return jsonify({
@@ -377,7 +501,14 @@ def mark_word_unlearned(current_user, word_id):
             }), 404
 
         # Mark as unlearned
-        library_word.mark_as_unlearned()
+        was_learned = library_word.is_learned
+        library_word.mark_as_unlearned(commit=False)
+        record_learning(current_user.id, [(library_word.library_id, word_id, was_learned, False)], studied=False)
+        db.session.commit()
+        record_review_events(review_event(
+            current_user.id, word_id, library_id, ReviewEvent.OUTCOME_UNLEARNED, parse_latency(data.get('latency_ms'))
+        ))
+        invalidate_user_stats(current_user.id)
 
         return jsonify({
             'success': True,
@@ -392,6 +523,50 @@ def mark_word_unlearned(current_user, word_id):
             'details': str(e)
         }), 500
 
+@word_bp.route('/progress/batch', methods=['POST'])
+@token_required
+def update_progress_batch(current_user):
+    """Mark many words learned or unlearned in one transaction"""
+    try:
+        data = request.get_json()
+        items = data.get('items') if isinstance(data, dict) else data
+
+        if not isinstance(items, list) or not items:
+            return jsonify({
+                'success': False,
+                'error': 'A non-empty list of items is required'
+            }), 400
+
+        max_items = current_app.config['PROGRESS_BATCH_MAX_ITEMS']
+        if len(items) > max_items:
+            return jsonify({
+                'success': False,
+                'error': f'At most {max_items} items can be sent at once'
+            }), 400
+
+        results, events = apply_progress_batch(current_user.id, items)
+        db.session.commit()
+        invalidate_user_stats(current_user.id)
+        record_review_events(*events)
+
+        updated = sum(1 for result in results if result['status'] == STATUS_UPDATED)
+        return jsonify({
+            'success': True,
+            'message': f'{updated} of {len(items)} items applied',
+            'data': {
+                'updated': updated,
+                'results': results
+            }
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': 'Failed to update word progress',
+            'details': str(e)
+        }), 500
+
 @word_bp.route('/random', methods=['GET'])
 @token_required
 def get_random_words(current_user):
@@ -401,45 +576,13 @@ def get_random_words(current_user):
         status = request.args.get('status', 'unlearned')  # 'learned', 'unlearned', or 'all'
         library_id = request.args.get('library_id', type=int)
 
-        # Build base query
-        query = db.session.query(Word, LibraryWord).join(
-            LibraryWord, Word.id == LibraryWord.word_id
-        ).join(
-            Library, LibraryWord.library_id == Library.id
-        ).filter(
-            Library.user_id == current_user.id
-        )
-
-        # Filter by library if specified
-        if library_id:
-            query = query.filter(Library.id == library_id)
-
-        # Filter by learned status
-        if status == 'learned':
-            query = query.filter(LibraryWord.is_learned == True)
-        elif status == 'unlearned':
-            query = query.filter(LibraryWord.is_learned == False)
-        # 'all' doesn't add any filter
-
-        # Get random words using better randomization
-        # First get all matching words, then sample randomly in Python for better distribution
-        all_words_data = query.all()
-
-        if len(all_words_data) <= limit:
-            words_data = all_words_data
-        else:
-            import random
-            words_data = random.sample(all_words_data, limit)
+        # Sample in the database instead of loading every matching row
+        # ('all' and unknown statuses sample from every word)
+        libraries = get_user_libraries(current_user.id, library_id)
+        words_data = sample_library_words(libraries, limit, status=status)
 
         # Format response
-        words = []
-        for word, library_word in words_data:
-            word_dict = word.to_dict()
-            word_dict['is_learned'] = library_word.is_learned
-            word_dict['learned_at'] = library_word.learned_at.isoformat() if library_word.learned_at else None
-            word_dict['added_at'] = library_word.added_at.isoformat() if library_word.added_at else None
-            word_dict['library_word_id'] = library_word.id
-            words.append(word_dict)
+        words = [entry_dict(word, library_word) for word, library_word in words_data]
 
         return jsonify({
             'success': True,
@@ -467,37 +610,21 @@ def search_words(current_user):
                 'error': 'Search query is required'
             }), 400
 
-        # Build base query
-        query = db.session.query(Word, LibraryWord).join(
-            LibraryWord, Word.id == LibraryWord.word_id
-        ).join(
-            Library, LibraryWord.library_id == Library.id
-        ).filter(
-            Library.user_id == current_user.id
-        )
+        # Build base query over the user's libraries (and their catalog words)
+        library_filters = [Library.user_id == current_user.id]
 
         # Filter by library if specified
         if library_id:
-            query = query.filter(Library.id == library_id)
+            library_filters.append(Library.id == library_id)
 
-        # Search across word fields
-        search_filter = or_(
-            Word.word.ilike(f'%{query_text}%'),
-            Word.meaning.ilike(f'%{query_text}%'),
-            Word.example.ilike(f'%{query_text}%')
-        )
+        include_catalog = uses_catalog(get_user_libraries(current_user.id, library_id))
+        query = entries_query(*library_filters, include_catalog=include_catalog)
 
-        words_data = query.filter(search_filter).all()
+        # Search across word fields (FTS5 index with bm25 ranking when available)
+        words_data = apply_ranked_search(query, query_text).all()
 
         # Format response
-        words = []
-        for word, library_word in words_data:
-            word_dict = word.to_dict()
-            word_dict['is_learned'] = library_word.is_learned
-            word_dict['learned_at'] = library_word.learned_at.isoformat() if library_word.learned_at else None
-            word_dict['added_at'] = library_word.added_at.isoformat() if library_word.added_at else None
-            word_dict['library_word_id'] = library_word.id
-            words.append(word_dict)
+        words = [entry_dict(word, library_word) for word, library_word in words_data]
 
         return jsonify({
             'success': True,
@@ -526,12 +653,8 @@ def mark_word_learned_alt(current_user, word_id):
                 'error': 'Library ID is required'
             }), 400
 
-        # Find the library-word association
-        library_word = db.session.query(LibraryWord).join(Library).filter(
-            LibraryWord.word_id == word_id,
-            LibraryWord.library_id == library_id,
-            Library.user_id == current_user.id
-        ).first()
+        # Find the library-word association (creating the progress row for a catalog word)
+        library_word = find_library_word(current_user.id, library_id, word_id, materialize=True)
 
         if not library_word:
             return jsonify({
@@ -539,8 +662,15 @@ def mark_word_learned_alt(current_user, word_id):
                 'error': 'Word not found in your library'
             }), 404
 
-        # Mark as learned
-        library_word.mark_as_learned()
+        # Mark as learned (XP and achievements commit with it)
+        was_learned = library_word.is_learned
+        library_word.mark_as_learned(commit=False)
+        record_learning(current_user.id, [(library_word.library_id, word_id, was_learned, True)])
+        db.session.commit()
+        record_review_events(review_event(
+            current_user.id, word_id, library_id, ReviewEvent.OUTCOME_LEARNED, parse_latency(data.get('latency_ms'))
+        ))
+        invalidate_user_stats(current_user.id)
 
         return jsonify({
             'success': True,
@@ -569,35 +699,12 @@ def get_random_unlearned_words(current_user):
                 'error': 'Library ID is required'
             }), 400
 
-        # Build query for unlearned words
-        query = db.session.query(Word, LibraryWord).join(
-            LibraryWord, Word.id == LibraryWord.word_id
-        ).join(
-            Library, LibraryWord.library_id == Library.id
-        ).filter(
-            Library.user_id == current_user.id,
-            Library.id == library_id,
-            LibraryWord.is_learned == False
-        )
-
-        # Get random unlearned words using better randomization
-        all_words_data = query.all()
-
-        if len(all_words_data) <= count:
-            words_data = all_words_data
-        else:
-            import random
-            words_data = random.sample(all_words_data, count)
+        # Sample unlearned words in the database instead of loading the whole library
+        libraries = get_user_libraries(current_user.id, library_id)
+        words_data = sample_library_words(libraries, count, status='unlearned')
 
         # Format response
-        words = []
-        for word, library_word in words_data:
-            word_dict = word.to_dict()
-            word_dict['is_learned'] = library_word.is_learned
-            word_dict['learned_at'] = library_word.learned_at.isoformat() if library_word.learned_at else None
-            word_dict['added_at'] = library_word.added_at.isoformat() if library_word.added_at else None
-            word_dict['library_word_id'] = library_word.id
-            words.append(word_dict)
+        words = [entry_dict(word, library_word) for word, library_word in words_data]
 
         return jsonify({
             'success': True,
@@ -614,7 +721,7 @@ def get_random_unlearned_words(current_user):
 @word_bp.route('/word-of-the-day', methods=['GET'])
 @token_required
 def get_word_of_the_day(current_user):
-    """Get word of the day (random unlearned word)"""
+    """Get word of the day (deterministic unlearned word, stable for the whole day)"""
     try:
         library_id = request.args.get('library_id', type=int)
 
@@ -624,25 +731,9 @@ def get_word_of_the_day(current_user):
                 'error': 'Library ID is required'
             }), 400
 
-        # Build query for unlearned words
-        query = db.session.query(Word, LibraryWord).join(
-            LibraryWord, Word.id == LibraryWord.word_id
-        ).join(
-            Library, LibraryWord.library_id == Library.id
-        ).filter(
-            Library.user_id == current_user.id,
-            Library.id == library_id,
-            LibraryWord.is_learned == False
-        )
-
-        # Get one random unlearned word using better randomization
-        all_words_data = query.all()
-
-        if not all_words_data:
-            word_data = None
-        else:
-            import random
-            word_data = random.choice(all_words_data)
+        # Stable per user/library/day pick, cached after the first request of the day
+        library = Library.query.filter_by(id=library_id, user_id=current_user.id).first()
+        word_data = lookup_word_of_the_day(library) if library else None
 
         if not word_data:
             return jsonify({
@@ -651,11 +742,7 @@ def get_word_of_the_day(current_user):
             }), 200
 
         word, library_word = word_data
-        word_dict = word.to_dict()
-        word_dict['is_learned'] = library_word.is_learned
-        word_dict['learned_at'] = library_word.learned_at.isoformat() if library_word.learned_at else None
-        word_dict['added_at'] = library_word.added_at.isoformat() if library_word.added_at else None
-        word_dict['library_word_id'] = library_word.id
+        word_dict = entry_dict(word, library_word)
 
         return jsonify({
             'success': True,
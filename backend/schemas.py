@@ -52,6 +52,20 @@ class WordSchema(Schema):
         missing='medium'
     )
 
+class ProgressItemSchema(Schema):
+    """Schema for one entry of a batch learn/unlearn update"""
+    word_id = fields.Int(required=True)
+    library_id = fields.Int(required=True)
+    state = fields.Str(
+        required=True,
+        validate=validate.OneOf(['learned', 'unlearned'])
+    )
+    timestamp = fields.DateTime(allow_none=True)
+    latency_ms = fields.Int(
+        validate=validate.Range(min=0),
+        allow_none=True
+    )
+
 class StorySchema(Schema):
     """Schema for story validation"""
     title = fields.Str(
@@ -0,0 +1,162 @@
+"""
+SM-2 spaced-repetition scheduling.
+
+Each graded word gets a review_schedules row holding its ease factor, interval
+(days), repetition count and next due time. Grading reads and writes that one
+row through its unique (user, library, word) key, and the due queue is a
+range scan over the (user_id, due_at) index, so both stay constant-cost per
+card however many cards a user has.
+
+Grades follow SM-2's 0-5 quality scale: 3 and above is a successful recall,
+below 3 restarts the card at a one-day interval.
+
+Words enter the queue when they are first shown: when fewer cards are due than
+asked for, introduce_new_cards() schedules random unlearned words of a
+library that have no schedule yet, due at once, up to REVIEW_NEW_CARDS_PER_DAY
+per user and day. They are drawn with the O(k) sampler (see word_sampling.py),
+so flashcards no longer need to pull random unlearned words themselves.
+"""
+
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from models import db, Library, LibraryWord, ReviewSchedule, Word
+from library_entries import is_catalog_word
+from word_sampling import sample_library_words, STATUS_UNLEARNED
+
+MIN_GRADE = 0
+MAX_GRADE = 5
+PASSING_GRADE = 3
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+
+def sm2(ease, interval, reps, grade):
+    """
+    Next (ease, interval, reps) after a review graded 0-5
+
+    Successful reviews step through 1 and 6 days, then multiply the interval
+    by the ease factor. The ease factor moves with every grade and never drops
+    below MIN_EASE.
+    """
+    if grade >= PASSING_GRADE:
+        if reps == 0:
+            interval = 1
+        elif reps == 1:
+            interval = 6
+        else:
+            interval = max(1, int(round(interval * ease)))
+        reps += 1
+    else:
+        reps = 0
+        interval = 1
+
+    ease = max(MIN_EASE, ease + (0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02)))
+    return ease, interval, reps
+
+def library_has_word(user_id, library_id, word_id):
+    """Whether one of the user's libraries contains the word (stored or via its catalog)"""
+    library = Library.query.filter_by(id=library_id, user_id=user_id).first()
+    if not library:
+        return False
+    stored = db.session.query(LibraryWord.id).filter_by(library_id=library_id, word_id=word_id).first()
+    return stored is not None or is_catalog_word(library, word_id)
+
+def grade_card(user_id, library_id, word_id, grade, now=None):
+    """
+    Apply a review grade to a card, creating its schedule on first review
+
+    The caller checks that the library holds the word and commits.
+    Returns the updated ReviewSchedule.
+    """
+    now = now or datetime.utcnow()
+    card = ReviewSchedule.query.filter_by(user_id=user_id, library_id=library_id, word_id=word_id)
+    schedule = card.first()
+    if schedule is None:
+        schedule = ReviewSchedule(
+            user_id=user_id,
+            library_id=library_id,
+            word_id=word_id,
+            ease=DEFAULT_EASE,
+            interval=0,
+            reps=0,
+            due_at=now
+        )
+        try:
+            with db.session.begin_nested():
+                db.session.add(schedule)
+        except IntegrityError:
+            # A concurrent first grade created the schedule first; grade that one
+            schedule = card.first()
+
+    schedule.ease, schedule.interval, schedule.reps = sm2(schedule.ease, schedule.interval, schedule.reps, grade)
+    schedule.due_at = now + timedelta(days=schedule.interval)
+    schedule.last_reviewed_at = now
+    db.session.flush()
+    return schedule
+
+def due_cards(user_id, limit, now=None):
+    """Schedules due by now, most overdue first, with their words loaded"""
+    now = now or datetime.utcnow()
+    return db.session.query(ReviewSchedule, Word).join(
+        Word, Word.id == ReviewSchedule.word_id
+    ).filter(
+        ReviewSchedule.user_id == user_id,
+        ReviewSchedule.due_at <= now
+    ).order_by(
+        ReviewSchedule.due_at
+    ).limit(limit).all()
+
+def new_cards_left(user_id, now):
+    """New cards the user may still be introduced to today"""
+    day_start = datetime.combine(now.date(), datetime.min.time())
+    introduced = db.session.query(func.count(ReviewSchedule.id)).filter(
+        ReviewSchedule.user_id == user_id,
+        ReviewSchedule.created_at >= day_start
+    ).scalar()
+    return max(current_app.config['REVIEW_NEW_CARDS_PER_DAY'] - introduced, 0)
+
+def introduce_new_cards(user_id, library, limit, now=None):
+    """
+    Schedule up to limit unlearned, unscheduled words of a library, due now
+
+    The caller commits. Returns [(ReviewSchedule, Word)] for the new cards.
+    """
+    now = now or datetime.utcnow()
+    limit = min(limit, new_cards_left(user_id, now))
+    if limit <= 0:
+        return []
+
+    # Oversample so words that already have a schedule can be skipped
+    candidates = sample_library_words([library], limit * 2, status=STATUS_UNLEARNED)
+    word_ids = [word.id for word, _ in candidates]
+    scheduled = {word_id for (word_id,) in db.session.query(ReviewSchedule.word_id).filter(
+        ReviewSchedule.user_id == user_id,
+        ReviewSchedule.library_id == library.id,
+        ReviewSchedule.word_id.in_(word_ids)
+    )} if word_ids else set()
+
+    cards = []
+    for word, _ in candidates:
+        if len(cards) >= limit:
+            break
+        if word.id in scheduled:
+            continue
+        schedule = ReviewSchedule(
+            user_id=user_id,
+            library_id=library.id,
+            word_id=word.id,
+            ease=DEFAULT_EASE,
+            interval=0,
+            reps=0,
+            due_at=now,
+            created_at=now
+        )
+        try:
+            with db.session.begin_nested():
+                db.session.add(schedule)
+        except IntegrityError:
+            # A concurrent request introduced the same card first
+            continue
+        cards.append((schedule, word))
+    return cards
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Tests for header and column detection in csv_column_detector.py
+"""
+
+import sys
+import os
+import io
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from csv_column_detector import CSVColumnDetector, read_csv_rows
+
+HEADERLESS = [
+    # First meanings containing indicator substrings ('expression', 'def', 'word', 'sense')
+    "ebullient,an expression of great joy and enthusiasm\n"
+    "laconic,using very few words to say something\n"
+    "prolix,tediously lengthy in speech or writing\n",
+    "procrastinate,to defer action until a later time\n"
+    "obdurate,stubbornly refusing to change an opinion\n"
+    "zeal,great energy in pursuit of a cause\n",
+    "eloquent,fluent and persuasive in wording or speech\n"
+    "sagacious,having keen mental discernment and good sense\n"
+    "zeal,great energy in pursuit of a cause\n",
+]
+
+@pytest.mark.parametrize('content', HEADERLESS)
+def test_headerless_first_row_is_data(content):
+    detector = CSVColumnDetector()
+    word_column, meaning_column, info = detector.detect_columns(content)
+    assert info['dialect']['has_header'] is False
+    assert (word_column, meaning_column) == ('column_1', 'column_2')
+
+    fieldnames, rows = read_csv_rows(io.StringIO(content), info['dialect'])
+    words = [values[0] for _, values in rows]
+    assert words[0] == content.split(',', 1)[0]
+    assert len(words) == 3
+
+@pytest.mark.parametrize('content, expected', [
+    ("Word,Meaning\nzeal,great energy\nlaconic,brief\n", ('Word', 'Meaning')),
+    ("Word_Name;Definition (en)\nzeal;great energy\nlaconic;brief\n", ('Word_Name', 'Definition (en)')),
+    ("term\tdef\nzeal\tgreat energy\nlaconic\tbrief\n", ('term', 'def')),
+])
+def test_named_header_is_detected(content, expected):
+    word_column, meaning_column, info = CSVColumnDetector().detect_columns(content)
+    assert info['dialect']['has_header'] is True
+    assert (word_column, meaning_column) == expected
+
+def test_long_cell_starting_with_indicator_is_not_a_header():
+    detector = CSVColumnDetector()
+    assert not detector._looks_like_header(['access', 'entry into a place or a system'])
+    assert not detector._looks_like_header(['zeal', 'expression of great energy'])
+    assert detector._looks_like_header(['Word Name', 'Meaning'])
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the XP, level and achievement rules in gamification.py
+"""
+
+import sys
+import os
+from datetime import date, datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models import UserStat
+import gamification
+from gamification import (
+    WORD_XP, STORY_XP, ACHIEVEMENTS, xp_for_level, level_title, week_start,
+    add_xp, weekly_xp, progress_dict, _count_learned, _count_study_day, _count_story
+)
+
+NOW = datetime(2026, 3, 11, 12, 0)  # a Wednesday
+
+def new_stat():
+    return UserStat(
+        user_id=1, total_xp=0, level=1, level_xp=0, weekly_xp=0,
+        words_learned=0, max_words_learned=0, stories_created=0,
+        current_streak=0, longest_streak=0
+    )
+
+def achievement_xp(achievement_id):
+    return next(achievement.xp_reward for achievement in ACHIEVEMENTS if achievement.id == achievement_id)
+
+def test_xp_for_level_grows_by_a_fifth():
+    assert xp_for_level(1) == 100
+    assert xp_for_level(2) == 120
+    assert xp_for_level(3) == 144
+    assert xp_for_level(10) == 515
+
+def test_level_titles():
+    assert level_title(1) == 'Vocabulary Novice'
+    assert level_title(5) == 'Word Explorer'
+    assert level_title(99) == 'Vocabulary Sage'
+    assert level_title(100) == 'Legendary Wordsmith'
+
+def test_week_start_is_monday():
+    assert week_start(date(2026, 3, 11)) == date(2026, 3, 9)
+    assert week_start(date(2026, 3, 9)) == date(2026, 3, 9)
+    assert week_start(date(2026, 3, 15)) == date(2026, 3, 9)
+
+def test_add_xp_carries_overflow_into_levels():
+    stat = new_stat()
+    add_xp(stat, 100 + 120 + 5)
+    assert stat.level == 3
+    assert stat.level_xp == 5
+    assert stat.total_xp == 225
+
+def test_weekly_xp_resets_in_a_new_week():
+    stat = new_stat()
+    add_xp(stat, 30)
+    this_week = week_start(datetime.utcnow().date())
+    assert weekly_xp(stat, this_week) == 30
+    assert weekly_xp(stat, this_week + timedelta(days=7)) == 0
+
+def test_learning_pays_word_xp_and_unlocks_first_word():
+    stat = new_stat()
+    assert _count_learned(stat, 1, NOW) == ['first_word']
+    assert stat.words_learned == 1
+    assert stat.total_xp == WORD_XP + achievement_xp('first_word')
+
+def test_relearning_does_not_pay_twice():
+    stat = new_stat()
+    _count_learned(stat, 1, NOW)
+    paid = stat.total_xp
+    _count_learned(stat, 0, NOW)
+    _count_learned(stat, 1, NOW)
+    assert stat.words_learned == 1
+    assert stat.total_xp == paid
+    _count_learned(stat, 2, NOW)
+    assert stat.total_xp == paid + WORD_XP
+
+def test_achievements_unlock_once():
+    stat = new_stat()
+    assert _count_learned(stat, 10, NOW) == ['first_word', 'word_collector_10']
+    assert _count_learned(stat, 11, NOW) == []
+    assert set(stat.get_achievements()) == {'first_word', 'word_collector_10'}
+
+def test_study_days_build_and_break_streaks():
+    stat = new_stat()
+    today = NOW.date()
+    for offset in range(3):
+        unlocked = _count_study_day(stat, today + timedelta(days=offset), NOW)
+    assert stat.current_streak == 3
+    assert unlocked == ['daily_learner']
+    # Studying twice on one day does not extend the streak
+    assert _count_study_day(stat, today + timedelta(days=2), NOW) == []
+    assert stat.current_streak == 3
+    _count_study_day(stat, today + timedelta(days=5), NOW)
+    assert stat.current_streak == 1
+    assert stat.longest_streak == 3
+
+def test_story_pays_story_xp():
+    stat = new_stat()
+    assert _count_story(stat, NOW) == ['storyteller']
+    assert stat.stories_created == 1
+    assert stat.total_xp == STORY_XP + achievement_xp('storyteller')
+
+def test_progress_dict_drops_lapsed_streak():
+    stat = new_stat()
+    _count_study_day(stat, NOW.date(), NOW)
+    progress = progress_dict(stat, NOW.date() + timedelta(days=1))
+    assert progress['stats']['current_streak'] == 1
+    progress = progress_dict(stat, NOW.date() + timedelta(days=2))
+    assert progress['stats']['current_streak'] == 0
+    assert len(progress['achievements']) == len(gamification.ACHIEVEMENTS)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for import job recovery at startup (import_jobs.py)
+"""
+
+import sys
+import os
+import time
+import logging
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from app import create_app
+from config import config, TestingConfig
+from models import db, User, Library, ImportJob
+from import_jobs import recover_import_jobs
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+@pytest.fixture
+def recovering_app(tmp_path, monkeypatch):
+    class RecoveryConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "fresh.db"}'
+        UPLOAD_FOLDER = str(tmp_path / 'uploads')
+        IMPORT_RECOVERY_ENABLED = True
+        IMPORT_JOB_STALE_AFTER = 0.1  # Recovery passes run this often too
+
+    monkeypatch.setitem(config, 'recovery_test', RecoveryConfig)
+    app = create_app('recovery_test')
+    yield app
+    app.extensions['import_recovery'].set()
+    app.extensions['review_events'].close()
+
+def test_recovery_starts_against_a_fresh_database(recovering_app, caplog):
+    # Setup scripts create the app (and its recovery thread) before db.create_all()
+    caplog.set_level(logging.WARNING)
+    time.sleep(0.3)
+    assert recover_import_jobs(recovering_app) == (0, 0, 0)
+    assert not [record for record in caplog.records if 'import' in record.getMessage().lower()]
+
+    with recovering_app.app_context():
+        db.create_all()
+        user = User(username='importer', email='importer@example.com')
+        user.set_password('Passw0rd!x')
+        db.session.add(user)
+        db.session.flush()
+        library = Library(user_id=user.id, name='Imports')
+        db.session.add(library)
+        db.session.flush()
+        db.session.add(ImportJob(
+            user_id=user.id, library_id=library.id, status=ImportJob.STATUS_RUNNING,
+            word_column='word', meaning_column='meaning', started_at=datetime.utcnow()
+        ))
+        db.session.commit()
+        job_id = db.session.query(ImportJob.id).scalar()
+
+    def job_failed():
+        with recovering_app.app_context():
+            return db.session.get(ImportJob, job_id).status == ImportJob.STATUS_FAILED
+
+    # Once the tables exist the next pass picks up the interrupted job
+    assert wait_for(job_failed)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for the learned-per-day history in learning_stats.py
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from app import create_app
+from models import db, ReviewEvent
+from learning_stats import learned_per_day
+from compact_review_events import compact_review_events
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+    app.extensions['review_events'].close()
+
+def add_events(user_id, events):
+    db.session.add_all([
+        ReviewEvent(user_id=user_id, word_id=word_id, library_id=library_id, outcome=outcome, ts=ts)
+        for word_id, library_id, outcome, ts in events
+    ])
+    db.session.commit()
+
+def test_learned_per_day_survives_compaction(app):
+    day = datetime.utcnow().replace(hour=9, minute=0, second=0, microsecond=0) - timedelta(days=3)
+    learned, unlearned = ReviewEvent.OUTCOME_LEARNED, ReviewEvent.OUTCOME_UNLEARNED
+    add_events(1, [
+        # Learned, unlearned and learned again, then learned in a second library
+        (10, 1, learned, day),
+        (10, 1, unlearned, day + timedelta(minutes=1)),
+        (10, 1, learned, day + timedelta(minutes=2)),
+        (10, 2, learned, day + timedelta(minutes=3)),
+        (11, 1, learned, day + timedelta(minutes=4)),
+        (12, 1, learned, day + timedelta(days=1)),
+        (13, 1, unlearned, day + timedelta(days=1)),
+    ])
+    add_events(2, [(10, 3, learned, day)])
+
+    before = learned_per_day(1)
+    assert before == [(day.date(), 2), (day.date() + timedelta(days=1), 1)]
+
+    days, removed = compact_review_events(keep_days=1)
+    assert (days, removed) == (2, 8)
+    assert db.session.query(ReviewEvent).count() == 0
+    assert learned_per_day(1) == before
+    assert learned_per_day(2) == [(day.date(), 1)]
+
+def test_learned_per_day_merges_raw_and_compacted_days(app):
+    old = datetime.utcnow() - timedelta(days=5)
+    add_events(1, [(10, 1, ReviewEvent.OUTCOME_LEARNED, old)])
+    compact_review_events(keep_days=1)
+    add_events(1, [(11, 1, ReviewEvent.OUTCOME_LEARNED, datetime.utcnow())])
+
+    assert learned_per_day(1) == [(old.date(), 1), (datetime.utcnow().date(), 1)]
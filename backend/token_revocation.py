@@ -0,0 +1,203 @@
+"""
+Server-side JWT revocation.
+
+Logging out stores the token's jti in revoked_tokens until the token would have
+expired. Every JWT check (token_required and jwt_required alike) goes through
+Flask-JWT-Extended's blocklist callback, which consults an in-process Bloom
+filter first: a token that is not in the filter is definitely not revoked, so
+the common case costs no query. Filter hits are confirmed against an LRU of
+recent answers and then the table, which also absorbs false positives.
+Logout changes the in-memory view only after the revocation has been
+committed, so a failed commit never leaves a token revoked in one process and
+valid in the table.
+
+Each process picks up revocations made by other processes by reading rows
+newer than its last sync every REVOCATION_SYNC_INTERVAL seconds. Expired rows
+are deleted every REVOCATION_PRUNE_INTERVAL seconds, and the filter is rebuilt
+from the remaining rows at the same time since Bloom filters cannot forget.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask import current_app, jsonify
+from sqlalchemy import select, exists
+from models import db, RevokedToken
+
+# Rows committed slightly out of revoked_at order are still seen by the next sync
+SYNC_OVERLAP = timedelta(seconds=60)
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on one blake2b digest)"""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + index * second) % self.size for index in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+class RevocationList:
+    """Per-app view of revoked_tokens: Bloom filter + LRU in front of the table"""
+
+    def __init__(self, app):
+        self.sync_interval = app.config['REVOCATION_SYNC_INTERVAL']
+        self.prune_interval = app.config['REVOCATION_PRUNE_INTERVAL']
+        self.capacity = app.config['REVOCATION_BLOOM_CAPACITY']
+        self.error_rate = app.config['REVOCATION_BLOOM_ERROR_RATE']
+        self.lru_size = app.config['REVOCATION_LRU_SIZE']
+        self._filter = None
+        self._recent = OrderedDict()  # jti -> revoked
+        self._synced_until = None
+        self._next_sync = 0
+        self._next_prune = 0
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def _remember(self, jti, revoked):
+        with self._lock:
+            self._recent[jti] = revoked
+            self._recent.move_to_end(jti)
+            while len(self._recent) > self.lru_size:
+                self._recent.popitem(last=False)
+
+    def _rebuild(self, now):
+        """Load every unexpired jti into a fresh filter"""
+        rows = db.session.execute(
+            select(RevokedToken.jti, RevokedToken.revoked_at).where(RevokedToken.expires_at > now)
+        ).all()
+        bloom = BloomFilter(max(self.capacity, len(rows) * 2), self.error_rate)
+        for jti, _ in rows:
+            bloom.add(jti)
+        with self._lock:
+            self._filter = bloom
+            self._recent.clear()
+        self._synced_until = max((revoked_at for _, revoked_at in rows), default=now)
+
+    def _sync(self):
+        """Pull revocations made by other processes, pruning when due"""
+        now = datetime.utcnow()
+        if self._filter is None or time.monotonic() >= self._next_prune:
+            if self._filter is not None:
+                self.prune(now)
+            self._rebuild(now)
+            self._next_prune = time.monotonic() + self.prune_interval
+            return
+
+        rows = db.session.execute(
+            select(RevokedToken.jti, RevokedToken.revoked_at).where(
+                RevokedToken.revoked_at >= self._synced_until - SYNC_OVERLAP
+            )
+        ).all()
+        for jti, revoked_at in rows:
+            with self._lock:
+                if jti not in self._filter:
+                    self._filter.add(jti)
+                # A false positive cached as not revoked before another process revoked it
+                if jti in self._recent:
+                    self._recent[jti] = True
+            self._synced_until = max(self._synced_until, revoked_at)
+        if self._filter.count > self._filter.capacity:
+            self._rebuild(now)
+
+    def _maybe_sync(self):
+        if time.monotonic() < self._next_sync:
+            return
+        # One thread syncs; the others carry on with the current filter
+        if not self._sync_lock.acquire(blocking=self._filter is None):
+            return
+        try:
+            if time.monotonic() >= self._next_sync:
+                self._sync()
+                self._next_sync = time.monotonic() + self.sync_interval
+        finally:
+            self._sync_lock.release()
+
+    def is_revoked(self, jti):
+        """Whether a token id has been revoked (no query unless the filter matches)"""
+        self._maybe_sync()
+        if jti not in self._filter:
+            return False
+        with self._lock:
+            cached = self._recent.get(jti)
+            if cached is not None:
+                self._recent.move_to_end(jti)
+                return cached
+        revoked = db.session.query(exists().where(RevokedToken.jti == jti)).scalar()
+        self._remember(jti, revoked)
+        return revoked
+
+    def revoke(self, jti, token_type, expires_at, user_id=None):
+        """Record a revocation (the caller commits, then calls apply())"""
+        if db.session.get(RevokedToken, jti) is None:
+            db.session.add(RevokedToken(
+                jti=jti,
+                user_id=user_id,
+                token_type=token_type,
+                expires_at=expires_at
+            ))
+
+    def apply(self, jti):
+        """Treat a committed revocation as revoked in this process right away"""
+        self._maybe_sync()
+        with self._lock:
+            self._filter.add(jti)
+        self._remember(jti, True)
+
+    def prune(self, now=None):
+        """Delete revocations of tokens that have expired anyway"""
+        now = now or datetime.utcnow()
+        with db.engine.begin() as connection:
+            return connection.execute(
+                RevokedToken.__table__.delete().where(RevokedToken.expires_at <= now)
+            ).rowcount
+
+def get_revocation_list():
+    return current_app.extensions['token_revocation']
+
+def revoke_token(decoded_token, user_id=None):
+    """Revoke a decoded JWT until its expiry (the caller commits)"""
+    get_revocation_list().revoke(
+        decoded_token['jti'],
+        decoded_token.get('type', 'access'),
+        datetime.utcfromtimestamp(decoded_token['exp']),
+        user_id=user_id
+    )
+
+def apply_revocations(decoded_tokens):
+    """Apply revocations in this process once revoke_token()'s rows are committed"""
+    revocation_list = get_revocation_list()
+    for decoded_token in decoded_tokens:
+        revocation_list.apply(decoded_token['jti'])
+
+def init_token_revocation(app, jwt):
+    """Check every JWT against the revocation list"""
+    app.extensions['token_revocation'] = RevocationList(app)
+
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        return get_revocation_list().is_revoked(jwt_payload['jti'])
+
+    @jwt.revoked_token_loader
+    def revoked_token_response(jwt_header, jwt_payload):
+        return jsonify({
+            'success': False,
+            'error': 'Token has been revoked'
+        }), 401
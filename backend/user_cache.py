@@ -0,0 +1,124 @@
+"""
+Per-process cache of authenticated users.
+
+token_required only needs a user's id and is_active flag, so those are kept in
+a small TTL + LRU map keyed by the JWT identity (public_id) instead of being
+queried on every request. ORM updates and deletes of a User invalidate its
+entry in this process; other processes pick the change up once the entry
+expires (AUTH_USER_CACHE_TTL). Set AUTH_USER_CACHE_ENABLED to False to always
+hit the database.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from models import db, User
+
+class UserCache:
+    """Thread-safe TTL + LRU map of public_id -> (id, is_active)"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, public_id):
+        """Cached (id, is_active) for public_id, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(public_id)
+            if entry is None:
+                return None
+            user_id, is_active, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[public_id]
+                return None
+            self._entries.move_to_end(public_id)
+            return user_id, is_active
+
+    def put(self, public_id, user_id, is_active):
+        with self._lock:
+            self._entries[public_id] = (user_id, is_active, time.monotonic() + self.ttl)
+            self._entries.move_to_end(public_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, public_id):
+        with self._lock:
+            self._entries.pop(public_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class AuthenticatedUser:
+    """
+    What token_required passes to routes as current_user
+
+    id, public_id and is_active come from the cache. Any other User attribute
+    loads the full row on first access.
+    """
+
+    def __init__(self, user_id, public_id, is_active):
+        self.id = user_id
+        self.public_id = public_id
+        self.is_active = is_active
+        self._user = None
+
+    def load(self):
+        """The User row for this identity"""
+        if self._user is None:
+            self._user = db.session.get(User, self.id)
+        return self._user
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+def get_user_cache(app=None):
+    """The app's user cache, or None when AUTH_USER_CACHE_ENABLED is off"""
+    app = app or current_app
+    if not app.config.get('AUTH_USER_CACHE_ENABLED', True):
+        return None
+    cache = app.extensions.get('user_cache')
+    if cache is None:
+        cache = app.extensions.setdefault('user_cache', UserCache(
+            max_size=app.config['AUTH_USER_CACHE_SIZE'],
+            ttl=app.config['AUTH_USER_CACHE_TTL']
+        ))
+    return cache
+
+def load_authenticated_user(public_id):
+    """
+    Resolve a JWT identity to an AuthenticatedUser
+
+    Returns:
+        AuthenticatedUser, or None if no user has this public_id
+    """
+    cache = get_user_cache()
+    entry = cache.get(public_id) if cache is not None else None
+    if entry is None:
+        row = db.session.query(User.id, User.is_active).filter_by(public_id=public_id).first()
+        if row is None:
+            return None
+        entry = (row.id, bool(row.is_active))
+        if cache is not None:
+            cache.put(public_id, *entry)
+    return AuthenticatedUser(entry[0], public_id, entry[1])
+
+def invalidate_user(public_id):
+    """Drop a user's cached entry, e.g. after a bulk UPDATE that bypassed the ORM"""
+    cache = get_user_cache() if has_app_context() else None
+    if cache is not None:
+        cache.invalidate(public_id)
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_changed_user(mapper, connection, target):
+    invalidate_user(target.public_id)
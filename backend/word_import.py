@@ -0,0 +1,231 @@
+"""
+Set-based bulk import of words into a library.
+
+Entries are processed in batches. Each batch resolves existing words with one
+IN query, inserts new words and library associations with executemany and syncs
+the master library with a single anti-join INSERT ... SELECT, instead of several
+lookups and a flush per row.
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import select, and_, exists, literal
+from models import db, Library, Word, LibraryWord, CatalogWord
+from csv_column_detector import read_csv_rows
+
+# Keeps IN lists well under SQLite's bound-parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+STATUS_ADDED = 'added'
+STATUS_SKIPPED = 'skipped'
+STATUS_ERROR = 'error'
+
+def _chunks(items, size=LOOKUP_CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _clean(value):
+    """Strip a raw field value, treating missing values as empty"""
+    return value.strip() if isinstance(value, str) else ''
+
+def find_word_ids(word_texts: Iterable[str]) -> Dict[str, int]:
+    """Map each existing word text to its id (lowest id if duplicated)"""
+    found = {}
+    for chunk in _chunks(set(word_texts)):
+        rows = db.session.query(Word.word, Word.id).filter(Word.word.in_(chunk)).order_by(Word.id.desc())
+        for word_text, word_id in rows:
+            found[word_text] = word_id
+    return found
+
+def find_library_word_ids(library: Library, word_ids: Iterable[int]) -> set:
+    """Subset of word_ids already present in a library, including through its catalog"""
+    present = set()
+    for chunk in _chunks(set(word_ids)):
+        present.update(
+            word_id for (word_id,) in db.session.query(LibraryWord.word_id).filter(
+                LibraryWord.library_id == library.id,
+                LibraryWord.word_id.in_(chunk)
+            )
+        )
+        if library.catalog_id:
+            present.update(
+                word_id for (word_id,) in db.session.query(CatalogWord.word_id).filter(
+                    CatalogWord.catalog_id == library.catalog_id,
+                    CatalogWord.word_id.in_(chunk)
+                )
+            )
+    return present
+
+def sync_master_library(master_library, source_library_id, word_ids: List[int], now=None):
+    """
+    Add words from a library to the master library in one INSERT ... SELECT
+
+    Only words not already in the master library (or its catalog) are inserted.
+    Returns the number of rows added.
+    """
+    if not word_ids:
+        return 0
+
+    now = now or datetime.utcnow()
+    connection = db.session.connection()
+    master_row = LibraryWord.__table__.alias('master_row')
+    added = 0
+    for chunk in _chunks(word_ids):
+        missing = select(
+            literal(master_library.id),
+            LibraryWord.word_id,
+            literal(False),
+            literal(now)
+        ).where(
+            LibraryWord.library_id == source_library_id,
+            LibraryWord.word_id.in_(chunk),
+            ~exists().where(and_(
+                master_row.c.library_id == master_library.id,
+                master_row.c.word_id == LibraryWord.word_id
+            ))
+        )
+        if master_library.catalog_id:
+            missing = missing.where(~exists().where(and_(
+                CatalogWord.catalog_id == master_library.catalog_id,
+                CatalogWord.word_id == LibraryWord.word_id
+            )))
+        result = connection.execute(
+            LibraryWord.__table__.insert().from_select(
+                ['library_id', 'word_id', 'is_learned', 'added_at'], missing
+            )
+        )
+        added += result.rowcount
+
+    Library.adjust_counters(connection, master_library.id, words=added, session=db.session)
+    return added
+
+# Optional CSV columns copied onto each entry when present
+OPTIONAL_CSV_COLUMNS = ('pronunciation', 'example', 'difficulty')
+
+def csv_entry_batches(text_stream, word_column: str, meaning_column: str, batch_size: int,
+                      dialect_info: Optional[dict] = None):
+    """
+    Stream import entries from a CSV text stream in fixed-size batches
+
+    Rows are parsed lazily with the detected dialect (comma-separated with a
+    header if none is given) and fields are picked by column position, so only
+    one batch is held in memory at a time.
+    """
+    fieldnames, rows = read_csv_rows(text_stream, dialect_info)
+    positions = {name: position for position, name in enumerate(fieldnames)}
+    columns = [('word', positions.get(word_column)), ('meaning', positions.get(meaning_column))]
+    columns += [(name, positions.get(name)) for name in OPTIONAL_CSV_COLUMNS]
+
+    batch = []
+    for line_num, values in rows:
+        entry = {'label': f'Row {line_num}'}
+        for key, position in columns:
+            entry[key] = values[position] if position is not None and position < len(values) else None
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class BulkWordImporter:
+    """
+    Import batches of word entries into a library
+
+    Entries are dicts with 'word' and 'meaning' plus optional 'pronunciation',
+    'example', 'difficulty' and a 'label' used in error messages (e.g. 'Row 7').
+    Totals accumulate across batches in words_added, words_skipped and errors.
+    The caller commits.
+    """
+
+    def __init__(self, library: Library, master_library: Optional[Library] = None):
+        self.library = library
+        # Words added to a regular library are mirrored into the user's master library
+        self.master_library = master_library if master_library and not library.is_master else None
+        self.words_added = 0
+        self.words_skipped = 0
+        self.errors = []
+
+    def import_entries(self, entries: List[dict]) -> List[dict]:
+        """
+        Import one batch of entries
+
+        Returns:
+            One result per entry: {'label', 'word', 'status', 'error'?, 'word_id'?}
+        """
+        results = []
+        pending = {}  # word text -> (entry, result) for the first valid occurrence
+
+        for entry in entries:
+            word_text = _clean(entry.get('word')).lower()
+            meaning_text = _clean(entry.get('meaning'))
+            result = {'label': entry.get('label'), 'word': word_text}
+            results.append(result)
+
+            if not word_text or not meaning_text:
+                result['status'] = STATUS_ERROR
+                result['error'] = 'Word and meaning are required'
+                continue
+            if word_text in pending:
+                # Repeated within the batch; the first occurrence wins
+                result['status'] = STATUS_SKIPPED
+                continue
+            pending[word_text] = (dict(entry, word=word_text, meaning=meaning_text), result)
+
+        if pending:
+            self._import_pending(pending)
+
+        for result in results:
+            if result['status'] == STATUS_ADDED:
+                self.words_added += 1
+            elif result['status'] == STATUS_SKIPPED:
+                self.words_skipped += 1
+            else:
+                label = result.get('label')
+                self.errors.append(f"{label}: {result['error']}" if label else result['error'])
+
+        return results
+
+    def _import_pending(self, pending):
+        now = datetime.utcnow()
+        word_ids = find_word_ids(pending)
+
+        new_words = [
+            {
+                'word': word_text,
+                'meaning': entry['meaning'],
+                'pronunciation': _clean(entry.get('pronunciation')) or None,
+                'example': _clean(entry.get('example')) or None,
+                'difficulty': _clean(entry.get('difficulty')) or 'medium',
+                'created_at': now
+            }
+            for word_text, (entry, _) in pending.items()
+            if word_text not in word_ids
+        ]
+        if new_words:
+            db.session.execute(db.insert(Word), new_words)
+            word_ids.update(find_word_ids(row['word'] for row in new_words))
+
+        already_present = find_library_word_ids(self.library, word_ids.values())
+        to_add = []
+        for word_text, (_, result) in pending.items():
+            word_id = word_ids[word_text]
+            result['word_id'] = word_id
+            if word_id in already_present:
+                result['status'] = STATUS_SKIPPED
+            else:
+                result['status'] = STATUS_ADDED
+                to_add.append(word_id)
+
+        if not to_add:
+            return
+
+        db.session.execute(db.insert(LibraryWord), [
+            {'library_id': self.library.id, 'word_id': word_id, 'is_learned': False, 'added_at': now}
+            for word_id in to_add
+        ])
+        Library.adjust_counters(db.session.connection(), self.library.id, words=len(to_add), session=db.session)
+
+        if self.master_library:
+            sync_master_library(self.master_library, self.library.id, to_add, now)
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Deterministic word of the day.
+
+The word for a (user, library, day) is the unlearned word at position
+hash(user, library, day) mod unlearned_count, in word id order. Catalog words
+the library has no row for count as unlearned entries (see library_entries.py). The
+pick is stored in the word_of_the_day table the first time it is requested, so
+later requests that day are a single keyed lookup and refreshing the page does
+not change the word.
+
+Run this module as a script to precompute today's words for every master
+library in one pass and prune cached picks from previous days:
+
+    python word_of_the_day.py [--all-libraries]
+"""
+
+import hashlib
+import sys
+from datetime import datetime, timedelta
+from sqlalchemy import case, select, or_, union_all
+from sqlalchemy.exc import IntegrityError
+from models import db, Library, Word, LibraryWord, CatalogWord, WordOfTheDay
+from library_entries import entries_query, unlearned_filter, in_catalog, lacks_override
+
+PRECOMPUTE_BATCH_SIZE = 500
+
+def today():
+    """Current day in UTC, matching the utcnow() timestamps used elsewhere"""
+    return datetime.utcnow().date()
+
+def selection_offset(user_id, library_id, day, unlearned_count):
+    """Stable position in the unlearned set for this user, library and day"""
+    digest = hashlib.sha256(f'{user_id}:{library_id}:{day.isoformat()}'.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % unlearned_count
+
+def pick_word_id(library, day):
+    """Choose the word of the day for a library without loading its words"""
+    unlearned_count = library.get_counts()['unlearned_count']
+    if unlearned_count <= 0:
+        return None
+
+    if library.catalog_id:
+        query = entries_query(Library.id == library.id).filter(
+            unlearned_filter()
+        ).with_entities(Word.id.label('word_id')).order_by(Word.id)
+    else:
+        query = db.session.query(LibraryWord.word_id).filter(
+            LibraryWord.library_id == library.id,
+            LibraryWord.is_learned == False
+        ).order_by(LibraryWord.word_id)
+
+    offset = selection_offset(library.user_id, library.id, day, unlearned_count)
+    row = query.offset(offset).first()
+    if row is None and offset:
+        # Counters drifted below the real count; fall back to the first unlearned word
+        row = query.first()
+    return row.word_id if row else None
+
+def get_word_of_the_day(library, day=None):
+    """
+    Get the (Word, LibraryWord) of the day for a library, computing and caching it on first use
+
+    Returns:
+        Tuple of (Word, LibraryWord), or None if the library has no unlearned words
+    """
+    day = day or today()
+
+    cached = db.session.query(Word, LibraryWord).join(
+        WordOfTheDay, WordOfTheDay.word_id == Word.id
+    ).outerjoin(
+        LibraryWord, (LibraryWord.word_id == Word.id) & (LibraryWord.library_id == WordOfTheDay.library_id)
+    ).filter(
+        WordOfTheDay.library_id == library.id,
+        WordOfTheDay.day == day,
+        or_(LibraryWord.id.isnot(None), in_catalog(library.catalog_id))
+    ).first()
+    if cached:
+        return cached
+
+    word_id = pick_word_id(library, day)
+    if word_id is None:
+        return None
+
+    # Replace a stale pick (e.g. the word was removed from the library since)
+    WordOfTheDay.query.filter_by(library_id=library.id, day=day).delete()
+    db.session.add(WordOfTheDay(user_id=library.user_id, library_id=library.id, day=day, word_id=word_id))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request cached the same pick first
+        db.session.rollback()
+
+    return entries_query(Library.id == library.id, include_catalog=bool(library.catalog_id)).filter(
+        Word.id == word_id
+    ).first()
+
+def precompute_words_of_the_day(day=None, master_only=True, batch_size=PRECOMPUTE_BATCH_SIZE):
+    """
+    Compute and store the word of the day for every library that lacks one
+
+    Each batch of libraries is resolved with one windowed query: unlearned
+    entries (stored rows plus catalog words without a row) are numbered per
+    library in word id order and only the entry at each library's hashed
+    position is returned.
+
+    Returns:
+        Number of words of the day stored
+    """
+    day = day or today()
+
+    already_cached = select(WordOfTheDay.library_id).where(WordOfTheDay.day == day)
+    query = db.session.query(Library.id, Library.user_id, Library.word_count, Library.learned_count).filter(
+        Library.word_count > Library.learned_count,
+        Library.id.not_in(already_cached)
+    )
+    if master_only:
+        query = query.filter(Library.is_master == True)
+    libraries = query.order_by(Library.id).all()
+
+    stored = 0
+    for start in range(0, len(libraries), batch_size):
+        batch = libraries[start:start + batch_size]
+        positions = {
+            library_id: selection_offset(user_id, library_id, day, word_count - learned_count) + 1
+            for library_id, user_id, word_count, learned_count in batch
+        }
+        owners = {library_id: user_id for library_id, user_id, _, _ in batch}
+
+        library_ids = list(positions)
+        stored_entries = select(
+            LibraryWord.library_id.label('library_id'),
+            LibraryWord.word_id.label('word_id')
+        ).where(
+            LibraryWord.library_id.in_(library_ids),
+            LibraryWord.is_learned == False
+        )
+        virtual = select(Library.id, CatalogWord.word_id).join(
+            CatalogWord, CatalogWord.catalog_id == Library.catalog_id
+        ).where(
+            Library.id.in_(library_ids),
+            lacks_override()
+        )
+        entries = union_all(stored_entries, virtual).subquery()
+
+        ranked = select(
+            entries.c.library_id,
+            entries.c.word_id,
+            db.func.row_number().over(
+                partition_by=entries.c.library_id,
+                order_by=entries.c.word_id
+            ).label('position')
+        ).subquery()
+
+        picks = db.session.execute(
+            select(ranked.c.library_id, ranked.c.word_id).where(
+                ranked.c.position == case(positions, value=ranked.c.library_id)
+            )
+        ).all()
+
+        if picks:
+            db.session.execute(db.insert(WordOfTheDay), [
+                {
+                    'user_id': owners[library_id],
+                    'library_id': library_id,
+                    'day': day,
+                    'word_id': word_id,
+                    'created_at': datetime.utcnow()
+                }
+                for library_id, word_id in picks
+            ])
+            stored += len(picks)
+        db.session.commit()
+
+    return stored
+
+def prune_words_of_the_day(before_day):
+    """Delete cached picks older than before_day"""
+    deleted = WordOfTheDay.query.filter(WordOfTheDay.day < before_day).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+def main():
+    """Precompute today's words of the day and drop older ones"""
+    from app import app
+
+    master_only = '--all-libraries' not in sys.argv
+
+    with app.app_context():
+        try:
+            day = today()
+            pruned = prune_words_of_the_day(day - timedelta(days=1))
+            stored = precompute_words_of_the_day(day, master_only=master_only)
+            print(f"Stored {stored} words of the day for {day.isoformat()} (pruned {pruned} old entries)")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error precomputing words of the day: {e}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
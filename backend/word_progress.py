@@ -0,0 +1,183 @@
+"""
+Batched learn/unlearn updates.
+
+A flashcard session used to send one request per card, each with its own
+ownership join and commit. apply_progress_batch() takes the whole session and
+applies it in one transaction:
+
+- one query for the user's libraries among those referenced
+- one query for the existing library_words rows (plus one for catalog
+  membership when rows are missing)
+- one executemany INSERT for catalog words that get their first progress row
+- one UPDATE ... CASE for every existing row
+- one counter UPDATE per touched library
+- one lookup of the changed words learned in other libraries and a
+  user_stats update for XP and achievements (see gamification.py)
+
+When the same (library, word) appears more than once, the entry with the
+latest timestamp wins and the others are reported as superseded. Applied
+entries are also returned as review events (see review_events.py).
+"""
+
+from datetime import datetime, timezone
+from marshmallow import ValidationError
+from sqlalchemy import case
+from models import db, Library, LibraryWord, CatalogWord, ReviewEvent
+from schemas import ProgressItemSchema
+from review_events import review_event
+from gamification import record_learning, load_user_stat
+
+STATUS_UPDATED = 'updated'
+STATUS_SUPERSEDED = 'superseded'
+STATUS_NOT_FOUND = 'not_found'
+STATUS_INVALID = 'invalid'
+
+def _utc_naive(timestamp, now):
+    """Stored timestamps are naive UTC; client clocks ahead of ours are clamped"""
+    if timestamp is None:
+        return now
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(timestamp, now)
+
+def apply_progress_batch(user_id, items):
+    """
+    Apply learned / unlearned states for many words (the caller commits)
+
+    Args:
+        user_id: Owner of the libraries
+        items: dicts with word_id, library_id, state ('learned' or 'unlearned')
+            and optional ISO timestamp and latency_ms
+
+    Returns:
+        Tuple of (per-item results in input order, review events to record
+        once the caller has committed)
+    """
+    now = datetime.utcnow()
+    schema = ProgressItemSchema()
+    results = []
+    latest = {}  # (library_id, word_id) -> index of the winning item
+
+    for index, item in enumerate(items):
+        try:
+            entry = schema.load(item if isinstance(item, dict) else {})
+        except ValidationError as err:
+            results.append({'index': index, 'status': STATUS_INVALID, 'error': err.messages})
+            continue
+        entry['timestamp'] = _utc_naive(entry.get('timestamp'), now)
+        results.append({
+            'index': index,
+            'word_id': entry['word_id'],
+            'library_id': entry['library_id'],
+            'is_learned': entry['state'] == 'learned',
+            'timestamp': entry['timestamp'],
+            'latency_ms': entry.get('latency_ms')
+        })
+        key = (entry['library_id'], entry['word_id'])
+        winner = latest.get(key)
+        if winner is not None and results[winner]['timestamp'] > entry['timestamp']:
+            results[index]['status'] = STATUS_SUPERSEDED
+            continue
+        if winner is not None:
+            results[winner]['status'] = STATUS_SUPERSEDED
+        latest[key] = index
+
+    if latest:
+        _apply(user_id, latest, results)
+
+    events = []
+    for result in results:
+        timestamp = result.pop('timestamp', None)
+        latency_ms = result.pop('latency_ms', None)
+        if result['status'] != STATUS_UPDATED:
+            result.pop('is_learned', None)
+            continue
+        outcome = ReviewEvent.OUTCOME_LEARNED if result['is_learned'] else ReviewEvent.OUTCOME_UNLEARNED
+        events.append(review_event(user_id, result['word_id'], result['library_id'], outcome, latency_ms, timestamp))
+    return results, events
+
+def _apply(user_id, latest, results):
+    library_ids = {library_id for library_id, _ in latest}
+    word_ids = {word_id for _, word_id in latest}
+
+    # Single ownership check for every library in the batch
+    libraries = dict(db.session.query(Library.id, Library.catalog_id).filter(
+        Library.id.in_(library_ids),
+        Library.user_id == user_id
+    ).all())
+
+    rows = {
+        (library_id, word_id): (row_id, bool(is_learned))
+        for row_id, library_id, word_id, is_learned in db.session.query(
+            LibraryWord.id, LibraryWord.library_id, LibraryWord.word_id, LibraryWord.is_learned
+        ).filter(
+            LibraryWord.library_id.in_(list(libraries)),
+            LibraryWord.word_id.in_(word_ids)
+        )
+    } if libraries else {}
+
+    # Catalog words without a row get their first (from_catalog) progress row
+    missing = [key for key in latest if key[0] in libraries and key not in rows]
+    catalog_ids = {libraries[library_id] for library_id, _ in missing if libraries[library_id]}
+    in_catalog = set()
+    if catalog_ids:
+        in_catalog = set(db.session.query(CatalogWord.catalog_id, CatalogWord.word_id).filter(
+            CatalogWord.catalog_id.in_(catalog_ids),
+            CatalogWord.word_id.in_({word_id for _, word_id in missing})
+        ).all())
+
+    inserts = []
+    learned_is = {}
+    learned_at = {}
+    learned_delta = {}
+    changes = []
+    for key, index in latest.items():
+        library_id, word_id = key
+        result = results[index]
+        if library_id not in libraries:
+            result['status'] = STATUS_NOT_FOUND
+            continue
+        is_learned = result['is_learned']
+        stamp = result['timestamp'] if is_learned else None
+
+        if key in rows:
+            row_id, was_learned = rows[key]
+            learned_is[row_id] = is_learned
+            learned_at[row_id] = stamp
+        elif (libraries[library_id], word_id) in in_catalog:
+            was_learned = False
+            inserts.append({
+                'library_id': library_id,
+                'word_id': word_id,
+                'is_learned': is_learned,
+                'learned_at': stamp,
+                'added_at': result['timestamp'],
+                'from_catalog': True
+            })
+        else:
+            result['status'] = STATUS_NOT_FOUND
+            continue
+
+        result['status'] = STATUS_UPDATED
+        changes.append((library_id, word_id, was_learned, is_learned))
+        learned_delta[library_id] = learned_delta.get(library_id, 0) + int(is_learned) - int(was_learned)
+
+    # Seed a new user_stats row before the Core writes below can show up in it
+    load_user_stat(user_id)
+    db.session.flush()
+
+    connection = db.session.connection()
+    if inserts:
+        connection.execute(LibraryWord.__table__.insert(), inserts)
+    if learned_is:
+        table = LibraryWord.__table__
+        connection.execute(table.update().where(table.c.id.in_(list(learned_is))).values(
+            is_learned=case(learned_is, value=table.c.id),
+            learned_at=case(learned_at, value=table.c.id)
+        ))
+    # Catalog rows do not change word_count; only learned_count moves
+    for library_id, delta in learned_delta.items():
+        Library.adjust_counters(connection, library_id, learned=delta, session=db.session)
+
+    if changes:
+        record_learning(user_id, changes, studied=any(change[3] for change in changes))
@@ -0,0 +1,274 @@
+"""
+Uniform random sampling of library words without loading whole libraries.
+
+Every library_words row has a position 1..n within its library, kept dense by
+triggers (see LIBRARY_WORD_POSITION_DDL in models.py). The position ranges of
+all libraries being sampled are laid end to end, candidate positions are
+drawn without replacement, and each candidate is accepted only if the row at
+that position has the requested learned state. Every matching row owns
+exactly one position, so the accepted rows are a uniform random subset. A
+sample of k rows costs one indexed max lookup per library plus one indexed
+IN query per round, independent of library size; only a learned-state filter
+that matches a small share of the library needs more rounds.
+
+Libraries that reference a catalog get a second range over catalog_words ids
+(a catalog is filled in bulk, so its ids are close to contiguous); a catalog
+position is accepted only if the library has no row for that word, so every
+entry still owns exactly one position.
+
+If the filter is too selective for rejection sampling to converge quickly, or
+a library has no positions (a database not yet migrated with
+create_library_word_positions.py), the remaining picks come from an id-only
+scan of the matching rows, which is then small or the only option. Rows are
+only hydrated for the final picks.
+"""
+
+import math
+import random
+from typing import List, Optional, Tuple
+from sqlalchemy import and_, or_
+from models import db, Library, Word, LibraryWord, CatalogWord
+from library_entries import lacks_override
+
+# Rejection rounds before falling back to an id scan
+MAX_SAMPLING_ROUNDS = 4
+# Upper bound on candidate ids probed in one round
+MAX_CANDIDATES_PER_ROUND = 500
+
+STATUS_LEARNED = 'learned'
+STATUS_UNLEARNED = 'unlearned'
+
+# Entry kinds: a stored library_words row, or a catalog word without one
+KIND_ROW = 'row'
+KIND_CATALOG = 'catalog'
+
+def _status_filters(status):
+    if status == STATUS_LEARNED:
+        return [LibraryWord.is_learned == True]
+    if status == STATUS_UNLEARNED:
+        return [LibraryWord.is_learned == False]
+    return []
+
+def _matches_status(is_learned, status):
+    if status == STATUS_LEARNED:
+        return bool(is_learned)
+    if status == STATUS_UNLEARNED:
+        return not is_learned
+    return True
+
+def _matching_count(library, status):
+    """Number of rows matching status, read from the denormalized counters"""
+    counts = library.get_counts()
+    if status == STATUS_LEARNED:
+        return counts['learned_count']
+    if status == STATUS_UNLEARNED:
+        return counts['unlearned_count']
+    return counts['word_count']
+
+def _position_range(library_id):
+    """
+    Highest row position in a library (one indexed lookup)
+
+    Returns None for an empty library and False for one whose rows have no
+    positions yet.
+    """
+    high = db.session.query(db.func.max(LibraryWord.position)).filter(
+        LibraryWord.library_id == library_id
+    ).scalar()
+    if high is not None:
+        return high
+    has_rows = db.session.query(LibraryWord.id).filter(LibraryWord.library_id == library_id).first()
+    return False if has_rows else None
+
+def _catalog_id_range(catalog_id):
+    """Smallest and largest catalog_words id in a catalog"""
+    return db.session.query(
+        db.func.min(CatalogWord.id), db.func.max(CatalogWord.id)
+    ).filter(CatalogWord.catalog_id == catalog_id).one()
+
+def _virtual_entries(library_ids, catalog_word_ids=None):
+    """(catalog_words.id, library_id) of catalog words the libraries have no row for"""
+    query = db.session.query(CatalogWord.id, Library.id).join(
+        Library, Library.catalog_id == CatalogWord.catalog_id
+    ).filter(
+        Library.id.in_(library_ids),
+        lacks_override()
+    )
+    if catalog_word_ids is not None:
+        query = query.filter(CatalogWord.id.in_(catalog_word_ids))
+    return query.all()
+
+def _all_entries(libraries, filters, status):
+    """Every matching entry as (kind, id, library_id); used when sampling cannot help"""
+    entries = [
+        (KIND_ROW, row.id, row.library_id) for row in db.session.query(LibraryWord.id, LibraryWord.library_id).filter(
+            LibraryWord.library_id.in_([library.id for library in libraries]), *filters
+        )
+    ]
+    catalog_library_ids = [library.id for library in libraries if library.catalog_id]
+    if catalog_library_ids and status != STATUS_LEARNED:
+        entries.extend(
+            (KIND_CATALOG, catalog_word_id, library_id)
+            for catalog_word_id, library_id in _virtual_entries(catalog_library_ids)
+        )
+    return entries
+
+def _accept(candidates, status, catalog_library_ids):
+    """
+    Map each candidate that hits a matching entry to that (kind, id, library_id) entry
+
+    Row candidates are (KIND_ROW, position, library_id); one query per kind.
+    """
+    accepted = {}
+    positions = {}
+    for kind, position, library_id in candidates:
+        if kind == KIND_ROW:
+            positions.setdefault(library_id, set()).add(position)
+    if positions:
+        # One (library_id, position IN ...) term per library keeps each a position
+        # index lookup; the learned state is checked here so the planner cannot
+        # prefer the (library_id, is_learned) index and walk the whole library
+        hits = db.session.query(
+            LibraryWord.id, LibraryWord.library_id, LibraryWord.position, LibraryWord.is_learned
+        ).filter(or_(*[
+            and_(LibraryWord.library_id == library_id, LibraryWord.position.in_(sorted(library_positions)))
+            for library_id, library_positions in positions.items()
+        ]))
+        for row_id, library_id, position, is_learned in hits:
+            if _matches_status(is_learned, status):
+                accepted[(KIND_ROW, position, library_id)] = (KIND_ROW, row_id, library_id)
+
+    catalog_ids = list({entry_id for kind, entry_id, _ in candidates if kind == KIND_CATALOG})
+    if catalog_ids:
+        for catalog_word_id, library_id in _virtual_entries(catalog_library_ids, catalog_ids):
+            entry = (KIND_CATALOG, catalog_word_id, library_id)
+            accepted[entry] = entry
+    return accepted
+
+def _hydrate(entries) -> List[Tuple[Word, Optional[LibraryWord]]]:
+    """Load (Word, LibraryWord or None) pairs for the chosen entries, preserving their order"""
+    if not entries:
+        return []
+
+    loaded = {}
+    row_ids = [entry_id for kind, entry_id, _ in entries if kind == KIND_ROW]
+    if row_ids:
+        rows = db.session.query(Word, LibraryWord).join(
+            LibraryWord, Word.id == LibraryWord.word_id
+        ).filter(
+            LibraryWord.id.in_(row_ids)
+        )
+        for word, library_word in rows:
+            loaded[(KIND_ROW, library_word.id)] = (word, library_word)
+
+    catalog_ids = [entry_id for kind, entry_id, _ in entries if kind == KIND_CATALOG]
+    if catalog_ids:
+        rows = db.session.query(Word, CatalogWord.id).join(
+            CatalogWord, Word.id == CatalogWord.word_id
+        ).filter(
+            CatalogWord.id.in_(catalog_ids)
+        )
+        for word, catalog_word_id in rows:
+            loaded[(KIND_CATALOG, catalog_word_id)] = (word, None)
+
+    return [loaded[(kind, entry_id)] for kind, entry_id, _ in entries if (kind, entry_id) in loaded]
+
+def sample_library_words(libraries, k, status='all', rng=None) -> List[Tuple[Word, Optional[LibraryWord]]]:
+    """
+    Pick up to k uniformly random (Word, LibraryWord) rows from the given libraries
+
+    Catalog words a library has no row for are sampled too and come back as
+    (Word, None); they are always unlearned.
+
+    Args:
+        libraries: Library instances to sample from (already ownership-checked)
+        k: Number of rows wanted
+        status: 'learned', 'unlearned' or anything else for all rows
+        rng: Optional random.Random instance (for reproducible benchmarks)
+    """
+    rng = rng or random
+    filters = _status_filters(status)
+    libraries = [library for library in libraries if _matching_count(library, status) > 0]
+    total = sum(_matching_count(library, status) for library in libraries)
+
+    if k <= 0 or total == 0:
+        return []
+
+    if total <= k:
+        # Everything matches; no sampling needed
+        chosen = _all_entries(libraries, filters, status)
+        rng.shuffle(chosen)
+        return _hydrate(chosen[:k])
+
+    # Lay each library's ranges end to end: [(kind, library_id, low, offset), ...]
+    # Row ranges are positions; catalog libraries get a second range over
+    # catalog_words ids for their virtual entries
+    segments = []
+    span = 0
+    catalog_ranges = {}
+    catalog_library_ids = []
+    unnumbered = False
+    for library in libraries:
+        high = _position_range(library.id)
+        if high is False:
+            unnumbered = True
+        elif high is not None:
+            segments.append((KIND_ROW, library.id, 1, span))
+            span += high
+
+        if library.catalog_id and status != STATUS_LEARNED:
+            if library.catalog_id not in catalog_ranges:
+                catalog_ranges[library.catalog_id] = _catalog_id_range(library.catalog_id)
+            low, high = catalog_ranges[library.catalog_id]
+            if low is not None:
+                catalog_library_ids.append(library.id)
+                segments.append((KIND_CATALOG, library.id, low, span))
+                span += high - low + 1
+
+    chosen = []
+    tried = set()
+    density = total / span if span else 1.0
+
+    for _ in range(0 if unnumbered else MAX_SAMPLING_ROUNDS):
+        needed = k - len(chosen)
+        if needed <= 0 or len(tried) >= span:
+            break
+
+        batch_size = min(
+            MAX_CANDIDATES_PER_ROUND,
+            span - len(tried),
+            math.ceil(needed / density * 1.5) + 4
+        )
+        # (kind, position or id, library_id) per drawn position
+        candidates = []
+        while len(candidates) < batch_size:
+            position = rng.randrange(span)
+            if position in tried:
+                continue
+            tried.add(position)
+            # Map the position back to an entry via the segment it falls in
+            for kind, library_id, low, offset in reversed(segments):
+                if position >= offset:
+                    candidates.append((kind, low + position - offset, library_id))
+                    break
+
+        accepted = _accept(candidates, status, catalog_library_ids)
+        # Keep draw order so truncating to k stays uniform
+        chosen.extend(accepted[candidate] for candidate in candidates if candidate in accepted)
+
+    if len(chosen) < k:
+        # Filter too selective (or positions missing): finish from an id-only scan
+        chosen_set = set(chosen)
+        remaining = [entry for entry in _all_entries(libraries, filters, status) if entry not in chosen_set]
+        chosen.extend(rng.sample(remaining, min(k - len(chosen), len(remaining))))
+
+    chosen = chosen[:k]
+    rng.shuffle(chosen)
+    return _hydrate(chosen)
+
+def get_user_libraries(user_id, library_id: Optional[int] = None):
+    """User's libraries, optionally narrowed to one id (empty if not owned)"""
+    query = Library.query.filter_by(user_id=user_id)
+    if library_id:
+        query = query.filter_by(id=library_id)
+    return query.all()
@@ -0,0 +1,83 @@
+import re
+from typing import Optional
+from sqlalchemy import text, or_, case, select, Integer, Float
+from models import db, Word
+
+FTS_TABLE = 'words_fts'
+
+# Column weights for bm25(): a hit on the headword outranks hits in meaning/example
+BM25_WEIGHTS = (10.0, 2.0, 1.0)
+
+_TERM_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+# engine -> whether the words_fts table exists there
+_fts_available = {}
+
+def fts_available() -> bool:
+    """Check (once per engine) whether the FTS5 index can be used"""
+    engine = db.engine
+    if engine not in _fts_available:
+        available = False
+        if engine.dialect.name == 'sqlite':
+            with engine.connect() as connection:
+                available = connection.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {'name': FTS_TABLE}
+                ).first() is not None
+        _fts_available[engine] = available
+    return _fts_available[engine]
+
+def build_match_expression(query_text: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 MATCH expression of prefix terms
+
+    Every term must match (implicit AND) and the last character typed may be
+    mid-word, so each term is a quoted prefix query: 'aber beh' -> '"aber"* "beh"*'.
+    Returns None when the text has no searchable terms.
+    """
+    terms = _TERM_PATTERN.findall(query_text.lower())
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def _matches_subquery(match_expression):
+    """Subquery of (word_id, rank) for words matching the FTS expression"""
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    return text(
+        f"SELECT rowid AS word_id, bm25({FTS_TABLE}, {weights}) AS rank "
+        f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match_expression"
+    ).bindparams(match_expression=match_expression).columns(
+        word_id=Integer, rank=Float
+    ).subquery('word_matches')
+
+def _fallback_filter(query_text):
+    """Substring filter used when the FTS index is unavailable"""
+    return or_(
+        Word.word.ilike(f'%{query_text}%'),
+        Word.meaning.ilike(f'%{query_text}%'),
+        Word.example.ilike(f'%{query_text}%')
+    )
+
+def word_search_filter(query_text: str):
+    """SQL filter restricting Word rows to those matching the search text"""
+    match_expression = build_match_expression(query_text) if fts_available() else None
+    if match_expression is None:
+        return _fallback_filter(query_text)
+
+    matches = _matches_subquery(match_expression)
+    return Word.id.in_(select(matches.c.word_id))
+
+def apply_ranked_search(query, query_text: str):
+    """
+    Filter a query that selects Word to matching words, best matches first
+
+    Uses bm25 ranking over the FTS5 index when available; otherwise falls back
+    to substring matching with headword-prefix hits ordered first.
+    """
+    match_expression = build_match_expression(query_text) if fts_available() else None
+    if match_expression is None:
+        prefix_first = case((Word.word.ilike(f'{query_text}%'), 0), else_=1)
+        return query.filter(_fallback_filter(query_text)).order_by(prefix_first, Word.word)
+
+    matches = _matches_subquery(match_expression)
+    return query.join(matches, matches.c.word_id == Word.id).order_by(matches.c.rank, Word.word)